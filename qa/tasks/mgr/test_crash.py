@@ -72,6 +72,17 @@ class TestCrash(MgrTestCase):
         for crash in self.crashes.itervalues():
             self.assertIn(crash['crash_id'], retstr)
 
+    def test_ls_paging(self):
+        crashids = sorted(self.crashes.keys())
+        retstr = self.mgr_cluster.mon_manager.raw_cluster_cmd(
+            'crash', 'ls', '2',
+        )
+        self.assertEqual(retstr.split(), crashids[:2])
+        retstr = self.mgr_cluster.mon_manager.raw_cluster_cmd(
+            'crash', 'ls', '2', crashids[1],
+        )
+        self.assertEqual(retstr.split(), crashids[2:4])
+
     def test_rm(self):
         crashid = self.crashes.keys()[0]
         self.assertEqual(
@@ -5,9 +5,12 @@ set of utilities for interacting with LVM.
 """
 import logging
 import os
+import threading
 import uuid
+from contextlib import contextmanager
 from math import floor
 from ceph_volume import process, util
+from ceph_volume.util import disk
 from ceph_volume.exceptions import (
     MultipleLVsError, MultipleVGsError,
     MultiplePVsError, SizeAllocationError
@@ -15,6 +18,9 @@ from ceph_volume.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# the Inventory of the current invocation, when one is active
+_inventory = None
+
 
 def _output_parser(output, fields):
     """
@@ -269,8 +275,10 @@ def is_lv(dev, lvs=None):
     splitname = dmsetup_splitname(dev)
     # Allowing to optionally pass `lvs` can help reduce repetitive checks for
     # multiple devices at once.
-    lvs = lvs if lvs is not None else Volumes()
     if splitname.get('LV_NAME'):
+        if lvs is None:
+            lvs = _volumes(lv_name=splitname['LV_NAME'],
+                           vg_name=splitname['VG_NAME'])
         lvs.filter(lv_name=splitname['LV_NAME'], vg_name=splitname['VG_NAME'])
         return len(lvs) > 0
     return False
@@ -340,6 +348,229 @@ def get_api_pvs():
     return _output_parser(stdout, fields)
 
 
+class Inventory(object):
+    """
+    The logical volumes, physical volumes and volume groups of the system,
+    each loaded with a single ``lvs``, ``pvs`` and ``vgs`` call the first
+    time they are needed, and indexed by name, uuid, path and tag.
+
+    While an inventory is active (see ``inventory()``) every lookup in this
+    module is answered from it, and every mutating command in this module
+    invalidates it, so that the next lookup reloads the LVM state. It can be
+    shared by threads, which will wait for each other to load it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._items = {}
+            self._indexes = {}
+
+    def _get_items(self, kind):
+        with self._lock:
+            if kind not in self._items:
+                self._items[kind] = {
+                    'lvs': get_api_lvs,
+                    'pvs': get_api_pvs,
+                    'vgs': get_api_vgs,
+                }[kind]()
+            return self._items[kind]
+
+    @property
+    def lvs(self):
+        return self._get_items('lvs')
+
+    @property
+    def pvs(self):
+        return self._get_items('pvs')
+
+    @property
+    def vgs(self):
+        return self._get_items('vgs')
+
+    def _index(self, kind, field):
+        """
+        Map the values of ``field`` to the items having them. The ``*_tags``
+        fields are indexed by each of their ``key=value`` tags.
+        """
+        with self._lock:
+            index = self._indexes.get((kind, field))
+            if index is None:
+                index = {}
+                for item in self._get_items(kind):
+                    if field.endswith('_tags'):
+                        keys = ['%s=%s' % tag
+                                for tag in parse_tags(item.get(field, '')).items()]
+                    else:
+                        keys = [item.get(field)]
+                    for key in keys:
+                        index.setdefault(key, []).append(item)
+                self._indexes[(kind, field)] = index
+            return index
+
+    def _find(self, kind, filters, tags_field):
+        """
+        Narrow down the items possibly matching ``filters`` using the index of
+        the first filter given, the caller is still expected to apply all of
+        them.
+        """
+        for field, value in filters:
+            if not value:
+                continue
+            if field == tags_field:
+                # all the tags have to match, so any of them will do
+                value = '%s=%s' % sorted(
+                    (k, str(v)) for k, v in value.items())[0]
+            return self._index(kind, field).get(value, [])
+        return self._get_items(kind)
+
+    def update_tags(self, kind, field, value, tags):
+        """
+        Replace the tags of the cached items whose ``field`` is ``value``,
+        after they were changed by this process, instead of reloading
+        everything.
+        """
+        tags_field = '%s_tags' % kind[:2]
+        with self._lock:
+            for item in self._items.get(kind, []):
+                if item.get(field) == value:
+                    item[tags_field] = tags
+            self._indexes.pop((kind, tags_field), None)
+
+    def find_lvs(self, lv_name=None, vg_name=None, lv_path=None, lv_uuid=None, lv_tags=None):
+        return self._find('lvs', [
+            ('lv_uuid', lv_uuid), ('lv_path', lv_path), ('lv_name', lv_name),
+            ('vg_name', vg_name), ('lv_tags', lv_tags)], 'lv_tags')
+
+    def find_pvs(self, pv_name=None, pv_uuid=None, pv_tags=None):
+        return self._find('pvs', [
+            ('pv_uuid', pv_uuid), ('pv_name', pv_name), ('pv_tags', pv_tags)],
+            'pv_tags')
+
+    def find_vgs(self, vg_name=None, vg_tags=None):
+        return self._find('vgs', [
+            ('vg_name', vg_name), ('vg_tags', vg_tags)], 'vg_tags')
+
+
+@contextmanager
+def inventory():
+    """
+    Answer all the LVM lookups made within the context from a single
+    ``Inventory``, for example for the duration of a ceph-volume command.
+    """
+    global _inventory
+    previous = _inventory
+    _inventory = Inventory()
+    try:
+        yield _inventory
+    finally:
+        _inventory = previous
+
+
+def invalidate():
+    """
+    Drop the LVM state cached by the active inventory, if any. Must be called
+    after any command changing LVs, PVs, VGs or their tags.
+
+    Since these commands also change what ``lsblk`` reports, the active device
+    snapshot (see ``disk.snapshot()``) is dropped as well.
+    """
+    if _inventory is not None:
+        _inventory.invalidate()
+    disk.invalidate()
+
+
+def _tag_changes(command, path, tag_string, current, tags=None, clear=False):
+    """
+    Build a single ``lvchange`` or ``pvchange`` call applying all the tag
+    changes of an LV or PV, deleting the current value of every tag that is
+    set to a different one.
+
+    :param command: ``lvchange`` or ``pvchange``
+    :param path: The path of the LV, or the name of the PV
+    :param tag_string: The current comma-separated tags, as reported by LVM
+    :param current: The current ``ceph.`` tags, as a dictionary
+    :param tags: A dictionary of the ``ceph.`` tags to set
+    :param clear: Delete all the current ``ceph.`` tags instead
+    :returns: A tuple of the command (``None`` if there is nothing to change)
+              and the resulting comma-separated tags
+    """
+    deleted = []
+    added = []
+    if clear:
+        deleted = ['%s=%s' % tag for tag in sorted(current.items())]
+    else:
+        for key, value in sorted(tags.items()):
+            value = '%s' % value
+            if current.get(key) == value:
+                continue
+            if current.get(key):
+                deleted.append('%s=%s' % (key, current[key]))
+            added.append('%s=%s' % (key, value))
+    if not deleted and not added:
+        return None, tag_string
+
+    args = [command]
+    for tag in deleted:
+        args.extend(['--deltag', tag])
+    for tag in added:
+        args.extend(['--addtag', tag])
+    args.append(path)
+
+    new_tags = [t for t in (tag_string or '').split(',') if t and t not in deleted]
+    return args, ','.join(new_tags + added)
+
+
+def _volumes(**filters):
+    if _inventory is not None:
+        return Volumes(lv_items=_inventory.find_lvs(**filters))
+    return Volumes()
+
+
+def _pvolumes(**filters):
+    if _inventory is not None:
+        return PVolumes(pv_items=_inventory.find_pvs(**filters))
+    return PVolumes()
+
+
+def _volume_groups(**filters):
+    if _inventory is not None:
+        return VolumeGroups(vg_items=_inventory.find_vgs(**filters))
+    return VolumeGroups()
+
+
+def get_lvs(lv_name=None, vg_name=None, lv_path=None, lv_uuid=None, lv_tags=None):
+    """
+    Return a ``Volumes`` object with the lvs of the current system matching
+    all the arguments given (or all of them if none is), answered from the
+    inventory if one is active. See ``Volumes.filter`` for the arguments.
+    """
+    filters = dict(
+        lv_name=lv_name, vg_name=vg_name, lv_path=lv_path, lv_uuid=lv_uuid,
+        lv_tags=lv_tags
+    )
+    lvs = _volumes(**filters)
+    if any(filters.values()):
+        lvs.filter(**filters)
+    return lvs
+
+
+def get_pvs(pv_name=None, pv_uuid=None, pv_tags=None):
+    """
+    Return a ``PVolumes`` object with the pvs of the current system matching
+    all the arguments given (or all of them if none is), answered from the
+    inventory if one is active. See ``PVolumes.filter`` for the arguments.
+    """
+    filters = dict(pv_name=pv_name, pv_uuid=pv_uuid, pv_tags=pv_tags)
+    pvs = _pvolumes(**filters)
+    if any(filters.values()):
+        pvs.filter(**filters)
+    return pvs
+
+
 def get_lv_from_argument(argument):
     """
     Helper proxy function that consumes a possible logical volume passed in from the CLI
@@ -368,7 +599,10 @@ def get_lv(lv_name=None, vg_name=None, lv_path=None, lv_uuid=None, lv_tags=None)
     """
     if not any([lv_name, vg_name, lv_path, lv_uuid, lv_tags]):
         return None
-    lvs = Volumes()
+    lvs = _volumes(
+        lv_name=lv_name, vg_name=vg_name, lv_path=lv_path, lv_uuid=lv_uuid,
+        lv_tags=lv_tags
+    )
     return lvs.get(
         lv_name=lv_name, vg_name=vg_name, lv_path=lv_path, lv_uuid=lv_uuid,
         lv_tags=lv_tags
@@ -383,7 +617,7 @@ def get_pv(pv_name=None, pv_uuid=None, pv_tags=None):
     """
     if not any([pv_name, pv_uuid, pv_tags]):
         return None
-    pvs = PVolumes()
+    pvs = _pvolumes(pv_name=pv_name, pv_uuid=pv_uuid, pv_tags=pv_tags)
     return pvs.get(pv_name=pv_name, pv_uuid=pv_uuid, pv_tags=pv_tags)
 
 
@@ -399,6 +633,7 @@ def create_pv(device):
         '--yes', # answer yes to any prompts
         device
     ])
+    invalidate()
 
 
 def create_vg(devices, name=None, name_prefix=None):
@@ -429,6 +664,7 @@ def create_vg(devices, name=None, name_prefix=None):
         '--yes',
         name] + devices
     )
+    invalidate()
 
     vg = get_vg(vg_name=name)
     return vg
@@ -454,6 +690,7 @@ def extend_vg(vg, devices):
         '--yes',
         vg.name] + devices
     )
+    invalidate()
 
     vg = get_vg(vg_name=vg.name)
     return vg
@@ -473,6 +710,7 @@ def remove_vg(vg_name):
         ],
         fail_msg=fail_msg,
     )
+    invalidate()
 
 
 def remove_pv(pv_name):
@@ -500,6 +738,7 @@ def remove_pv(pv_name):
         ],
         fail_msg=fail_msg,
     )
+    invalidate()
 
 
 def remove_lv(path):
@@ -519,6 +758,7 @@ def remove_lv(path):
         show_command=True,
         terminal_verbose=True,
     )
+    invalidate()
     if returncode != 0:
         raise RuntimeError("Unable to remove %s" % path)
     return True
@@ -583,17 +823,17 @@ def create_lv(name, group, extents=None, size=None, tags=None, uuid_name=False):
             '100%FREE',
             '-n', name, group
         ])
+    invalidate()
 
     lv = get_lv(lv_name=name, vg_name=group)
-    lv.set_tags(tags)
 
     # when creating a distinct type, the caller doesn't know what the path will
-    # be so this function will set it after creation using the mapping
+    # be so this function will set it after creation using the mapping, along
+    # with the rest of the tags
     path_tag = type_path_tag.get(tags.get('ceph.type'))
     if path_tag:
-        lv.set_tags(
-            {path_tag: lv.lv_path}
-        )
+        tags = dict(tags, **{path_tag: lv.lv_path})
+    lv.set_tags(tags)
     return lv
 
 
@@ -651,7 +891,7 @@ def get_vg(vg_name=None, vg_tags=None):
     """
     if not any([vg_name, vg_tags]):
         return None
-    vgs = VolumeGroups()
+    vgs = _volume_groups(vg_name=vg_name, vg_tags=vg_tags)
     return vgs.get(vg_name=vg_name, vg_tags=vg_tags)
 
 
@@ -661,12 +901,14 @@ class VolumeGroups(list):
     to filter them via keyword arguments.
     """
 
-    def __init__(self):
-        self._populate()
+    def __init__(self, vg_items=None):
+        self._populate(vg_items)
 
-    def _populate(self):
-        # get all the vgs in the current system
-        for vg_item in get_api_vgs():
+    def _populate(self, vg_items=None):
+        # get all the vgs in the current system, unless given
+        if vg_items is None:
+            vg_items = _inventory.vgs if _inventory is not None else get_api_vgs()
+        for vg_item in vg_items:
             self.append(VolumeGroup(**vg_item))
 
     def _purge(self):
@@ -757,12 +999,14 @@ class Volumes(list):
     to filter them via keyword arguments.
     """
 
-    def __init__(self):
-        self._populate()
+    def __init__(self, lv_items=None):
+        self._populate(lv_items)
 
-    def _populate(self):
-        # get all the lvs in the current system
-        for lv_item in get_api_lvs():
+    def _populate(self, lv_items=None):
+        # get all the lvs in the current system, unless given
+        if lv_items is None:
+            lv_items = _inventory.lvs if _inventory is not None else get_api_lvs()
+        for lv_item in lv_items:
             self.append(Volume(**lv_item))
 
     def _purge(self):
@@ -864,12 +1108,14 @@ class PVolumes(list):
     to filter them via keyword arguments.
     """
 
-    def __init__(self):
-        self._populate()
+    def __init__(self, pv_items=None):
+        self._populate(pv_items)
 
-    def _populate(self):
-        # get all the pvs in the current system
-        for pv_item in get_api_pvs():
+    def _populate(self, pv_items=None):
+        # get all the pvs in the current system, unless given
+        if pv_items is None:
+            pv_items = _inventory.pvs if _inventory is not None else get_api_pvs()
+        for pv_item in pv_items:
             self.append(PVolume(**pv_item))
 
     def _purge(self):
@@ -1094,13 +1340,26 @@ class Volume(object):
         obj['path'] = self.lv_path
         return obj
 
+    def _tags_changed(self, lv_tags):
+        self.lv_tags = self.lv_api['lv_tags'] = lv_tags
+        self.tags = parse_tags(lv_tags)
+        if _inventory is not None:
+            _inventory.update_tags('lvs', 'lv_path', self.lv_path, lv_tags)
+
     def clear_tags(self):
         """
-        Removes all tags from the Logical Volume.
+        Removes all tags from the Logical Volume, with a single ``lvchange``
+        call.
         """
-        for k, v in self.tags.items():
-            tag = "%s=%s" % (k, v)
-            process.run(['lvchange', '--deltag', tag, self.lv_path])
+        command, lv_tags = _tag_changes(
+            'lvchange', self.lv_path, self.lv_api.get('lv_tags'), self.tags, clear=True)
+        if command:
+            try:
+                process.run(command)
+            except Exception:
+                invalidate()
+                raise
+            self._tags_changed(lv_tags)
 
     def set_tags(self, tags):
         """
@@ -1111,34 +1370,31 @@ class Volume(object):
                 "ceph.osd_id": "0"
             }
 
-        At the end of all modifications, the tags are refreshed to reflect
-        LVM's most current view.
+        All the tags are changed with a single ``lvchange`` call, after which
+        the tags of the current object (and of the inventory, if active)
+        reflect the changes. Tags that already have the requested value are
+        left untouched.
         """
-        for k, v in tags.items():
-            self.set_tag(k, v)
-        # after setting all the tags, refresh them for the current object, use the
-        # lv_* identifiers to filter because those shouldn't change
-        lv_object = get_lv(lv_name=self.lv_name, lv_path=self.lv_path)
-        self.tags = lv_object.tags
+        command, lv_tags = _tag_changes(
+            'lvchange', self.lv_path, self.lv_api.get('lv_tags'), self.tags, tags)
+        if not command:
+            return
+        stdout, stderr, returncode = process.call(command)
+        if returncode != 0:
+            # some of the changes may have been applied, get LVM's current view
+            logger.warning('unable to set tags on %s: %s', self.lv_path, ' '.join(stderr))
+            invalidate()
+            lv_object = get_lv(lv_name=self.lv_name, lv_path=self.lv_path)
+            if lv_object:
+                self.tags = lv_object.tags
+            return
+        self._tags_changed(lv_tags)
 
     def set_tag(self, key, value):
         """
-        Set the key/value pair as an LVM tag. Does not "refresh" the values of
-        the current object for its tags. Meant to be a "fire and forget" type
-        of modification.
+        Set the key/value pair as an LVM tag.
         """
-        # remove it first if it exists
-        if self.tags.get(key):
-            current_value = self.tags[key]
-            tag = "%s=%s" % (key, current_value)
-            process.call(['lvchange', '--deltag', tag, self.lv_api['lv_path']])
-
-        process.call(
-            [
-                'lvchange',
-                '--addtag', '%s=%s' % (key, value), self.lv_path
-            ]
-        )
+        self.set_tags({key: value})
 
 
 class PVolume(object):
@@ -1169,36 +1425,35 @@ class PVolume(object):
                 "ceph.osd_id": "0"
             }
 
-        At the end of all modifications, the tags are refreshed to reflect
-        LVM's most current view.
+        All the tags are changed with a single ``pvchange`` call, after which
+        the tags of the current object (and of the inventory, if active)
+        reflect the changes.
         """
-        for k, v in tags.items():
-            self.set_tag(k, v)
-        # after setting all the tags, refresh them for the current object, use the
-        # pv_* identifiers to filter because those shouldn't change
-        pv_object = get_pv(pv_name=self.pv_name, pv_uuid=self.pv_uuid)
-        self.tags = pv_object.tags
+        command, pv_tags = _tag_changes(
+            'pvchange', self.pv_name, self.pv_api.get('pv_tags'), self.tags, tags)
+        if not command:
+            return
+        stdout, stderr, returncode = process.call(command)
+        if returncode != 0:
+            # some of the changes may have been applied, get LVM's current view
+            logger.warning('unable to set tags on %s: %s', self.pv_name, ' '.join(stderr))
+            invalidate()
+            pv_object = get_pv(pv_name=self.pv_name, pv_uuid=self.pv_uuid)
+            if pv_object:
+                self.tags = pv_object.tags
+            return
+        self.pv_tags = self.pv_api['pv_tags'] = pv_tags
+        self.tags = parse_tags(pv_tags)
+        if _inventory is not None:
+            _inventory.update_tags('pvs', 'pv_name', self.pv_name, pv_tags)
 
     def set_tag(self, key, value):
         """
-        Set the key/value pair as an LVM tag. Does not "refresh" the values of
-        the current object for its tags. Meant to be a "fire and forget" type
-        of modification.
+        Set the key/value pair as an LVM tag.
 
         **warning**: Altering tags on a PV has to be done ensuring that the
         device is actually the one intended. ``pv_name`` is *not* a persistent
         value, only ``pv_uuid`` is. Using ``pv_uuid`` is the best way to make
         sure the device getting changed is the one needed.
         """
-        # remove it first if it exists
-        if self.tags.get(key):
-            current_value = self.tags[key]
-            tag = "%s=%s" % (key, current_value)
-            process.call(['pvchange', '--deltag', tag, self.pv_name])
-
-        process.call(
-            [
-                'pvchange',
-                '--addtag', '%s=%s' % (key, value), self.pv_name
-            ]
-        )
+        self.set_tags({key: value})
@@ -4,7 +4,7 @@ import logging
 import os
 from textwrap import dedent
 from ceph_volume import process, conf, decorators, terminal, __release__
-from ceph_volume.util import system, disk
+from ceph_volume.util import system, disk, run_concurrently
 from ceph_volume.util import prepare as prepare_utils
 from ceph_volume.util import encryption as encryption_utils
 from ceph_volume.systemd import systemctl
@@ -205,22 +205,71 @@ class Activate(object):
             # the metadata for all devices in each OSD will contain
             # the FSID which is required for activation
             for device in devices:
-                fsid = device.get('tags', {}).get('ceph.osd_fsid')
+                tags = device.get('tags', {})
+                fsid = tags.get('ceph.osd_fsid')
                 if fsid:
-                    osds[fsid] = osd_id
+                    osds[fsid] = (osd_id, tags.get('ceph.cluster_name', conf.cluster))
                     break
         if not osds:
             terminal.warning('Was unable to find any OSDs to activate')
             terminal.warning('Verify OSDs are present with "ceph-volume lvm list"')
             return
-        for osd_fsid, osd_id in osds.items():
+        pending = {}
+        for osd_fsid, (osd_id, cluster_name) in osds.items():
             if systemctl.osd_is_active(osd_id):
                 terminal.warning(
                     'OSD ID %s FSID %s process is active. Skipping activation' % (osd_id, osd_fsid)
                 )
             else:
-                terminal.info('Activating OSD ID %s FSID %s' % (osd_id, osd_fsid))
-                self.activate(args, osd_id=osd_id, osd_fsid=osd_fsid)
+                pending.setdefault(cluster_name, []).append((osd_id, osd_fsid))
+        if not pending:
+            return
+
+        # the paths of an OSD are built from the global ``conf.cluster``, so
+        # only the OSDs of one cluster are activated at a time
+        results = []
+        for cluster_name in sorted(pending):
+            conf.cluster = cluster_name
+            results.extend(self.activate_many(args, pending[cluster_name]))
+        failed = []
+        for osd_id, osd_fsid, elapsed, error in results:
+            if error is None:
+                terminal.info('Activated OSD ID %s FSID %s in %.1fs' % (osd_id, osd_fsid, elapsed))
+            else:
+                failed.append(osd_id)
+                terminal.error(
+                    'Failed to activate OSD ID %s FSID %s after %.1fs: %s' % (
+                        osd_id, osd_fsid, elapsed, error)
+                )
+        if failed:
+            raise RuntimeError('Unable to activate %s of %s OSDs: %s' % (
+                len(failed), len(results), ', '.join('osd.%s' % i for i in failed)))
+
+    def activate_many(self, args, osds):
+        """
+        Activate each of ``osds``, a list of ``(osd_id, osd_fsid)`` tuples,
+        with up to ``args.jobs`` of them at a time. A failure does not stop
+        the activation of the other OSDs.
+
+        All the activations share the LVM inventory of the command, so LVM is
+        only queried once for all of them. All of ``osds`` must belong to the
+        cluster in ``conf.cluster``, which every activation sets from the tags
+        of its OSD.
+
+        :returns: A list of ``(osd_id, osd_fsid, seconds, error)`` tuples, in
+                  the order of ``osds``, where ``error`` is ``None`` for
+                  the OSDs that were activated
+        """
+        def activate_osd(osd):
+            osd_id, osd_fsid = osd
+            terminal.info('Activating OSD ID %s FSID %s' % (osd_id, osd_fsid))
+            self.activate(args, osd_id=osd_id, osd_fsid=osd_fsid)
+
+        results = run_concurrently(activate_osd, osds, jobs=getattr(args, 'jobs', 1))
+        return [
+            (osd_id, osd_fsid, elapsed, error)
+            for (osd_id, osd_fsid), (elapsed, error) in zip(osds, results)
+        ]
 
     @decorators.needs_root
     def activate(self, args, osd_id=None, osd_fsid=None):
@@ -232,12 +281,13 @@ class Activate(object):
         osd_id = osd_id if osd_id is not None else args.osd_id
         osd_fsid = osd_fsid if osd_fsid is not None else args.osd_fsid
 
-        lvs = api.Volumes()
         # filter them down for the OSD ID and FSID we need to activate
         if osd_id and osd_fsid:
-            lvs.filter(lv_tags={'ceph.osd_id': osd_id, 'ceph.osd_fsid': osd_fsid})
+            lvs = api.get_lvs(lv_tags={'ceph.osd_id': osd_id, 'ceph.osd_fsid': osd_fsid})
         elif osd_fsid and not osd_id:
-            lvs.filter(lv_tags={'ceph.osd_fsid': osd_fsid})
+            lvs = api.get_lvs(lv_tags={'ceph.osd_fsid': osd_fsid})
+        else:
+            lvs = api.get_lvs()
         if not lvs:
             raise RuntimeError('could not find osd.%s with fsid %s' % (osd_id, osd_fsid))
         # This argument is only available when passed in directly or via
@@ -272,6 +322,10 @@ class Activate(object):
 
             ceph-volume lvm activate --all
 
+        Use ``--jobs`` to activate several OSDs at a time:
+
+            ceph-volume lvm activate --all --jobs 8
+
         """)
         parser = argparse.ArgumentParser(
             prog='ceph-volume lvm activate',
@@ -312,6 +366,12 @@ class Activate(object):
             action='store_true',
             help='Activate all OSDs found in the system',
         )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='With --all, the number of OSDs to activate concurrently (default: 1)',
+        )
         parser.add_argument(
             '--no-systemd',
             dest='no_systemd',
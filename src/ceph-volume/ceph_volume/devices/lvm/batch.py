@@ -1,6 +1,6 @@
 import argparse
 from textwrap import dedent
-from ceph_volume import terminal, decorators
+from ceph_volume import terminal, decorators, sys_info
 from ceph_volume.util import disk, prompt_bool
 from ceph_volume.util import arg_validators
 from . import strategies
@@ -113,13 +113,17 @@ class Batch(object):
         self.argv = argv
 
     def get_devices(self):
-        all_devices = disk.get_devices()
+        # share the devices found with the ones the arguments were validated
+        # against
+        if not sys_info.devices:
+            sys_info.devices = disk.get_devices()
         # remove devices with partitions
         # XXX Should be optional when getting device info
-        for device, detail in all_devices.items():
-            if detail.get('partitions') != {}:
-                del all_devices[device]
-        devices = sorted(all_devices.items(), key=lambda x: (x[0], x[1]['size']))
+        all_devices = [
+            (device, detail) for device, detail in sys_info.devices.items()
+            if detail.get('partitions') == {}
+        ]
+        devices = sorted(all_devices, key=lambda x: (x[0], x[1]['size']))
         return device_formatter(devices)
 
     def print_help(self):
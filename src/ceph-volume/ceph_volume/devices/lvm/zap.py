@@ -1,15 +1,28 @@
 import argparse
+import fcntl
 import logging
+import os
+import stat
+import struct
+import threading
 
 from textwrap import dedent
 
 from ceph_volume import decorators, terminal, process
 from ceph_volume.api import lvm as api
-from ceph_volume.util import system, encryption, disk
+from ceph_volume.util import system, encryption, disk, run_concurrently
 
 logger = logging.getLogger(__name__)
 mlogger = terminal.MultiLogger(__name__)
 
+# ioctls from linux/fs.h
+BLKGETSIZE64 = 0x80081272
+BLKDISCARD = 0x1277
+BLKZEROOUT = 0x127f
+
+# how much of the start of a device gets zeroed
+ZAP_SIZE = 10 * 1024 * 1024
+
 
 def wipefs(path):
     """
@@ -22,20 +35,65 @@ def wipefs(path):
     ])
 
 
-def zap_data(path):
+def supports_discard(path):
+    """
+    Tell if the device at ``path`` supports discards, from the maximum size
+    of a discard reported by ``lsblk``.
+    """
+    return disk.lsblk(path).get('DISC-MAX', '0B') not in ('', '0', '0B')
+
+
+def _block_range_ioctl(fd, request, start, length):
+    fcntl.ioctl(fd, request, struct.pack('=QQ', start, length))
+
+
+def zap_data(path, discard=False):
     """
     Clears all data from the given path. Path should be
     an absolute path to an lv or partition.
 
-    10M of data is written to the path to make sure that
-    there is no trace left of any previous Filesystem.
+    10M of data (or the whole device if smaller) are zeroed to make sure
+    that there is no trace left of any previous Filesystem. For block
+    devices this is done with the ``BLKZEROOUT`` ioctl, which lets the device
+    zero the range itself when it can, falling back to ``dd`` otherwise.
+
+    :param discard: Also discard the whole device first, if it supports it
     """
+    size = None
+    try:
+        fd = os.open(path, os.O_WRONLY)
+    except OSError as error:
+        logger.info('unable to open %s, falling back to dd: %s', path, error)
+        fd = None
+    if fd is not None:
+        try:
+            if stat.S_ISBLK(os.fstat(fd).st_mode):
+                size = struct.unpack('=Q', fcntl.ioctl(fd, BLKGETSIZE64, b'\0' * 8))[0]
+                if discard and supports_discard(path):
+                    mlogger.info('Discarding all the blocks of %s', path)
+                    try:
+                        _block_range_ioctl(fd, BLKDISCARD, 0, size)
+                    except (IOError, OSError) as error:
+                        logger.warning('unable to discard %s: %s', path, error)
+                try:
+                    _block_range_ioctl(fd, BLKZEROOUT, 0, min(ZAP_SIZE, size))
+                    return
+                except (IOError, OSError) as error:
+                    logger.info('unable to zero %s, falling back to dd: %s', path, error)
+        finally:
+            os.close(fd)
+
+    if size is not None and size < ZAP_SIZE:
+        # writing past the end of the device would fail
+        block_size, count = 512, size // 512
+    else:
+        block_size, count = '1M', 10
     process.run([
         'dd',
         'if=/dev/zero',
         'of={path}'.format(path=path),
-        'bs=1M',
-        'count=10',
+        'bs={}'.format(block_size),
+        'count={}'.format(count),
     ])
 
 
@@ -45,6 +103,8 @@ class Zap(object):
 
     def __init__(self, argv):
         self.argv = argv
+        # devices zapped concurrently can be PVs of the same VG
+        self.lvm_lock = threading.Lock()
 
     def unmount_lv(self, lv):
         if lv.tags.get('ceph.cluster_name') and lv.tags.get('ceph.osd_id'):
@@ -65,53 +125,75 @@ class Zap(object):
             if disk.is_mapper_device(device):
                 terminal.error("Refusing to zap the mapper device: {}".format(device))
                 raise SystemExit(1)
-            lv = api.get_lv_from_argument(device)
+
+        def zap_device(device):
+            self.zap_device(device, destroy=args.destroy, discard=args.discard)
+
+        results = run_concurrently(zap_device, args.devices, jobs=args.jobs)
+        failed = []
+        for device, (elapsed, error) in zip(args.devices, results):
+            if error is None:
+                logger.info('zapped %s in %.1fs', device, elapsed)
+            else:
+                failed.append(device)
+                terminal.error('Unable to zap %s: %s' % (device, error))
+        if failed:
+            raise RuntimeError('Unable to zap %s of %s devices: %s' % (
+                len(failed), len(args.devices), ', '.join(failed)))
+
+        terminal.success("Zapping successful for: %s" % ", ".join(args.devices))
+
+    def zap_device(self, device, destroy=False, discard=False):
+        lv = api.get_lv_from_argument(device)
+        if lv:
+            # we are zapping a logical volume
+            path = lv.lv_path
+            self.unmount_lv(lv)
+        else:
+            # we are zapping a partition
+            #TODO: ensure device is a partition
+            path = device
+            # check to if it is encrypted to close
+            partuuid = disk.get_partuuid(device)
+            if encryption.status("/dev/mapper/{}".format(partuuid)):
+                dmcrypt_uuid = partuuid
+                self.dmcrypt_close(dmcrypt_uuid)
+
+        mlogger.info("Zapping: %s", path)
+
+        # check if there was a pv created with the
+        # name of device
+        pvs = api.get_pvs(pv_name=device)
+        vgs = set([pv.vg_name for pv in pvs])
+        for pv in pvs:
+            vg_name = pv.vg_name
+            lv = None
+            if pv.lv_uuid:
+                lv = api.get_lv(vg_name=vg_name, lv_uuid=pv.lv_uuid)
+
             if lv:
-                # we are zapping a logical volume
-                path = lv.lv_path
                 self.unmount_lv(lv)
-            else:
-                # we are zapping a partition
-                #TODO: ensure device is a partition
-                path = device
-                # check to if it is encrypted to close
-                partuuid = disk.get_partuuid(device)
-                if encryption.status("/dev/mapper/{}".format(partuuid)):
-                    dmcrypt_uuid = partuuid
-                    self.dmcrypt_close(dmcrypt_uuid)
-
-            mlogger.info("Zapping: %s", path)
-
-            # check if there was a pv created with the
-            # name of device
-            pvs = api.PVolumes()
-            pvs.filter(pv_name=device)
-            vgs = set([pv.vg_name for pv in pvs])
-            for pv in pvs:
-                vg_name = pv.vg_name
-                lv = None
-                if pv.lv_uuid:
-                    lv = api.get_lv(vg_name=vg_name, lv_uuid=pv.lv_uuid)
-
-                if lv:
-                    self.unmount_lv(lv)
-
-            if args.destroy:
+
+        if destroy:
+            with self.lvm_lock:
                 for vg_name in vgs:
+                    if api.get_vg(vg_name=vg_name) is None:
+                        logger.info('volume group %s was already destroyed', vg_name)
+                        continue
                     mlogger.info("Destroying volume group %s because --destroy was given", vg_name)
                     api.remove_vg(vg_name)
                 if not lv:
                     mlogger.info("Destroying physical volume %s because --destroy was given", device)
                     api.remove_pv(device)
 
-            wipefs(path)
-            zap_data(path)
+        wipefs(path)
+        zap_data(path, discard=discard)
+        # the filesystems and partition tables are gone
+        disk.invalidate()
 
-            if lv and not pvs:
-                # remove all lvm metadata
-                lv.clear_tags()
-
-        terminal.success("Zapping successful for: %s" % ", ".join(args.devices))
+        if lv and not pvs:
+            # remove all lvm metadata
+            lv.clear_tags()
 
     def dmcrypt_close(self, dmcrypt_uuid):
         dmcrypt_path = "/dev/mapper/{}".format(dmcrypt_uuid)
@@ -157,6 +239,11 @@ class Zap(object):
         If the --destroy flag is given and you are zapping an lv then the lv is still
         kept intact for reuse.
 
+        Many devices can be zapped at the same time with --jobs, and the whole
+        device can be discarded (when it supports it) with --discard:
+
+          ceph-volume lvm zap /dev/sda /dev/sdb /dev/sdc --jobs 3 --discard
+
         """)
         parser = argparse.ArgumentParser(
             prog='ceph-volume lvm zap',
@@ -177,6 +264,18 @@ class Zap(object):
             default=False,
             help='Destroy all volume groups and logical volumes if you are zapping a raw device or partition',
         )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='The number of devices to zap concurrently (default: 1)',
+        )
+        parser.add_argument(
+            '--discard',
+            action='store_true',
+            default=False,
+            help='Discard all the blocks of devices that support it, before zeroing their start',
+        )
         if len(self.argv) == 0:
             print(sub_command_help)
             return
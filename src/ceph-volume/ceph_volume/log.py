@@ -27,6 +27,13 @@ def setup(name='ceph-volume.log', log_path=None):
         conf.log_path = tmp_log_file
         fh = logging.FileHandler(tmp_log_file)
 
+    # setting up logging more than once in the same process (e.g. when
+    # ceph-volume-systemd retries a trigger) must not duplicate every line
+    for handler in root_logger.handlers:
+        if getattr(handler, 'baseFilename', None) == fh.baseFilename:
+            fh.close()
+            return
+
     fh.setLevel(logging.DEBUG)
     fh.setFormatter(logging.Formatter(FILE_FORMAT))
 
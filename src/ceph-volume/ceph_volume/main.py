@@ -8,6 +8,8 @@ import logging
 import ceph_volume
 from ceph_volume.decorators import catches
 from ceph_volume import log, devices, configuration, conf, exceptions, terminal
+from ceph_volume.api import lvm as lvm_api
+from ceph_volume.util import disk
 
 
 class Volume(object):
@@ -152,8 +154,10 @@ Ceph Conf: {ceph_path}
             # (like reading from lvm tags)
             logger.exception('ignoring inability to load ceph.conf')
             terminal.red(error)
-        # dispatch to sub-commands
-        terminal.dispatch(self.mapper, subcommand_args)
+        # dispatch to sub-commands, with LVM and lsblk queried once per
+        # invocation
+        with lvm_api.inventory(), disk.snapshot():
+            terminal.dispatch(self.mapper, subcommand_args)
 
 
 def _load_library_extensions():
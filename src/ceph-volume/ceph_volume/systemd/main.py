@@ -7,8 +7,13 @@ import os
 import sys
 import time
 import logging
-from ceph_volume import log, process
+from ceph_volume import log
+from ceph_volume.api import lvm as api
 from ceph_volume.exceptions import SuffixParsingError
+from ceph_volume.util.system import DirectoryWatch
+
+# where the device nodes of LVs (and the disks backing them) show up
+WATCHED_PATHS = ['/dev/mapper', '/dev/disk/by-id']
 
 
 def parse_subcommand(string):
@@ -92,17 +97,81 @@ def main(args=None):
     logger.info('parsed sub-command: %s, extra data: %s', sub_command, extra_data)
     command = ['ceph-volume', sub_command, 'trigger', extra_data]
 
-    tries = os.environ.get('CEPH_VOLUME_SYSTEMD_TRIES', 30)
-    interval = os.environ.get('CEPH_VOLUME_SYSTEMD_INTERVAL', 5)
-    while tries > 0:
-        try:
-            # don't log any output to the terminal, just rely on stderr/stdout
-            # going to logging
-            process.run(command, terminal_logging=False)
-            logger.info('successfully trggered activation for: %s', extra_data)
-            break
-        except RuntimeError as error:
-            logger.warning(error)
-            logger.warning('failed activating OSD, retries left: %s', tries)
-            tries -= 1
-            time.sleep(interval)
+    tries = int(os.environ.get('CEPH_VOLUME_SYSTEMD_TRIES', 30))
+    interval = float(os.environ.get('CEPH_VOLUME_SYSTEMD_INTERVAL', 5))
+    deadline = time.time() + tries * interval
+    is_ready = get_readiness_check(sub_command, extra_data)
+
+    with DirectoryWatch(WATCHED_PATHS) as watch:
+        for delay in backoff(interval):
+            if is_ready():
+                try:
+                    trigger(command)
+                    logger.info('successfully triggered activation for: %s', extra_data)
+                    return
+                except RuntimeError as error:
+                    logger.warning(error)
+                    logger.warning('failed activating OSD')
+            else:
+                logger.info('waiting for the devices of %s to show up', extra_data)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            # wake up early when devices show up, otherwise back off
+            watch.wait(min(delay, remaining))
+    logger.error('giving up on activating %s after %ss', extra_data, tries * interval)
+
+
+def backoff(interval, start=0.5):
+    """
+    Yield the delays to wait between attempts: starting at ``start`` seconds
+    and doubling every time, up to ``interval`` seconds.
+    """
+    delay = min(start, interval)
+    while True:
+        yield delay
+        delay = min(delay * 2, interval)
+
+
+def get_readiness_check(sub_command, extra_data):
+    """
+    Return a callable telling whether what the OSD needs to be activated is
+    present. For ``lvm``, that is the LV with the ``ceph.osd_fsid`` of the OSD
+    along with its device node. Other sub-commands are always deemed ready, and
+    rely on the activation failing and being retried.
+    """
+    if sub_command != 'lvm':
+        return lambda: True
+    try:
+        osd_id = parse_osd_id(extra_data)
+        osd_fsid = extra_data.split('%s-' % osd_id, 1)[-1]
+    except SuffixParsingError:
+        # let the trigger itself report the error
+        return lambda: True
+
+    def lvm_osd_is_ready():
+        lvs = api.get_lvs(lv_tags={'ceph.osd_id': osd_id, 'ceph.osd_fsid': osd_fsid})
+        return any(
+            lv.tags.get('ceph.type') in ('block', 'data') and os.path.exists(lv.lv_path)
+            for lv in lvs
+        )
+    return lvm_osd_is_ready
+
+
+def trigger(command):
+    """
+    Run ``command`` (like ``['ceph-volume', 'lvm', 'trigger', '<data>']``)
+    within this process, avoiding to start (and import) ``ceph-volume`` all
+    over again for every attempt.
+
+    :raises: ``RuntimeError`` if the command fails
+    """
+    # imported here, as it loads every sub-command and all the plugins
+    from ceph_volume.main import Volume
+    try:
+        Volume(argv=command)
+    except SystemExit as error:
+        if error.code:
+            raise RuntimeError('command returned non-zero exit status: %s' % error.code)
+    except Exception as error:
+        raise RuntimeError('command failed: %s' % error)
@@ -554,7 +554,11 @@ class TestCreateLV(object):
     def setup(self):
         self.foo_volume = api.Volume(lv_name='foo', lv_path='/path', vg_name='foo_group', lv_tags='')
 
+    def setup_method(self, method):
+        self.setup()
+
     def test_uses_size(self, monkeypatch, capture):
+        capture.always_returns = ('', '', 0)
         monkeypatch.setattr(process, 'run', capture)
         monkeypatch.setattr(process, 'call', capture)
         monkeypatch.setattr(api, 'get_lv', lambda *a, **kw: self.foo_volume)
@@ -563,22 +567,31 @@ class TestCreateLV(object):
         assert capture.calls[0]['args'][0] == expected
 
     def test_calls_to_set_type_tag(self, monkeypatch, capture):
+        capture.always_returns = ('', '', 0)
         monkeypatch.setattr(process, 'run', capture)
         monkeypatch.setattr(process, 'call', capture)
         monkeypatch.setattr(api, 'get_lv', lambda *a, **kw: self.foo_volume)
         api.create_lv('foo', 'foo_group', size='5G', tags={'ceph.type': 'data'})
-        ceph_tag = ['lvchange', '--addtag', 'ceph.type=data', '/path']
-        assert capture.calls[1]['args'][0] == ceph_tag
+        ceph_tag = ['--addtag', 'ceph.type=data']
+        assert capture.calls[1]['args'][0][-3:-1] == ceph_tag
 
     def test_calls_to_set_data_tag(self, monkeypatch, capture):
+        capture.always_returns = ('', '', 0)
         monkeypatch.setattr(process, 'run', capture)
         monkeypatch.setattr(process, 'call', capture)
         monkeypatch.setattr(api, 'get_lv', lambda *a, **kw: self.foo_volume)
         api.create_lv('foo', 'foo_group', size='5G', tags={'ceph.type': 'data'})
-        data_tag = ['lvchange', '--addtag', 'ceph.data_device=/path', '/path']
-        assert capture.calls[2]['args'][0] == data_tag
+        data_tag = [
+            'lvchange',
+            '--addtag', 'ceph.data_device=/path',
+            '--addtag', 'ceph.type=data',
+            '/path'
+        ]
+        assert capture.calls[1]['args'][0] == data_tag
+        assert len(capture.calls) == 2
 
     def test_uses_uuid(self, monkeypatch, capture):
+        capture.always_returns = ('', '', 0)
         monkeypatch.setattr(process, 'run', capture)
         monkeypatch.setattr(process, 'call', capture)
         monkeypatch.setattr(api, 'get_lv', lambda *a, **kw: self.foo_volume)
@@ -828,3 +841,116 @@ class TestIsLV(object):
         splitname = {'LV_NAME': 'data', 'VG_NAME': 'ceph'}
         monkeypatch.setattr(api, 'dmsetup_splitname', lambda x: splitname)
         assert api.is_lv('/dev/sda1', lvs=volumes) is True
+
+
+class TestInventory(object):
+
+    def setup_method(self, method):
+        self.lvs = [
+            {'lv_name': 'data', 'vg_name': 'ceph', 'lv_path': '/dev/ceph/data',
+             'lv_uuid': '1111', 'lv_tags': 'ceph.osd_id=0,ceph.type=data'},
+            {'lv_name': 'db', 'vg_name': 'ceph', 'lv_path': '/dev/ceph/db',
+             'lv_uuid': '2222', 'lv_tags': 'ceph.osd_id=0,ceph.type=db'},
+        ]
+        self.calls = []
+
+    def get_api_lvs(self):
+        self.calls.append('lvs')
+        return self.lvs
+
+    def test_lvs_are_loaded_once(self, monkeypatch):
+        monkeypatch.setattr(api, 'get_api_lvs', self.get_api_lvs)
+        with api.inventory():
+            assert api.get_lv(lv_uuid='1111').lv_name == 'data'
+            assert api.get_lv(lv_path='/dev/ceph/db').lv_name == 'db'
+            assert api.get_lv(lv_name='data', vg_name='ceph').lv_uuid == '1111'
+            assert len(api.Volumes()) == 2
+        assert self.calls == ['lvs']
+
+    def test_lookup_by_tags(self, monkeypatch):
+        monkeypatch.setattr(api, 'get_api_lvs', self.get_api_lvs)
+        with api.inventory():
+            lv = api.get_lv(lv_tags={'ceph.osd_id': 0, 'ceph.type': 'db'})
+            assert lv.lv_uuid == '2222'
+            assert api.get_lv(lv_tags={'ceph.osd_id': 1}) is None
+            with pytest.raises(exceptions.MultipleLVsError):
+                api.get_lv(lv_tags={'ceph.osd_id': '0'})
+
+    def test_failed_set_tag_invalidates(self, monkeypatch):
+        monkeypatch.setattr(api, 'get_api_lvs', self.get_api_lvs)
+        monkeypatch.setattr(process, 'call', lambda *a, **kw: ('', [], 5))
+        with api.inventory():
+            lv = api.get_lv(lv_uuid='1111')
+            lv.set_tag('ceph.type', 'block')
+            assert api.get_lv(lv_uuid='1111').tags['ceph.type'] == 'data'
+        assert self.calls == ['lvs', 'lvs']
+
+    def test_not_cached_outside_of_an_inventory(self, monkeypatch):
+        monkeypatch.setattr(api, 'get_api_lvs', self.get_api_lvs)
+        api.get_lv(lv_uuid='1111')
+        api.get_lv(lv_uuid='1111')
+        assert self.calls == ['lvs', 'lvs']
+
+
+class TestSetTags(object):
+
+    def setup_method(self, method):
+        self.lv = api.Volume(
+            lv_name='lv', lv_path='/dev/vg/lv', vg_name='vg',
+            lv_tags='ceph.osd_id=0,ceph.type=data,other=1')
+
+    def test_single_lvchange(self, monkeypatch, capture):
+        capture.always_returns = ('', '', 0)
+        monkeypatch.setattr(process, 'call', capture)
+        self.lv.set_tags({'ceph.osd_id': '1', 'ceph.type': 'data', 'ceph.cluster_name': 'ceph'})
+        assert len(capture.calls) == 1
+        assert capture.calls[0]['args'][0] == [
+            'lvchange',
+            '--deltag', 'ceph.osd_id=0',
+            '--addtag', 'ceph.cluster_name=ceph',
+            '--addtag', 'ceph.osd_id=1',
+            '/dev/vg/lv'
+        ]
+        assert self.lv.tags == {'ceph.osd_id': '1', 'ceph.type': 'data', 'ceph.cluster_name': 'ceph'}
+        assert self.lv.lv_tags == 'ceph.type=data,other=1,ceph.cluster_name=ceph,ceph.osd_id=1'
+
+    def test_unchanged_tags_do_not_call_lvchange(self, monkeypatch, capture):
+        monkeypatch.setattr(process, 'call', capture)
+        self.lv.set_tags({'ceph.osd_id': 0, 'ceph.type': 'data'})
+        assert capture.calls == []
+
+    def test_failure_refreshes_from_lvm(self, monkeypatch, capture):
+        capture.always_returns = ('', ['error'], 5)
+        monkeypatch.setattr(process, 'call', capture)
+        refreshed = api.Volume(lv_name='lv', lv_path='/dev/vg/lv', lv_tags='ceph.osd_id=0')
+        monkeypatch.setattr(api, 'get_lv', lambda **kw: refreshed)
+        self.lv.set_tags({'ceph.type': 'block'})
+        assert self.lv.tags == {'ceph.osd_id': '0'}
+
+    def test_clear_tags_single_lvchange(self, monkeypatch, capture):
+        monkeypatch.setattr(process, 'run', capture)
+        self.lv.clear_tags()
+        assert capture.calls[0]['args'][0] == [
+            'lvchange',
+            '--deltag', 'ceph.osd_id=0',
+            '--deltag', 'ceph.type=data',
+            '/dev/vg/lv'
+        ]
+        assert self.lv.tags == {}
+        assert self.lv.lv_tags == 'other=1'
+
+    def test_updates_the_inventory(self, monkeypatch):
+        calls = []
+
+        def get_api_lvs():
+            calls.append('lvs')
+            return [dict(
+                lv_name='lv', lv_path='/dev/vg/lv', vg_name='vg', lv_uuid='1111',
+                lv_tags='ceph.osd_id=0,ceph.type=data')]
+        monkeypatch.setattr(api, 'get_api_lvs', get_api_lvs)
+        monkeypatch.setattr(process, 'call', lambda *a, **kw: ('', '', 0))
+        with api.inventory():
+            api.get_lv(lv_uuid='1111').set_tags({'ceph.type': 'block'})
+            assert api.get_lv(lv_tags={'ceph.type': 'block'}).lv_uuid == '1111'
+            assert api.get_lv(lv_tags={'ceph.type': 'data'}) is None
+        assert calls == ['lvs']
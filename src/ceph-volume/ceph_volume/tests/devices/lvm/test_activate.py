@@ -1,4 +1,6 @@
+import copy
 import pytest
+import threading
 from ceph_volume.devices.lvm import activate
 from ceph_volume.api import lvm as api
 from ceph_volume.tests.conftest import Capture
@@ -210,6 +212,59 @@ class TestActivateAll(object):
         assert calls[1]['kwargs']['osd_id'] == '1'
         assert calls[1]['kwargs']['osd_fsid'] == 'd0f3e4ad-e52a-4520-afc0-a8789a96ce8b'
 
+    def test_activates_osds_concurrently(self, is_root, monkeypatch):
+        monkeypatch.setattr('ceph_volume.devices.lvm.activate.direct_report', lambda: direct_report)
+        monkeypatch.setattr('ceph_volume.devices.lvm.activate.systemctl.osd_is_active', lambda x: False)
+        started = []
+        both_started = threading.Event()
+        activated = []
+
+        def activate_osd(args, osd_id=None, osd_fsid=None):
+            # would time out if the OSDs were activated one after the other
+            started.append(osd_id)
+            if len(started) == 2:
+                both_started.set()
+            activated.append((osd_id, both_started.wait(5)))
+        activation = activate.Activate(['--all', '--jobs', '2'])
+        activation.activate = activate_osd
+        activation.main()
+        assert sorted(activated) == [('0', True), ('1', True)]
+
+    def test_failures_do_not_stop_other_osds(self, capsys, is_root, monkeypatch):
+        monkeypatch.setattr('ceph_volume.devices.lvm.activate.direct_report', lambda: direct_report)
+        monkeypatch.setattr('ceph_volume.devices.lvm.activate.systemctl.osd_is_active', lambda x: False)
+        activated = []
+
+        def activate_osd(args, osd_id=None, osd_fsid=None):
+            if osd_id == '0':
+                raise RuntimeError('could not find osd.0')
+            activated.append(osd_id)
+        activation = activate.Activate(['--all'])
+        activation.activate = activate_osd
+        with pytest.raises(RuntimeError) as error:
+            activation.main()
+        assert 'Unable to activate 1 of 2 OSDs: osd.0' in str(error.value)
+        assert activated == ['1']
+        out, err = capsys.readouterr()
+        assert 'Failed to activate OSD ID 0' in out
+        assert 'could not find osd.0' in out
+        assert 'Activated OSD ID 1' in out
+
+    def test_activates_one_cluster_at_a_time(self, is_root, monkeypatch):
+        report = copy.deepcopy(direct_report)
+        report['1'][0]['tags']['ceph.cluster_name'] = 'backup'
+        monkeypatch.setattr('ceph_volume.devices.lvm.activate.direct_report', lambda: report)
+        monkeypatch.setattr('ceph_volume.devices.lvm.activate.systemctl.osd_is_active', lambda x: False)
+        monkeypatch.setattr('ceph_volume.devices.lvm.activate.conf.cluster', 'ceph')
+        activated = []
+
+        def activate_osd(args, osd_id=None, osd_fsid=None):
+            activated.append((osd_id, activate.conf.cluster))
+        activation = activate.Activate(['--all', '--jobs', '2'])
+        activation.activate = activate_osd
+        activation.main()
+        assert activated == [('1', 'backup'), ('0', 'ceph')]
+
 #
 # Activate All fixture
 #
@@ -1,3 +1,6 @@
+import errno
+import struct
+import time
 import pytest
 from ceph_volume.devices import lvm
 
@@ -24,3 +27,110 @@ class TestZap(object):
             lvm.zap.Zap(argv=[device_name]).main()
         stdout, stderr = capsys.readouterr()
         assert 'Refusing to zap' in stdout
+
+    def test_failures_do_not_stop_other_devices(self, capsys, is_root, monkeypatch):
+        zapped = []
+
+        def zap_device(device, destroy=False, discard=False):
+            if device == '/dev/sda':
+                raise RuntimeError('device is busy')
+            zapped.append(device)
+        zap = lvm.zap.Zap(argv=['/dev/sda', '/dev/sdb', '/dev/sdc', '--jobs', '2'])
+        monkeypatch.setattr(zap, 'zap_device', zap_device)
+        with pytest.raises(RuntimeError) as error:
+            zap.main()
+        assert 'Unable to zap 1 of 3 devices: /dev/sda' in str(error.value)
+        assert sorted(zapped) == ['/dev/sdb', '/dev/sdc']
+        stdout, stderr = capsys.readouterr()
+        assert 'Unable to zap /dev/sda: device is busy' in stdout
+
+    def test_pvs_of_one_vg_destroy_it_once(self, capsys, is_root, monkeypatch):
+        vgs = set(['ceph-vg'])
+        removed = []
+
+        class PV(object):
+            vg_name = 'ceph-vg'
+            lv_uuid = ''
+
+        def get_vg(vg_name=None):
+            # give the other device's zap a chance to get here, too
+            time.sleep(0.1)
+            return vg_name if vg_name in vgs else None
+
+        def remove_vg(vg_name):
+            if vg_name not in vgs:
+                raise RuntimeError('Unable to remove vg %s' % vg_name)
+            vgs.remove(vg_name)
+            removed.append(vg_name)
+
+        monkeypatch.setattr(lvm.zap.api, 'get_lv_from_argument', lambda device: None)
+        monkeypatch.setattr(lvm.zap.api, 'get_pvs', lambda pv_name=None: [PV()])
+        monkeypatch.setattr(lvm.zap.api, 'get_vg', get_vg)
+        monkeypatch.setattr(lvm.zap.api, 'remove_vg', remove_vg)
+        monkeypatch.setattr(lvm.zap.api, 'remove_pv', lambda pv_name: removed.append(pv_name))
+        monkeypatch.setattr(lvm.zap.disk, 'get_partuuid', lambda device: '')
+        monkeypatch.setattr(lvm.zap.encryption, 'status', lambda device: {})
+        monkeypatch.setattr(lvm.zap, 'wipefs', lambda path: None)
+        monkeypatch.setattr(lvm.zap, 'zap_data', lambda path, discard=False: None)
+        lvm.zap.Zap(argv=['/dev/sda', '/dev/sdb', '--jobs', '2', '--destroy']).main()
+        assert removed[0] == 'ceph-vg'
+        assert sorted(removed[1:]) == ['/dev/sda', '/dev/sdb']
+        stdout, stderr = capsys.readouterr()
+        assert 'Zapping successful for: /dev/sda, /dev/sdb' in stdout
+
+
+class TestZapData(object):
+
+    def setup_method(self, method):
+        self.ioctls = []
+        self.size = 1024 ** 3
+
+    def ioctl(self, fd, request, arg):
+        if request == lvm.zap.BLKGETSIZE64:
+            return struct.pack('=Q', self.size)
+        self.ioctls.append((request, struct.unpack('=QQ', arg)))
+        if request in getattr(self, 'unsupported', []):
+            raise IOError(errno.EOPNOTSUPP, 'Operation not supported')
+
+    def block_device(self, monkeypatch, tmpfile):
+        monkeypatch.setattr(lvm.zap.stat, 'S_ISBLK', lambda mode: True)
+        monkeypatch.setattr(lvm.zap.fcntl, 'ioctl', self.ioctl)
+        return tmpfile()
+
+    def test_zeroes_out_the_start(self, monkeypatch, tmpfile, capture):
+        monkeypatch.setattr(lvm.zap.process, 'run', capture)
+        lvm.zap.zap_data(self.block_device(monkeypatch, tmpfile))
+        assert self.ioctls == [(lvm.zap.BLKZEROOUT, (0, 10 * 1024 * 1024))]
+        assert capture.calls == []
+
+    def test_discards_when_supported(self, monkeypatch, tmpfile, capture):
+        monkeypatch.setattr(lvm.zap.process, 'run', capture)
+        monkeypatch.setattr(lvm.zap, 'supports_discard', lambda path: True)
+        lvm.zap.zap_data(self.block_device(monkeypatch, tmpfile), discard=True)
+        assert self.ioctls == [
+            (lvm.zap.BLKDISCARD, (0, self.size)),
+            (lvm.zap.BLKZEROOUT, (0, 10 * 1024 * 1024)),
+        ]
+
+    def test_does_not_discard_when_unsupported(self, monkeypatch, tmpfile, capture):
+        monkeypatch.setattr(lvm.zap.process, 'run', capture)
+        monkeypatch.setattr(lvm.zap, 'supports_discard', lambda path: False)
+        lvm.zap.zap_data(self.block_device(monkeypatch, tmpfile), discard=True)
+        assert self.ioctls == [(lvm.zap.BLKZEROOUT, (0, 10 * 1024 * 1024))]
+
+    def test_falls_back_to_dd_within_the_device(self, monkeypatch, tmpfile, capture):
+        monkeypatch.setattr(lvm.zap.process, 'run', capture)
+        self.unsupported = [lvm.zap.BLKZEROOUT]
+        self.size = 1024 * 1024
+        path = self.block_device(monkeypatch, tmpfile)
+        lvm.zap.zap_data(path)
+        assert self.ioctls == [(lvm.zap.BLKZEROOUT, (0, 1024 * 1024))]
+        assert capture.calls[0]['args'][0] == [
+            'dd', 'if=/dev/zero', 'of=%s' % path, 'bs=512', 'count=2048']
+
+    def test_not_a_block_device(self, monkeypatch, tmpfile, capture):
+        monkeypatch.setattr(lvm.zap.process, 'run', capture)
+        path = tmpfile()
+        lvm.zap.zap_data(path)
+        assert capture.calls[0]['args'][0] == [
+            'dd', 'if=/dev/zero', 'of=%s' % path, 'bs=1M', 'count=10']
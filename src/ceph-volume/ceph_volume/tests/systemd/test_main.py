@@ -1,5 +1,6 @@
 import pytest
 from ceph_volume import exceptions, conf
+from ceph_volume.api import lvm as api
 from ceph_volume.systemd import main
 
 
@@ -41,7 +42,7 @@ class TestMain(object):
 
     def test_correct_command(self, monkeypatch):
         run = Capture()
-        monkeypatch.setattr(main.process, 'run', run)
+        monkeypatch.setattr(main, 'trigger', run)
         main.main(args=['ceph-volume-systemd', 'lvm-8715BEB4-15C5-49DE-BA6F-401086EC7B41-0' ])
         command = run.calls[0][0]
         assert command == [
@@ -49,3 +50,71 @@ class TestMain(object):
             'lvm', 'trigger',
             '8715BEB4-15C5-49DE-BA6F-401086EC7B41-0'
         ]
+
+    def test_waits_for_the_osd_lv(self, monkeypatch, tmpdir):
+        lv_path = str(tmpdir.join('osd-block'))
+        lvs = []
+        waits = []
+
+        def wait(watch, timeout):
+            # the LV and its device show up while waiting
+            waits.append(timeout)
+            if len(waits) == 2:
+                lvs.append(api.Volume(
+                    lv_name='osd-block', lv_path=lv_path,
+                    lv_tags='ceph.osd_id=0,ceph.osd_fsid=1234,ceph.type=block'))
+                open(lv_path, 'w').close()
+            return True
+        run = Capture()
+        monkeypatch.setattr(main, 'trigger', run)
+        monkeypatch.setattr(main.DirectoryWatch, 'wait', wait)
+        monkeypatch.setattr(api, 'get_lvs', lambda **kw: lvs)
+        main.main(args=['ceph-volume-systemd', 'lvm-0-1234'])
+        assert waits == [0.5, 1]
+        assert run.calls[0][0] == ['ceph-volume', 'lvm', 'trigger', '0-1234']
+
+    def test_retries_failed_triggers(self, monkeypatch):
+        attempts = []
+
+        def trigger(command):
+            attempts.append(command)
+            if len(attempts) < 3:
+                raise RuntimeError('command returned non-zero exit status: 1')
+        monkeypatch.setattr(main, 'trigger', trigger)
+        monkeypatch.setattr(main.DirectoryWatch, 'wait', lambda watch, timeout: False)
+        main.main(args=['ceph-volume-systemd', 'simple-0-1234'])
+        assert len(attempts) == 3
+
+    def test_gives_up(self, monkeypatch):
+        monkeypatch.setenv('CEPH_VOLUME_SYSTEMD_TRIES', '0')
+        attempts = []
+
+        def trigger(command):
+            attempts.append(command)
+            raise RuntimeError('command returned non-zero exit status: 1')
+        monkeypatch.setattr(main, 'trigger', trigger)
+        main.main(args=['ceph-volume-systemd', 'simple-0-1234'])
+        assert len(attempts) == 1
+
+
+class TestBackoff(object):
+
+    def test_doubles_up_to_the_interval(self):
+        delays = main.backoff(5)
+        assert [next(delays) for _ in range(6)] == [0.5, 1, 2, 4, 5, 5]
+
+
+class TestTrigger(object):
+
+    def test_failures_raise(self, monkeypatch):
+        def volume(argv):
+            raise SystemExit(1)
+        monkeypatch.setattr('ceph_volume.main.Volume', volume)
+        with pytest.raises(RuntimeError):
+            main.trigger(['ceph-volume', 'lvm', 'trigger', '0-1234'])
+
+    def test_success(self, monkeypatch):
+        def volume(argv):
+            raise SystemExit(0)
+        monkeypatch.setattr('ceph_volume.main.Volume', volume)
+        main.trigger(['ceph-volume', 'lvm', 'trigger', '0-1234'])
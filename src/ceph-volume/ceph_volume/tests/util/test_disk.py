@@ -150,6 +150,60 @@ class TestHumanReadableSize(object):
         assert result == '81.20 TB'
 
 
+class TestDeviceSnapshot(object):
+
+    def setup_method(self, method):
+        self.calls = []
+
+    def call(self, command, **kw):
+        self.calls.append(command)
+        if '--nodeps' in command:
+            return ['NAME="sdz" KNAME="sdz" TYPE="disk"'], [], 0
+        return [
+            'NAME="sda" KNAME="sda" TYPE="disk" PKNAME=""',
+            'NAME="sda1" KNAME="sda1" TYPE="part" PKNAME="sda"',
+            'NAME="ceph-lv" KNAME="dm-0" TYPE="lvm" PKNAME="sda1"',
+            'NAME="ceph-lv" KNAME="dm-0" TYPE="lvm" PKNAME="sdb"',
+        ], [], 0
+
+    def test_lsblk_is_called_once(self, monkeypatch):
+        monkeypatch.setattr(disk.process, 'call', self.call)
+        with disk.snapshot():
+            assert disk.lsblk('/dev/sda')['TYPE'] == 'disk'
+            assert disk.lsblk('/dev/sda1')['PKNAME'] == 'sda'
+        assert len(self.calls) == 1
+        assert '--nodeps' not in self.calls[0]
+
+    def test_lookup_by_kernel_name(self, monkeypatch):
+        monkeypatch.setattr(disk.process, 'call', self.call)
+        monkeypatch.setattr(disk.os.path, 'realpath', lambda path: '/dev/dm-0')
+        with disk.snapshot():
+            report = disk.lsblk('/dev/mapper/ceph-lv')
+        # the first parent is kept
+        assert report['PKNAME'] == 'sda1'
+
+    def test_unknown_devices_fall_back(self, monkeypatch):
+        monkeypatch.setattr(disk.process, 'call', self.call)
+        with disk.snapshot():
+            assert disk.lsblk('/dev/sdz')['NAME'] == 'sdz'
+            assert disk.lsblk('/dev/sda', columns=['NAME'])['NAME'] == 'sdz'
+        assert len(self.calls) == 3
+
+    def test_invalidate(self, monkeypatch):
+        monkeypatch.setattr(disk.process, 'call', self.call)
+        with disk.snapshot():
+            disk.lsblk('/dev/sda')
+            disk.invalidate()
+            disk.lsblk('/dev/sda')
+        assert len(self.calls) == 2
+
+    def test_not_cached_outside_of_a_snapshot(self, monkeypatch):
+        monkeypatch.setattr(disk.process, 'call', self.call)
+        disk.lsblk('/dev/sda')
+        disk.lsblk('/dev/sda')
+        assert len(self.calls) == 2
+
+
 class TestGetDevices(object):
 
     def setup_paths(self, tmpdir):
@@ -197,7 +251,6 @@ class TestGetDevices(object):
 
     def test_dm_device_is_not_used(self, monkeypatch, tmpdir):
         # the link to the mapper is used instead
-        monkeypatch.setattr(disk.lvm, 'is_lv', lambda: True)
         block_path, dev_path, mapper_path = self.setup_paths(tmpdir)
         dev_dm_path = os.path.join(dev_path, 'dm-0')
         ceph_data_path = os.path.join(mapper_path, 'ceph-data')
@@ -290,6 +343,20 @@ class TestGetDevices(object):
             _mapper_path=mapper_path)
         assert result[dev_sda_path]['rotational'] == '1'
 
+    def test_lv_dm_device(self, tmpfile, tmpdir):
+        dm_path = str(tmpdir.mkdir('dm-0'))
+        dm_dir = os.path.join(dm_path, 'dm')
+        os.makedirs(dm_dir)
+        tmpfile('uuid', contents='LVM-0wD0Y5xNd4iMmtnZnIkk8ph0mU6cjpGbHLlJ3g', directory=dm_dir)
+        assert disk.is_lv_dm(dm_path)
+
+    def test_other_dm_device(self, tmpfile, tmpdir):
+        dm_path = str(tmpdir.mkdir('dm-0'))
+        dm_dir = os.path.join(dm_path, 'dm')
+        os.makedirs(dm_dir)
+        tmpfile('uuid', contents='CRYPT-LUKS1-e2e5d8cc8f5c4f4a8a3b0b6b8b9b4d8b-sda', directory=dm_dir)
+        assert not disk.is_lv_dm(dm_path)
+
 
 class TestSizeCalculations(object):
 
@@ -216,3 +216,23 @@ class TestWhich(object):
         stdout, stderr = capsys.readouterr()
         assert 'Absolute path not found for executable: exedir' in stdout
         assert 'Ensure $PATH environment variable contains common executable locations' in stdout
+
+
+class TestDirectoryWatch(object):
+
+    def test_sees_new_entries(self, tmpdir):
+        with system.DirectoryWatch([str(tmpdir)]) as watch:
+            if watch.fd is None:
+                pytest.skip('inotify is not available')
+            assert watch.wait(0) is False
+            tmpdir.join('dm-0').write('')
+            assert watch.wait(5) is True
+            # the events were consumed
+            assert watch.wait(0) is False
+
+    def test_sleeps_without_directories(self, tmpdir, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(system.time, 'sleep', sleeps.append)
+        with system.DirectoryWatch([str(tmpdir.join('missing'))]) as watch:
+            assert watch.wait(2) is False
+        assert sleeps == [2]
@@ -1,4 +1,6 @@
 import logging
+import threading
+import time
 from math import floor
 from ceph_volume import terminal
 
@@ -82,3 +84,45 @@ def prompt_bool(question, _raw_input=None):
         terminal.error('Valid false responses are: n, no')
         terminal.error('That response was invalid, please try again')
         return prompt_bool(question, _raw_input=input_prompt)
+
+
+def run_concurrently(func, items, jobs=1):
+    """
+    Call ``func`` with each of ``items``, with up to ``jobs`` calls running at
+    the same time (each in its own thread). An exception raised for one of the
+    items is logged and does not stop the others.
+
+    :returns: A list of ``(seconds, error)`` tuples, in the order of ``items``,
+              where ``error`` is the exception raised for the item, or ``None``
+    """
+    results = [None] * len(items)
+    remaining = iter(enumerate(items))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                try:
+                    index, item = next(remaining)
+                except StopIteration:
+                    return
+            start = time.time()
+            error = None
+            try:
+                func(item)
+            except Exception as e:
+                logger.exception('%s failed for %s', getattr(func, '__name__', func), item)
+                error = e
+            results[index] = (time.time() - start, error)
+
+    jobs = min(max(jobs, 1), len(items))
+    if jobs <= 1:
+        worker()
+        return results
+    threads = [threading.Thread(target=worker) for _ in range(jobs)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
@@ -50,8 +50,7 @@ class Device(object):
         if self._is_lvm_member is None:
             # check if there was a pv created with the
             # name of device
-            pvs = lvm.PVolumes()
-            pvs.filter(pv_name=self.abspath)
+            pvs = lvm.get_pvs(pv_name=self.abspath)
             if not pvs:
                 self._is_lvm_member = False
                 return self._is_lvm_member
@@ -2,13 +2,26 @@ import logging
 import os
 import re
 import stat
+import threading
+from contextlib import contextmanager
 from ceph_volume import process
-from ceph_volume.api import lvm
 from ceph_volume.util.system import get_file_contents
 
 
 logger = logging.getLogger(__name__)
 
+# The columns reported by ``lsblk()`` by default, see its docstring
+LSBLK_COLUMNS = [
+    'NAME', 'KNAME', 'MAJ:MIN', 'FSTYPE', 'MOUNTPOINT', 'LABEL', 'UUID',
+    'RO', 'RM', 'MODEL', 'SIZE', 'STATE', 'OWNER', 'GROUP', 'MODE',
+    'ALIGNMENT', 'PHY-SEC', 'LOG-SEC', 'ROTA', 'SCHED', 'TYPE', 'DISC-ALN',
+    'DISC-GRAN', 'DISC-MAX', 'DISC-ZERO', 'PKNAME', 'PARTLABEL'
+]
+
+# The snapshot of the block devices of the system, while one is active (see
+# ``snapshot()``)
+_snapshot = None
+
 
 # The blkid CLI tool has some oddities which prevents having one common call
 # to extract the information instead of having separate utilities. The `udev`
@@ -156,17 +169,18 @@ def lsblk(device, columns=None, abspath=False):
         $ lsblk --nodeps -P -o NAME,KNAME,MAJ:MIN,FSTYPE,MOUNTPOINT
         NAME="sda1" KNAME="sda1" MAJ:MIN="8:1" FSTYPE="ext4" MOUNTPOINT="/"
 
+    While a ``DeviceSnapshot`` is active, the default report of devices under
+    ``/dev`` is answered from it instead of calling ``lsblk`` again.
+
     :param columns: A list of columns to report as keys in its original form.
     :param abspath: Set the flag for absolute paths on the report
     """
-    default_columns = [
-        'NAME', 'KNAME', 'MAJ:MIN', 'FSTYPE', 'MOUNTPOINT', 'LABEL', 'UUID',
-        'RO', 'RM', 'MODEL', 'SIZE', 'STATE', 'OWNER', 'GROUP', 'MODE',
-        'ALIGNMENT', 'PHY-SEC', 'LOG-SEC', 'ROTA', 'SCHED', 'TYPE', 'DISC-ALN',
-        'DISC-GRAN', 'DISC-MAX', 'DISC-ZERO', 'PKNAME', 'PARTLABEL'
-    ]
     device = device.rstrip('/')
-    columns = columns or default_columns
+    if _snapshot is not None and columns is None and not abspath:
+        report = _snapshot.lsblk(device)
+        if report is not None:
+            return report
+    columns = columns or LSBLK_COLUMNS
     # --nodeps -> Avoid adding children/parents to the device, only give information
     #             on the actual device we are querying for
     # -P       -> Produce pairs of COLUMN="value"
@@ -186,6 +200,89 @@ def lsblk(device, columns=None, abspath=False):
     return _lsblk_parser(' '.join(out))
 
 
+class DeviceSnapshot(object):
+    """
+    The ``lsblk`` report of all the block devices of the system (partitions
+    and device mapper devices included), loaded with a single ``lsblk`` call
+    the first time it is needed, and indexed by kernel name so that any path
+    to a device (``/dev/mapper/*``, ``/dev/disk/by-*/*``) can be looked up.
+
+    While a snapshot is active (see ``snapshot()``), ``lsblk()`` is answered
+    from it. Commands changing block devices must call ``invalidate()`` so that
+    the next lookup reloads it. It can be shared by threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices = None
+
+    def invalidate(self):
+        with self._lock:
+            self._devices = None
+
+    @property
+    def devices(self):
+        """
+        A dictionary of the reports of all the devices, by kernel name
+        """
+        with self._lock:
+            if self._devices is None:
+                self._devices = self._load()
+            return self._devices
+
+    def _load(self):
+        out, err, rc = process.call(
+            ['lsblk', '-P', '-o', ','.join(LSBLK_COLUMNS)],
+            verbose_on_failure=False
+        )
+        devices = {}
+        if rc != 0:
+            return devices
+        for line in out:
+            report = _lsblk_parser(line)
+            # devices with many parents (like an LV spanning PVs) are
+            # reported once per parent, keep the first one like --nodeps would
+            if report.get('KNAME'):
+                devices.setdefault(report['KNAME'], report)
+        return devices
+
+    def lsblk(self, device):
+        """
+        Return a copy of the report for ``device``, or ``None`` if it is
+        unknown (including when ``device`` is not a path under ``/dev``)
+        """
+        if not device.startswith('/dev/'):
+            return None
+        kname = os.path.basename(os.path.realpath(device))
+        report = self.devices.get(kname)
+        return dict(report) if report is not None else None
+
+
+@contextmanager
+def snapshot():
+    """
+    Answer all the ``lsblk()`` lookups made within the context from a single
+    ``DeviceSnapshot``, for example for the duration of a ceph-volume command.
+    """
+    global _snapshot
+    previous = _snapshot
+    _snapshot = DeviceSnapshot()
+    try:
+        yield _snapshot
+    finally:
+        _snapshot = previous
+
+
+def invalidate():
+    """
+    Drop the device reports cached by the active snapshot, if any. Must be
+    called after any command changing block devices, like creating PVs or LVs,
+    or wiping devices.
+    """
+    if _snapshot is not None:
+        _snapshot.invalidate()
+
+
 def is_device(dev):
     """
     Boolean to determine if a given device is a block device (**not**
@@ -581,6 +678,15 @@ def is_mapper_device(device_name):
     return device_name.startswith(('/dev/mapper', '/dev/dm-'))
 
 
+def is_lv_dm(sysdir):
+    """
+    Tell if the device mapper device at ``sysdir`` (like ``/sys/block/dm-0``)
+    belongs to LVM, from the ``LVM-`` prefix that LVM gives to the uuid of the
+    devices it creates, avoiding to query LVM for every device.
+    """
+    return get_file_contents(os.path.join(sysdir, 'dm/uuid')).startswith('LVM-')
+
+
 def get_devices(_sys_block_path='/sys/block', _dev_path='/dev', _mapper_path='/dev/mapper'):
     """
     Captures all available devices from /sys/block/, including its partitions,
@@ -617,7 +723,7 @@ def get_devices(_sys_block_path='/sys/block', _dev_path='/dev', _mapper_path='/d
 
         # If the mapper device is a logical volume it gets excluded
         if is_mapper_device(diskname):
-            if lvm.is_lv(diskname):
+            if is_lv_dm(sysdir):
                 continue
 
         # If the device reports itself as 'removable', get it excluded
@@ -1,9 +1,13 @@
+import ctypes
+import ctypes.util
 import errno
 import logging
 import os
 import pwd
 import platform
+import select
 import tempfile
+import time
 import uuid
 from ceph_volume import process, terminal
 from . import as_string
@@ -282,3 +286,74 @@ def set_context(path, recursive = False):
             process.run(['restorecon', '-R', path])
         else:
             process.run(['restorecon', path])
+
+
+class DirectoryWatch(object):
+    """
+    Wait for entries to be created, removed or changed in a set of
+    directories, like ``/dev/mapper`` when devices are showing up at boot.
+
+    Uses inotify, falling back to plain sleeping if it is not available (or
+    none of the directories exist), so callers should always re-check
+    whatever they are waiting for after ``wait()`` returns.
+    """
+
+    # IN_ATTRIB | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    mask = 0x004 | 0x080 | 0x100 | 0x200
+
+    def __init__(self, paths):
+        self.fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, 'O_CLOEXEC', 0))
+        except (OSError, AttributeError) as error:
+            logger.info('inotify is not available, will poll instead: %s', error)
+            return
+        if fd < 0:
+            logger.info('unable to initialize inotify: %s', os.strerror(ctypes.get_errno()))
+            return
+        watched = 0
+        for path in paths:
+            if libc.inotify_add_watch(fd, path.encode('utf-8'), self.mask) >= 0:
+                watched += 1
+            else:
+                logger.info('unable to watch %s: %s', path, os.strerror(ctypes.get_errno()))
+        if not watched:
+            os.close(fd)
+            return
+        self.fd = fd
+
+    def wait(self, timeout):
+        """
+        Block until something changes in the watched directories, or until
+        ``timeout`` seconds have passed.
+
+        :returns: ``True`` if a change was seen, ``False`` otherwise
+        """
+        if self.fd is None:
+            time.sleep(timeout)
+            return False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        # the events themselves are not needed, drain them
+        while True:
+            try:
+                if not os.read(self.fd, 4096):
+                    break
+            except OSError as error:
+                if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+        return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
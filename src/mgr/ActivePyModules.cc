@@ -345,6 +345,24 @@ PyObject *ActivePyModules::get_python(const std::string &what)
       });
     });
     return f.get();
+  } else if (what == "map_epochs") {
+    PyFormatter f;
+    cluster_state.with_osdmap([&f](const OSDMap &osd_map) {
+      f.dump_unsigned("osd_map", osd_map.get_epoch());
+    });
+    cluster_state.with_monmap([&f](const MonMap &monmap) {
+      f.dump_unsigned("mon_map", monmap.get_epoch());
+    });
+    cluster_state.with_fsmap([&f](const FSMap &fsmap) {
+      f.dump_unsigned("fs_map", fsmap.get_epoch());
+    });
+    cluster_state.with_servicemap([&f](const ServiceMap &service_map) {
+      f.dump_unsigned("service_map", service_map.epoch);
+    });
+    cluster_state.with_pgmap([&f](const PGMap &pg_map) {
+      f.dump_unsigned("pg_map", pg_map.version);
+    });
+    return f.get();
   } else if (what == "health" || what == "mon_status") {
     PyFormatter f;
     bufferlist json;
@@ -639,6 +657,31 @@ PyObject* ActivePyModules::with_perf_counters(
   return f.get();
 }
 
+static void dump_counter_history(
+    const PerfCounterInstance& counter_instance,
+    const PerfCounterType& counter_type,
+    PyFormatter& f)
+{
+  if (counter_type.type & PERFCOUNTER_LONGRUNAVG) {
+    const auto &avg_data = counter_instance.get_data_avg();
+    for (const auto &datapoint : avg_data) {
+      f.open_array_section("datapoint");
+      f.dump_unsigned("t", datapoint.t.sec());
+      f.dump_unsigned("s", datapoint.s);
+      f.dump_unsigned("c", datapoint.c);
+      f.close_section();
+    }
+  } else {
+    const auto &data = counter_instance.get_data();
+    for (const auto &datapoint : data) {
+      f.open_array_section("datapoint");
+      f.dump_unsigned("t", datapoint.t.sec());
+      f.dump_unsigned("v", datapoint.v);
+      f.close_section();
+    }
+  }
+}
+
 PyObject* ActivePyModules::get_counter_python(
     const std::string &svc_name,
     const std::string &svc_id,
@@ -649,26 +692,66 @@ PyObject* ActivePyModules::get_counter_python(
       PerfCounterType& counter_type,
       PyFormatter& f)
   {
-    if (counter_type.type & PERFCOUNTER_LONGRUNAVG) {
-      const auto &avg_data = counter_instance.get_data_avg();
-      for (const auto &datapoint : avg_data) {
-        f.open_array_section("datapoint");
-        f.dump_unsigned("t", datapoint.t.sec());
-        f.dump_unsigned("s", datapoint.s);
-        f.dump_unsigned("c", datapoint.c);
-        f.close_section();
+    dump_counter_history(counter_instance, counter_type, f);
+  };
+  return with_perf_counters(extract_counters, svc_name, svc_id, path);
+}
+
+PyObject* ActivePyModules::get_counters_python(
+    const std::string &svc_type,
+    const std::set<std::string> &paths)
+{
+  PyThreadState *tstate = PyEval_SaveThread();
+  Mutex::Locker l(lock);
+  PyEval_RestoreThread(tstate);
+
+  PyFormatter f;
+  for (const auto &statepair : daemon_state.get_by_service(svc_type)) {
+    const auto &key = statepair.first;
+    const auto &state = statepair.second;
+
+    Mutex::Locker l2(state->lock);
+    f.open_object_section(key.second.c_str());
+    for (const auto &path : paths) {
+      f.open_array_section(path.c_str());
+      auto instance_iter = state->perf_counters.instances.find(path);
+      auto type_iter = state->perf_counters.types.find(path);
+      if (instance_iter != state->perf_counters.instances.end() &&
+	  type_iter != state->perf_counters.types.end()) {
+	dump_counter_history(instance_iter->second, type_iter->second, f);
       }
-    } else {
-      const auto &data = counter_instance.get_data();
-      for (const auto &datapoint : data) {
-        f.open_array_section("datapoint");
-        f.dump_unsigned("t", datapoint.t.sec());
-        f.dump_unsigned("v", datapoint.v);
-        f.close_section();
+      f.close_section();
+    }
+    f.close_section();
+  }
+  return f.get();
+}
+
+PyObject* ActivePyModules::get_pg_recovery_stats_python(
+    const std::set<pg_t> &pgids)
+{
+  PyThreadState *tstate = PyEval_SaveThread();
+  Mutex::Locker l(lock);
+  PyEval_RestoreThread(tstate);
+
+  PyFormatter f;
+  cluster_state.with_pgmap(
+    [&f, &pgids](const PGMap &pg_map) {
+      for (const auto &pgid : pgids) {
+	auto i = pg_map.pg_stat.find(pgid);
+	if (i == pg_map.pg_stat.end()) {
+	  continue;
+	}
+	f.open_object_section(stringify(pgid).c_str());
+	i->second.dump_brief(&f);
+	f.dump_int("num_bytes", i->second.stats.sum.num_bytes);
+	f.dump_int("num_bytes_recovered",
+		   i->second.stats.sum.num_bytes_recovered);
+	f.close_section();
       }
     }
-  };
-  return with_perf_counters(extract_counters, svc_name, svc_id, path);
+  );
+  return f.get();
 }
 
 PyObject* ActivePyModules::get_latest_counter_python(
@@ -751,6 +834,61 @@ PyObject* ActivePyModules::get_perf_schema_python(
   return f.get();
 }
 
+PyObject* ActivePyModules::get_perf_counters_python(
+    int prio_limit,
+    const std::set<std::string> &svc_types)
+{
+  PyThreadState *tstate = PyEval_SaveThread();
+  Mutex::Locker l(lock);
+  PyEval_RestoreThread(tstate);
+
+  PyFormatter f;
+  for (const auto &statepair : daemon_state.get_all()) {
+    const auto &key = statepair.first;
+    const auto &state = statepair.second;
+    if (!svc_types.empty() && !svc_types.count(key.first)) {
+      continue;
+    }
+
+    Mutex::Locker l2(state->lock);
+    f.open_object_section(to_string(key).c_str());
+    f.dump_unsigned("generation", state->perf_counters.generation);
+    f.open_object_section("counters");
+    for (const auto &ctr_inst_iter : state->perf_counters.instances) {
+      const auto &counter_name = ctr_inst_iter.first;
+      const auto &counter_instance = ctr_inst_iter.second;
+      auto type_iter = state->perf_counters.types.find(counter_name);
+      if (type_iter == state->perf_counters.types.end() ||
+	  type_iter->second.priority < prio_limit) {
+	continue;
+      }
+      const auto &type = type_iter->second;
+      if (type.type & PERFCOUNTER_LONGRUNAVG) {
+	f.open_array_section(counter_name.c_str());
+	if (counter_instance.get_data_avg().empty()) {
+	  f.dump_unsigned("s", 0);
+	  f.dump_unsigned("c", 0);
+	} else {
+	  const auto &datapoint = counter_instance.get_latest_data_avg();
+	  f.dump_unsigned("s", datapoint.s);
+	  f.dump_unsigned("c", datapoint.c);
+	}
+	f.close_section();
+      } else {
+	if (counter_instance.get_data().empty()) {
+	  f.dump_unsigned(counter_name.c_str(), 0);
+	} else {
+	  f.dump_unsigned(counter_name.c_str(),
+			  counter_instance.get_latest_data().v);
+	}
+      }
+    }
+    f.close_section();
+    f.close_section();
+  }
+  return f.get();
+}
+
 PyObject *ActivePyModules::get_context()
 {
   PyThreadState *tstate = PyEval_SaveThread();
@@ -77,9 +77,17 @@ public:
     const std::string &svc_type,
     const std::string &svc_id,
     const std::string &path);
+  PyObject *get_counters_python(
+    const std::string &svc_type,
+    const std::set<std::string> &paths);
+  PyObject *get_pg_recovery_stats_python(
+    const std::set<pg_t> &pgids);
   PyObject *get_perf_schema_python(
      const std::string &svc_type,
      const std::string &svc_id);
+  PyObject *get_perf_counters_python(
+     int prio_limit,
+     const std::set<std::string> &svc_types);
   PyObject *get_context();
   PyObject *get_osdmap();
   PyObject *with_perf_counters(
@@ -519,6 +519,63 @@ get_latest_counter(BaseMgrModule *self, PyObject *args)
       svc_name, svc_id, counter_path);
 }
 
+static PyObject*
+get_counters(BaseMgrModule *self, PyObject *args)
+{
+  char *svc_name = nullptr;
+  PyObject *paths_obj = nullptr;
+  if (!PyArg_ParseTuple(args, "sO:get_counters", &svc_name, &paths_obj)) {
+    return nullptr;
+  }
+
+  PyObject *paths_seq = PySequence_Fast(paths_obj,
+					"expected a sequence of paths");
+  if (paths_seq == nullptr) {
+    return nullptr;
+  }
+  std::set<std::string> paths;
+  for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(paths_seq); ++i) {
+    PyObject *path = PySequence_Fast_GET_ITEM(paths_seq, i);
+    if (!PyString_Check(path)) {
+      derr << __func__ << " item " << i << " not a string" << dendl;
+      continue;
+    }
+    paths.insert(PyString_AsString(path));
+  }
+  Py_DECREF(paths_seq);
+
+  return self->py_modules->get_counters_python(svc_name, paths);
+}
+
+static PyObject*
+get_pg_recovery_stats(BaseMgrModule *self, PyObject *args)
+{
+  PyObject *pgids_obj = nullptr;
+  if (!PyArg_ParseTuple(args, "O:get_pg_recovery_stats", &pgids_obj)) {
+    return nullptr;
+  }
+
+  PyObject *pgids_seq = PySequence_Fast(pgids_obj,
+					"expected a sequence of pg ids");
+  if (pgids_seq == nullptr) {
+    return nullptr;
+  }
+  std::set<pg_t> pgids;
+  for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(pgids_seq); ++i) {
+    PyObject *pgid_str = PySequence_Fast_GET_ITEM(pgids_seq, i);
+    pg_t pgid;
+    if (!PyString_Check(pgid_str) ||
+	!pgid.parse(PyString_AsString(pgid_str))) {
+      derr << __func__ << " item " << i << " not a pg id" << dendl;
+      continue;
+    }
+    pgids.insert(pgid);
+  }
+  Py_DECREF(pgids_seq);
+
+  return self->py_modules->get_pg_recovery_stats_python(pgids);
+}
+
 static PyObject*
 get_perf_schema(BaseMgrModule *self, PyObject *args)
 {
@@ -532,6 +589,35 @@ get_perf_schema(BaseMgrModule *self, PyObject *args)
   return self->py_modules->get_perf_schema_python(type_str, svc_id);
 }
 
+static PyObject*
+get_perf_counters(BaseMgrModule *self, PyObject *args)
+{
+  int prio_limit = 0;
+  PyObject *svc_types_obj = nullptr;
+  if (!PyArg_ParseTuple(args, "iO:get_perf_counters", &prio_limit,
+			&svc_types_obj)) {
+    return nullptr;
+  }
+
+  PyObject *svc_types_seq = PySequence_Fast(svc_types_obj,
+					    "expected a sequence of types");
+  if (svc_types_seq == nullptr) {
+    return nullptr;
+  }
+  std::set<std::string> svc_types;
+  for (Py_ssize_t i = 0; i < PySequence_Fast_GET_SIZE(svc_types_seq); ++i) {
+    PyObject *svc_type = PySequence_Fast_GET_ITEM(svc_types_seq, i);
+    if (!PyString_Check(svc_type)) {
+      derr << __func__ << " item " << i << " not a string" << dendl;
+      continue;
+    }
+    svc_types.insert(PyString_AsString(svc_type));
+  }
+  Py_DECREF(svc_types_seq);
+
+  return self->py_modules->get_perf_counters_python(prio_limit, svc_types);
+}
+
 static PyObject *
 ceph_get_osdmap(BaseMgrModule *self, PyObject *args)
 {
@@ -658,9 +744,18 @@ PyMethodDef BaseMgrModule_methods[] = {
   {"_ceph_get_latest_counter", (PyCFunction)get_latest_counter, METH_VARARGS,
     "Get the latest performance counter"},
 
+  {"_ceph_get_counters", (PyCFunction)get_counters, METH_VARARGS,
+    "Get performance counters of all daemons of a type"},
+
+  {"_ceph_get_pg_recovery_stats", (PyCFunction)get_pg_recovery_stats,
+    METH_VARARGS, "Get the recovery state of some PGs"},
+
   {"_ceph_get_perf_schema", (PyCFunction)get_perf_schema, METH_VARARGS,
     "Get the performance counter schema"},
 
+  {"_ceph_get_perf_counters", (PyCFunction)get_perf_counters, METH_VARARGS,
+    "Get the latest values of all performance counters"},
+
   {"_ceph_log", (PyCFunction)ceph_log, METH_VARARGS,
    "Emit a (local) log message"},
 
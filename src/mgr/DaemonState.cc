@@ -265,6 +265,10 @@ void DaemonPerfCounters::update(MMgrReport *report)
   for (const auto &t : report->undeclare_types) {
     session->declared_types.erase(t);
   }
+  if (!report->declare_types.empty() || !report->undeclare_types.empty()) {
+    // the schema changed, let cached copies of it be refreshed
+    ++generation;
+  }
 
   const auto now = ceph_clock_now();
 
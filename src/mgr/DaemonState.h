@@ -114,11 +114,17 @@ class DaemonPerfCounters
 
   std::map<std::string, PerfCounterInstance> instances;
 
+  // Bumped whenever the set of counters of the daemon changes: when it
+  // (re)opens its session, or declares or undeclares counters, so that
+  // consumers can cache the schema until then.
+  uint64_t generation = 0;
+
   void update(MMgrReport *report);
 
   void clear()
   {
     instances.clear();
+    ++generation;
   }
 };
 
@@ -147,11 +147,19 @@ static PyObject *osdmap_calc_pg_upmaps(BasePyOSDMap* self, PyObject *args)
 	   << " max_iterations " << max_iterations
 	   << " pools " << pools
 	   << dendl;
-  int r = self->osdmap->calc_pg_upmaps(g_ceph_context,
-				 max_deviation,
-				 max_iterations,
-				 pools,
-				 incobj->inc);
+  // calc_pg_upmaps() only modifies a deepish_copy_from() of the map.  The
+  // copy shares our CrushWrapper, which is only read on that path: the
+  // try_remap_rule() helpers walk the buckets without the lazily built
+  // name rmaps, and do_rule() uses a workspace on its own stack.  So let
+  // other python threads (e.g. other balancer workers) run meanwhile.
+  int r;
+  Py_BEGIN_ALLOW_THREADS
+  r = self->osdmap->calc_pg_upmaps(g_ceph_context,
+				   max_deviation,
+				   max_iterations,
+				   pools,
+				   incobj->inc);
+  Py_END_ALLOW_THREADS
   dout(10) << __func__ << " r = " << r << dendl;
   return PyInt_FromLong(r);
 }
@@ -431,6 +439,28 @@ static PyObject *osdmap_inc_set_compat_weight_set_weights(
   Py_RETURN_NONE;
 }
 
+static PyObject *osdmap_inc_merge_pg_upmaps(
+  BasePyOSDMapIncremental *self, PyObject *other)
+{
+  if (!PyObject_TypeCheck(other, &BasePyOSDMapIncrementalType)) {
+    derr << __func__ << " not an OSDMapIncremental" << dendl;
+    Py_RETURN_NONE;
+  }
+  auto other_inc = reinterpret_cast<BasePyOSDMapIncremental*>(other)->inc;
+  for (auto& i : other_inc->new_pg_upmap) {
+    self->inc->new_pg_upmap[i.first] = i.second;
+  }
+  self->inc->old_pg_upmap.insert(other_inc->old_pg_upmap.begin(),
+				 other_inc->old_pg_upmap.end());
+  for (auto& i : other_inc->new_pg_upmap_items) {
+    self->inc->new_pg_upmap_items[i.first] = i.second;
+  }
+  self->inc->old_pg_upmap_items.insert(
+    other_inc->old_pg_upmap_items.begin(),
+    other_inc->old_pg_upmap_items.end());
+  Py_RETURN_NONE;
+}
+
 PyMethodDef BasePyOSDMapIncremental_methods[] = {
   {"_get_epoch", (PyCFunction)osdmap_inc_get_epoch, METH_NOARGS,
     "Get OSDMap::Incremental epoch"},
@@ -441,6 +471,8 @@ PyMethodDef BasePyOSDMapIncremental_methods[] = {
   {"_set_crush_compat_weight_set_weights",
    (PyCFunction)osdmap_inc_set_compat_weight_set_weights, METH_O,
    "Set weight values in the pending CRUSH compat weight-set"},
+  {"_merge_pg_upmaps", (PyCFunction)osdmap_inc_merge_pg_upmaps, METH_O,
+   "Merge the pg_upmap changes of another OSDMap::Incremental"},
   {NULL, NULL, 0, NULL}
 };
 
@@ -11,24 +11,57 @@ import random
 import six
 import time
 from mgr_module import MgrModule, CommandResult
-from threading import Event
+from threading import Event, Lock, Thread
 from mgr_module import CRUSHMap
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # available modes: 'none', 'crush', 'crush-compat', 'upmap', 'osd_weight'
 default_mode = 'none'
 default_sleep_interval = 60   # seconds
 default_max_misplaced = .05    # max ratio of pgs replaced at a time
+default_upmap_max_workers = 4  # parallel upmap calculations
 
 TIME_FORMAT = '%Y-%m-%d_%H:%M:%S'
 
-class MappingState:
-    def __init__(self, osdmap, pg_dump, desc=''):
+class MappingState(object):
+    def __init__(self, osdmap, pg_dump, desc='', base=None,
+                 changed_osds=None):
+        """
+        Capture the PG mappings of all pools in osdmap.
+
+        If base (a MappingState) and changed_osds are given, osdmap
+        must only differ from base.osdmap in the CRUSH placement of
+        changed_osds (e.g. a compat weight-set change).  Only the pools
+        whose CRUSH rules take a subtree containing one of those osds are
+        remapped; everything else is shared with base.
+        """
         self.desc = desc
         self.osdmap = osdmap
-        self.osdmap_dump = self.osdmap.dump()
         self.crush = osdmap.get_crush()
-        self.crush_dump = self.crush.dump()
+        self._crush_dump = None
         self.pg_dump = pg_dump
+        self.base = None
+        self.changed_poolids = None   # None: all pools freshly mapped
+        self._columns = None
+        if base is not None and changed_osds is not None:
+            self.base = base
+            self.osdmap_dump = base.osdmap_dump
+            self.pg_stat = base.pg_stat
+            self.poolids = base.poolids
+            self.changed_poolids = \
+                self.get_poolids_by_osds(changed_osds) & self.poolids
+            self.pg_up = dict(base.pg_up)
+            self.pg_up_by_poolid = dict(base.pg_up_by_poolid)
+            for poolid in self.changed_poolids:
+                self.pg_up_by_poolid[poolid] = osdmap.map_pool_pgs_up(poolid)
+                self.pg_up.update(self.pg_up_by_poolid[poolid])
+            return
+
+        self.osdmap_dump = self.osdmap.dump()
         self.pg_stat = {
             i['pgid']: i['stat_sum'] for i in pg_dump.get('pg_stats', [])
         }
@@ -42,16 +75,97 @@ class MappingState:
             for a,b in six.iteritems(self.pg_up_by_poolid[poolid]):
                 self.pg_up[a] = b
 
+    @property
+    def crush_dump(self):
+        if self._crush_dump is None:
+            self._crush_dump = self.crush.dump()
+        return self._crush_dump
+
+    def get_poolids_by_osds(self, osds):
+        """
+        Return the ids of the pools whose CRUSH rules take a subtree
+        containing any of the given osds.
+        """
+        osds = set(osds)
+        poolids = set()
+        if not osds:
+            return poolids
+        for rootid in self.crush.find_takes():
+            weight_map = self.crush.get_take_weight_osd_map(rootid)
+            if osds.intersection(weight_map):
+                poolids.update(self.osdmap.get_pools_by_take(rootid))
+        return poolids
+
+    def columns(self):
+        """
+        Dense per-pool arrays describing this mapping, built on first use
+        (requires numpy).
+        """
+        if self._columns is None:
+            self._columns = PGColumns(self)
+        return self._columns
+
     def calc_misplaced_from(self, other_ms):
         num = len(other_ms.pg_up)
         misplaced = 0
-        for pgid, before in six.iteritems(other_ms.pg_up):
-            if before != self.pg_up.get(pgid, []):
-                misplaced += 1
+        if self.base is other_ms:
+            # only the remapped pools can have moved
+            for poolid in self.changed_poolids:
+                for pgid, before in six.iteritems(
+                        other_ms.pg_up_by_poolid[poolid]):
+                    if before != self.pg_up.get(pgid, []):
+                        misplaced += 1
+        else:
+            for pgid, before in six.iteritems(other_ms.pg_up):
+                if before != self.pg_up.get(pgid, []):
+                    misplaced += 1
         if num > 0:
             return float(misplaced) / float(num)
         return 0.0
 
+class PGColumns:
+    """
+    Columnar view of a MappingState: for every pool, the up set of each
+    PG as one row of a (num_pgs x pool size) array, padded with -1, plus
+    the per-PG object and byte counts aligned with those rows.
+
+    Pools are converted on first use; pools that a delta MappingState
+    did not remap share the arrays of its base.
+    """
+    def __init__(self, ms):
+        self.ms = ms
+        self.by_poolid = {}    # pool id -> (up, objects, bytes) arrays
+
+    def pool(self, poolid):
+        if poolid not in self.by_poolid:
+            base = self.ms.base
+            if base is not None and poolid not in self.ms.changed_poolids:
+                self.by_poolid[poolid] = base.columns().pool(poolid)
+            else:
+                self.by_poolid[poolid] = self._build(poolid)
+        return self.by_poolid[poolid]
+
+    def _build(self, poolid):
+        pm = self.ms.pg_up_by_poolid[poolid]
+        pg_stat = self.ms.pg_stat
+        pgids = list(pm.keys())
+        width = max([len(up) for up in pm.values()] or [0])
+        if all(len(pm[pgid]) == width for pgid in pgids):
+            up = np.array([pm[pgid] for pgid in pgids],
+                          dtype=np.int64).reshape(len(pgids), width)
+        else:
+            up = np.full((len(pgids), width), -1, dtype=np.int64)
+            for row, pgid in enumerate(pgids):
+                osds = pm[pgid]
+                up[row, :len(osds)] = osds
+        up[up == CRUSHMap.ITEM_NONE] = -1
+        objects = np.array([pg_stat[pgid]['num_objects'] for pgid in pgids],
+                           dtype=np.int64)
+        bytes = np.array([pg_stat[pgid]['num_bytes'] for pgid in pgids],
+                         dtype=np.int64)
+        return up, objects, bytes
+
+
 class Plan:
     def __init__(self, name, ms, pools):
         self.mode = 'unknown'
@@ -63,10 +177,22 @@ class Plan:
         self.compat_ws = {}
         self.inc = ms.osdmap.new_incremental()
 
-    def final_state(self):
+    def final_state(self, changed_osds=None):
+        """
+        Apply the plan to the initial osdmap.  If changed_osds is given,
+        the plan is assumed to only change the CRUSH placement of those
+        osds and a delta MappingState on top of the initial one is built.
+        """
         self.inc.set_osd_reweights(self.osd_weights)
         self.inc.set_crush_compat_weight_set_weights(self.compat_ws)
-        return MappingState(self.initial.osdmap.apply_incremental(self.inc),
+        osdmap = self.initial.osdmap.apply_incremental(self.inc)
+        if changed_osds is not None and not self.osd_weights:
+            return MappingState(osdmap,
+                                self.initial.pg_dump,
+                                'plan %s final' % self.name,
+                                base=self.initial,
+                                changed_osds=changed_osds)
+        return MappingState(osdmap,
                             self.initial.pg_dump,
                             'plan %s final' % self.name)
 
@@ -110,6 +236,8 @@ class Eval:
         self.target_by_root = {}  # root name -> target weight map
         self.count_by_pool = {}
         self.count_by_root = {}
+        self.count_by_pool_root = {}  # pool -> root -> by_* -> osd -> count
+        self.total_by_pool_root = {}  # pool -> root -> by_* -> total
         self.actual_by_pool = {}  # pool -> by_* -> actual weight map
         self.actual_by_root = {}  # pool -> by_* -> actual weight map
         self.total_by_pool = {}   # pool -> by_* -> total
@@ -201,10 +329,59 @@ class Eval:
             }
         return r
 
+
+class ColumnarEval(Eval):
+    """
+    Eval whose statistics are computed with numpy instead of per-OSD
+    python loops.  Produces the same results as Eval.
+    """
+    def calc_stats(self, count, target, total):
+        num = max(len(target), 1)
+        r = {}
+        for t in ('pgs', 'objects', 'bytes'):
+            if total[t] == 0:
+                r[t] = {
+                    'avg': 0,
+                    'stddev': 0,
+                    'sum_weight': 0,
+                    'score': 0,
+                }
+                continue
+
+            avg = float(total[t]) / float(num)
+            keys = list(count[t].keys())
+            values = np.array([count[t][k] for k in keys], dtype=np.float64)
+            weights = np.array([target[k] for k in keys], dtype=np.float64)
+
+            # adjust/normalize by weight
+            adjusted = np.zeros(len(keys))
+            nonzero = weights != 0
+            adjusted[nonzero] = values[nonzero] / weights[nonzero] / float(num)
+
+            # see Eval.calc_stats for the reasoning behind the score
+            over = adjusted > avg
+            x = (adjusted[over] - avg) / avg / math.sqrt(2.0)
+            score = float(np.dot(weights[over], [math.erf(v) for v in x])) \
+                if over.any() else 0.0
+            sum_weight = float(weights[over].sum())
+            dev = float(np.square(avg - adjusted).sum())
+            stddev = math.sqrt(dev / float(max(num - 1, 1)))
+            score = score / max(sum_weight, 1)
+            r[t] = {
+                'avg': avg,
+                'stddev': stddev,
+                'sum_weight': sum_weight,
+                'score': score,
+            }
+        return r
+
+
 class Module(MgrModule):
     OPTIONS = [
             {'name': 'active'},
             {'name': 'begin_time'},
+            {'name': 'columnar_eval'},
+            {'name': 'crush_compat_incremental'},
             {'name': 'crush_compat_max_iterations'},
             {'name': 'crush_compat_step'},
             {'name': 'end_time'},
@@ -214,6 +391,7 @@ class Module(MgrModule):
             {'name': 'sleep_interval'},
             {'name': 'upmap_max_iterations'},
             {'name': 'upmap_max_deviation'},
+            {'name': 'upmap_max_workers'},
     ]
 
     COMMANDS = [
@@ -434,8 +612,26 @@ class Module(MgrModule):
         if name in self.plans:
             del self.plans[name]
 
-    def calc_eval(self, ms, pools):
-        pe = Eval(ms)
+    def get_config_flag(self, key, default):
+        v = self.get_config(key, default)
+        return str(v).lower() not in ('', '0', 'false', 'no')
+
+    def use_columnar_eval(self):
+        if np is None:
+            return False
+        return self.get_config_flag('columnar_eval', 'true')
+
+    def calc_eval(self, ms, pools, base_pe=None):
+        """
+        Evaluate the distribution of ms.  If ms is a delta MappingState and
+        base_pe is the evaluation of its base for the same pools, the
+        counts of pools which were not remapped are taken from base_pe.
+        """
+        columnar = self.use_columnar_eval()
+        if columnar:
+            pe = ColumnarEval(ms)
+        else:
+            pe = Eval(ms)
         pool_rule = {}
         pool_info = {}
         for p in ms.osdmap_dump.get('pools',[]):
@@ -493,7 +689,7 @@ class Module(MgrModule):
                 'objects': {},
                 'bytes': {},
             }
-            for osd in pe.target_by_root[root].iterkeys():
+            for osd in six.iterkeys(pe.target_by_root[root]):
                 actual_by_root[root]['pgs'][osd] = 0
                 actual_by_root[root]['objects'][osd] = 0
                 actual_by_root[root]['bytes'][osd] = 0
@@ -508,76 +704,22 @@ class Module(MgrModule):
 
         # pool and root actual
         for pool, pi in six.iteritems(pool_info):
-            poolid = pi['pool']
-            pm = ms.pg_up_by_poolid[poolid]
-            pgs = 0
-            objects = 0
-            bytes = 0
-            pgs_by_osd = {}
-            objects_by_osd = {}
-            bytes_by_osd = {}
-            for root in pe.pool_roots[pool]:
-                for osd in pe.target_by_root[root].iterkeys():
-                    pgs_by_osd[osd] = 0
-                    objects_by_osd[osd] = 0
-                    bytes_by_osd[osd] = 0
-            for pgid, up in six.iteritems(pm):
-                for osd in [int(osd) for osd in up]:
-                    if osd == CRUSHMap.ITEM_NONE:
-                        continue
-                    pgs_by_osd[osd] += 1
-                    objects_by_osd[osd] += ms.pg_stat[pgid]['num_objects']
-                    bytes_by_osd[osd] += ms.pg_stat[pgid]['num_bytes']
-                    # pick a root to associate this pg instance with.
-                    # note that this is imprecise if the roots have
-                    # overlapping children.
-                    # FIXME: divide bytes by k for EC pools.
-                    for root in pe.pool_roots[pool]:
-                        if osd in pe.target_by_root[root]:
-                            actual_by_root[root]['pgs'][osd] += 1
-                            actual_by_root[root]['objects'][osd] += ms.pg_stat[pgid]['num_objects']
-                            actual_by_root[root]['bytes'][osd] += ms.pg_stat[pgid]['num_bytes']
-                            pgs += 1
-                            objects += ms.pg_stat[pgid]['num_objects']
-                            bytes += ms.pg_stat[pgid]['num_bytes']
-                            pe.total_by_root[root]['pgs'] += 1
-                            pe.total_by_root[root]['objects'] += ms.pg_stat[pgid]['num_objects']
-                            pe.total_by_root[root]['bytes'] += ms.pg_stat[pgid]['num_bytes']
-                            break
-            pe.count_by_pool[pool] = {
-                'pgs': {
-                    k: v
-                    for k, v in six.iteritems(pgs_by_osd)
-                },
-                'objects': {
-                    k: v
-                    for k, v in six.iteritems(objects_by_osd)
-                },
-                'bytes': {
-                    k: v
-                    for k, v in six.iteritems(bytes_by_osd)
-                },
-            }
-            pe.actual_by_pool[pool] = {
-                'pgs': {
-                    k: float(v) / float(max(pgs, 1))
-                    for k, v in six.iteritems(pgs_by_osd)
-                },
-                'objects': {
-                    k: float(v) / float(max(objects, 1))
-                    for k, v in six.iteritems(objects_by_osd)
-                },
-                'bytes': {
-                    k: float(v) / float(max(bytes, 1))
-                    for k, v in six.iteritems(bytes_by_osd)
-                },
-            }
-            pe.total_by_pool[pool] = {
-                'pgs': pgs,
-                'objects': objects,
-                'bytes': bytes,
-            }
-        for root in pe.total_by_root.iterkeys():
+            if self.reuse_pool_actual(ms, pe, base_pe, pool):
+                continue
+            if columnar:
+                self.calc_pool_actual_columnar(ms, pe, pool, pi['pool'])
+            else:
+                self.calc_pool_actual(ms, pe, pool, pi['pool'])
+        for pool in pool_info.keys():
+            for root, counts in six.iteritems(pe.count_by_pool_root[pool]):
+                totals = pe.total_by_pool_root[pool][root]
+                for t in ('pgs', 'objects', 'bytes'):
+                    by_osd = actual_by_root[root][t]
+                    for osd, v in six.iteritems(counts[t]):
+                        by_osd[osd] += v
+                    pe.total_by_root[root][t] += totals[t]
+
+        for root in six.iterkeys(pe.total_by_root):
             pe.count_by_root[root] = {
                 'pgs': {
                     k: float(v)
@@ -637,6 +779,188 @@ class Module(MgrModule):
         pe.score /= 3 * len(roots)
         return pe
 
+    def reuse_pool_actual(self, ms, pe, base_pe, pool):
+        """
+        Take the counts of a pool from the evaluation of the base of a
+        delta MappingState, if that pool was not remapped.
+        """
+        if base_pe is None or ms.base is None or base_pe.ms is not ms.base:
+            return False
+        if pe.pool_id[pool] in ms.changed_poolids or \
+           pool not in base_pe.count_by_pool_root:
+            return False
+        for counts in ('count_by_pool', 'actual_by_pool', 'total_by_pool',
+                       'count_by_pool_root', 'total_by_pool_root'):
+            getattr(pe, counts)[pool] = getattr(base_pe, counts)[pool]
+        return True
+
+    def calc_pool_actual(self, ms, pe, pool, poolid):
+        pm = ms.pg_up_by_poolid[poolid]
+        pgs = 0
+        objects = 0
+        bytes = 0
+        pgs_by_osd = {}
+        objects_by_osd = {}
+        bytes_by_osd = {}
+        count_by_root = {}
+        total_by_root = {}
+        for root in pe.pool_roots[pool]:
+            count_by_root[root] = {
+                'pgs': {},
+                'objects': {},
+                'bytes': {},
+            }
+            for osd in six.iterkeys(pe.target_by_root[root]):
+                pgs_by_osd[osd] = 0
+                objects_by_osd[osd] = 0
+                bytes_by_osd[osd] = 0
+                count_by_root[root]['pgs'][osd] = 0
+                count_by_root[root]['objects'][osd] = 0
+                count_by_root[root]['bytes'][osd] = 0
+            total_by_root[root] = {
+                'pgs': 0,
+                'objects': 0,
+                'bytes': 0,
+            }
+        for pgid, up in six.iteritems(pm):
+            for osd in [int(osd) for osd in up]:
+                if osd == CRUSHMap.ITEM_NONE:
+                    continue
+                pgs_by_osd[osd] += 1
+                objects_by_osd[osd] += ms.pg_stat[pgid]['num_objects']
+                bytes_by_osd[osd] += ms.pg_stat[pgid]['num_bytes']
+                # pick a root to associate this pg instance with.
+                # note that this is imprecise if the roots have
+                # overlapping children.
+                # FIXME: divide bytes by k for EC pools.
+                for root in pe.pool_roots[pool]:
+                    if osd in pe.target_by_root[root]:
+                        count_by_root[root]['pgs'][osd] += 1
+                        count_by_root[root]['objects'][osd] += ms.pg_stat[pgid]['num_objects']
+                        count_by_root[root]['bytes'][osd] += ms.pg_stat[pgid]['num_bytes']
+                        pgs += 1
+                        objects += ms.pg_stat[pgid]['num_objects']
+                        bytes += ms.pg_stat[pgid]['num_bytes']
+                        total_by_root[root]['pgs'] += 1
+                        total_by_root[root]['objects'] += ms.pg_stat[pgid]['num_objects']
+                        total_by_root[root]['bytes'] += ms.pg_stat[pgid]['num_bytes']
+                        break
+        pe.count_by_pool_root[pool] = count_by_root
+        pe.total_by_pool_root[pool] = total_by_root
+        self.set_pool_actual(pe, pool, pgs_by_osd, objects_by_osd,
+                             bytes_by_osd, pgs, objects, bytes)
+
+    def calc_pool_actual_columnar(self, ms, pe, pool, poolid):
+        """
+        Same as calc_pool_actual(), but accumulates the per-OSD counts of
+        all PGs of the pool at once using the dense arrays of the
+        MappingState.
+        """
+        roots = pe.pool_roots[pool]
+        up, pool_objects, pool_bytes = ms.columns().pool(poolid)
+        width = up.shape[1]
+        flat = up.ravel()
+        valid = flat >= 0
+        osds = flat[valid]
+        pg_objects = np.repeat(pool_objects, width)[valid]
+        pg_bytes = np.repeat(pool_bytes, width)[valid]
+
+        # map each osd to the first root of this pool containing it.
+        # note that this is imprecise if the roots have
+        # overlapping children.
+        # FIXME: divide bytes by k for EC pools.
+        nosd = int(osds.max()) + 1 if osds.size else 0
+        for root in roots:
+            if pe.target_by_root[root]:
+                nosd = max(nosd, max(pe.target_by_root[root].keys()) + 1)
+        root_of = np.full(nosd, -1, dtype=np.int64)
+        for i, root in reversed(list(enumerate(roots))):
+            root_of[list(pe.target_by_root[root].keys())] = i
+        osd_root = root_of[osds]
+
+        pgs_by_osd = np.bincount(osds, minlength=nosd)
+        objects_by_osd = np.bincount(osds, weights=pg_objects,
+                                     minlength=nosd)
+        bytes_by_osd = np.bincount(osds, weights=pg_bytes,
+                                   minlength=nosd)
+
+        keys = set(int(osd) for osd in np.flatnonzero(pgs_by_osd))
+        for root in roots:
+            keys.update(pe.target_by_root[root].keys())
+
+        in_root = osd_root >= 0
+        pgs = int(in_root.sum())
+        objects = int(pg_objects[in_root].sum())
+        bytes = int(pg_bytes[in_root].sum())
+
+        count_by_root = {}
+        total_by_root = {}
+        for i, root in enumerate(roots):
+            mask = osd_root == i
+            r_osds = osds[mask]
+            r_objects = pg_objects[mask]
+            r_bytes = pg_bytes[mask]
+            r_pgs_by_osd = np.bincount(r_osds, minlength=nosd)
+            r_objects_by_osd = np.bincount(r_osds, weights=r_objects,
+                                           minlength=nosd)
+            r_bytes_by_osd = np.bincount(r_osds, weights=r_bytes,
+                                         minlength=nosd)
+            target = pe.target_by_root[root]
+            count_by_root[root] = {
+                'pgs': {k: int(r_pgs_by_osd[k]) for k in target},
+                'objects': {k: int(r_objects_by_osd[k]) for k in target},
+                'bytes': {k: int(r_bytes_by_osd[k]) for k in target},
+            }
+            total_by_root[root] = {
+                'pgs': int(mask.sum()),
+                'objects': int(r_objects.sum()),
+                'bytes': int(r_bytes.sum()),
+            }
+        pe.count_by_pool_root[pool] = count_by_root
+        pe.total_by_pool_root[pool] = total_by_root
+        self.set_pool_actual(
+            pe, pool,
+            {k: int(pgs_by_osd[k]) for k in keys},
+            {k: int(objects_by_osd[k]) for k in keys},
+            {k: int(bytes_by_osd[k]) for k in keys},
+            pgs, objects, bytes)
+
+    def set_pool_actual(self, pe, pool, pgs_by_osd, objects_by_osd,
+                        bytes_by_osd, pgs, objects, bytes):
+        pe.count_by_pool[pool] = {
+            'pgs': {
+                k: v
+                for k, v in six.iteritems(pgs_by_osd)
+            },
+            'objects': {
+                k: v
+                for k, v in six.iteritems(objects_by_osd)
+            },
+            'bytes': {
+                k: v
+                for k, v in six.iteritems(bytes_by_osd)
+            },
+        }
+        pe.actual_by_pool[pool] = {
+            'pgs': {
+                k: float(v) / float(max(pgs, 1))
+                for k, v in six.iteritems(pgs_by_osd)
+            },
+            'objects': {
+                k: float(v) / float(max(objects, 1))
+                for k, v in six.iteritems(objects_by_osd)
+            },
+            'bytes': {
+                k: float(v) / float(max(bytes, 1))
+                for k, v in six.iteritems(bytes_by_osd)
+            },
+        }
+        pe.total_by_pool[pool] = {
+            'pgs': pgs,
+            'objects': objects,
+            'bytes': bytes,
+        }
+
     def evaluate(self, ms, pools, verbose=False):
         pe = self.calc_eval(ms, pools)
         return pe.show(verbose=verbose)
@@ -692,6 +1016,8 @@ class Module(MgrModule):
         self.log.info('do_upmap')
         max_iterations = int(self.get_config('upmap_max_iterations', 10))
         max_deviation = float(self.get_config('upmap_max_deviation', .01))
+        max_workers = int(self.get_config('upmap_max_workers',
+                                          default_upmap_max_workers))
 
         ms = plan.initial
         if len(plan.pools):
@@ -706,21 +1032,131 @@ class Module(MgrModule):
         random.shuffle(pools)
         self.log.info('pools %s' % pools)
 
-        inc = plan.inc
-        total_did = 0
-        left = max_iterations
-        for pool in pools:
-            did = ms.osdmap.calc_pg_upmaps(inc, max_deviation, left, [pool])
-            total_did += did
-            left -= did
-            if left <= 0:
-                break
+        left = min(max_iterations, self.get_misplaced_budget(ms))
+        groups = self.get_pool_groups(ms, pools)
+        self.log.debug('pool groups %s' % groups)
+        if max_workers > 1 and len(groups) > 1:
+            total_did = self.calc_upmaps_parallel(ms, plan.inc, groups,
+                                                  max_deviation, left,
+                                                  max_workers)
+        else:
+            inc = plan.inc
+            total_did = 0
+            for pool in pools:
+                did = ms.osdmap.calc_pg_upmaps(inc, max_deviation, left, [pool])
+                total_did += did
+                left -= did
+                if left <= 0:
+                    break
         self.log.info('prepared %d/%d changes' % (total_did, max_iterations))
         if total_did == 0:
             return -errno.EALREADY, 'Unable to find further optimization,' \
                                     'or distribution is already perfect'
         return 0, ''
 
+    def get_misplaced_budget(self, ms):
+        """
+        Number of PGs that may still be remapped without the misplaced
+        ratio exceeding max_misplaced.
+        """
+        max_misplaced = float(self.get_config('max_misplaced',
+                                              default_max_misplaced))
+        misplaced = self.get('pg_status').get('misplaced_ratio', 0.0)
+        budget = int((max_misplaced - misplaced) * len(ms.pg_up))
+        return max(budget, 1)
+
+    def get_pool_groups(self, ms, pools):
+        """
+        Split pools into groups which do not share any OSD (i.e. whose
+        CRUSH rules take disjoint subtrees), so that the upmaps of each
+        group can be calculated independently.
+
+        :return: list of lists of pool names
+        """
+        pool_ids = {
+            p['pool_name']: p['pool'] for p in ms.osdmap_dump.get('pools', [])
+        }
+        osds_by_poolid = {}
+        for rootid in ms.crush.find_takes():
+            osds = set(ms.crush.get_take_weight_osd_map(rootid).keys())
+            for poolid in ms.osdmap.get_pools_by_take(rootid):
+                osds_by_poolid.setdefault(poolid, set()).update(osds)
+
+        groups = []   # [(osds, pools)]
+        for pool in pools:
+            osds = set(osds_by_poolid.get(pool_ids.get(pool), set()))
+            members = [pool]
+            rest = []
+            for group_osds, group_pools in groups:
+                if group_osds & osds:
+                    osds |= group_osds
+                    members = group_pools + members
+                else:
+                    rest.append((group_osds, group_pools))
+            groups = rest + [(osds, members)]
+        return [group_pools for group_osds, group_pools in groups]
+
+    def calc_upmaps_parallel(self, ms, inc, groups, max_deviation, left,
+                             max_workers):
+        """
+        Calculate the upmaps of each pool group in its own incremental,
+        using up to max_workers threads, and merge them into inc.  The
+        budget of left changes is split between the groups by their
+        number of PGs.
+
+        :return: number of changes prepared
+        """
+        pool_ids = {
+            p['pool_name']: p['pool'] for p in ms.osdmap_dump.get('pools', [])
+        }
+        num_pgs = [
+            sum(len(ms.pg_up_by_poolid.get(pool_ids.get(pool), {}))
+                for pool in pools)
+            for pools in groups
+        ]
+        total_pgs = max(sum(num_pgs), 1)
+        budgets = [left * n // total_pgs for n in num_pgs]
+        by_size = sorted(range(len(groups)), key=lambda i: -num_pgs[i])
+        for i in by_size[:left - sum(budgets)]:
+            budgets[i] += 1
+
+        todo = [(groups[i], budgets[i]) for i in by_size if budgets[i] > 0]
+        results = []
+        lock = Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    if not todo:
+                        return
+                    pools, budget = todo.pop(0)
+                group_inc = ms.osdmap.new_incremental()
+                start = time.time()
+                try:
+                    did = ms.osdmap.calc_pg_upmaps(group_inc, max_deviation,
+                                                   budget, pools)
+                except Exception as e:
+                    self.log.error('calc_pg_upmaps for pools %s failed: %s',
+                                   pools, e)
+                    continue
+                self.log.debug('pools %s: prepared %d/%d changes in %.3fs',
+                               pools, did, budget, time.time() - start)
+                with lock:
+                    results.append((group_inc, did))
+
+        threads = [Thread(target=worker)
+                   for i in range(min(max_workers, len(todo)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        total_did = 0
+        for group_inc, did in results:
+            inc.merge_pg_upmaps(group_inc)
+            total_did += did
+        return total_did
+
     def do_crush_compat(self, plan):
         self.log.info('do_crush_compat')
         max_iterations = int(self.get_config('crush_compat_max_iterations', 25))
@@ -732,6 +1168,7 @@ class Module(MgrModule):
         max_misplaced = float(self.get_config('max_misplaced',
                                               default_max_misplaced))
         min_pg_per_osd = 2
+        incremental = self.get_config_flag('crush_compat_incremental', 'true')
 
         ms = plan.initial
         osdmap = ms.osdmap
@@ -767,7 +1204,7 @@ class Module(MgrModule):
         overlap = {}
         root_ids = {}
         for root, wm in six.iteritems(pe.target_by_root):
-            for osd in wm.iterkeys():
+            for osd in six.iterkeys(wm):
                 if osd in visited:
                     if osd not in overlap:
                         overlap[osd] = [ visited[osd] ]
@@ -851,8 +1288,16 @@ class Module(MgrModule):
 
             # recalc
             plan.compat_ws = copy.deepcopy(next_ws)
-            next_ms = plan.final_state()
-            next_pe = self.calc_eval(next_ms, plan.pools)
+            if incremental:
+                # only remap and re-evaluate the pools affected by the
+                # osds whose weight-set weight differs from the start
+                changed = set(osd for osd, w in six.iteritems(next_ws)
+                              if orig_ws.get(osd) != w)
+                next_ms = plan.final_state(changed_osds=changed)
+                next_pe = self.calc_eval(next_ms, plan.pools, base_pe=pe)
+            else:
+                next_ms = plan.final_state()
+                next_pe = self.calc_eval(next_ms, plan.pools)
             next_misplaced = next_ms.calc_misplaced_from(ms)
             self.log.debug('Step result score %f -> %f, misplacing %f',
                            best_pe.score, next_pe.score, next_misplaced)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import logging
+import random
+import sys
+import types
+import unittest
+
+# mgr_module derives its classes from the ones of the C++ ceph_module, give
+# it plain classes to derive from
+if not isinstance(sys.modules.get('ceph_module'), types.ModuleType):
+    ceph_module = types.ModuleType('ceph_module')
+    for name in ('BasePyOSDMap', 'BasePyOSDMapIncremental', 'BasePyCRUSH',
+                 'BaseMgrStandbyModule', 'BaseMgrModule'):
+        setattr(ceph_module, name, type(name, (object,), {}))
+    sys.modules['ceph_module'] = ceph_module
+
+from mgr_module import CRUSHMap  # noqa: E402 pylint: disable=wrong-import-position
+from ..module import ColumnarEval, Eval, MappingState, Module, np  # noqa: E402 pylint: disable=wrong-import-position
+
+
+# root id -> (name, crush weight by osd)
+ROOTS = {
+    -1: ('default', {0: 1.0, 1: 1.0, 2: 2.0, 3: 0.5, 4: 1.0, 5: 0.0}),
+    -2: ('ssd', {6: 1.0, 7: 1.0, 8: 1.0}),
+}
+# osd 4 is out, osd 5 has no crush weight
+REWEIGHTS = {4: 0.0, 6: 0.5}
+# pool id -> (name, root id, pg_num, size, has objects)
+POOLS = {
+    1: ('rbd', -1, 64, 3, True),
+    2: ('ec', -1, 32, 4, True),
+    3: ('fast', -2, 16, 2, True),
+    4: ('empty', -2, 8, 2, False),
+}
+
+
+class FakeCRUSH(object):
+    def find_takes(self):
+        return sorted(ROOTS)
+
+    def get_item_name(self, rootid):
+        return ROOTS[rootid][0]
+
+    def get_take_weight_osd_map(self, rootid):
+        return dict(ROOTS[rootid][1])
+
+
+class FakeOSDMap(object):
+    def __init__(self, pg_up):
+        self.pg_up = pg_up
+
+    def get_crush(self):
+        return FakeCRUSH()
+
+    def dump(self):
+        return {
+            'pools': [{'pool': poolid, 'pool_name': name, 'crush_rule': root}
+                      for poolid, (name, root, _, _, _) in POOLS.items()],
+            'osds': [{'osd': osd, 'weight': REWEIGHTS.get(osd, 1.0)}
+                     for _, weights in ROOTS.values() for osd in weights],
+        }
+
+    def map_pool_pgs_up(self, poolid):
+        return dict((pgid, up) for pgid, up in self.pg_up.items()
+                    if pgid.startswith('%d.' % poolid))
+
+    def get_pools_by_take(self, rootid):
+        return [poolid for poolid, pool in POOLS.items() if pool[1] == rootid]
+
+
+def mapping_state(seed):
+    rand = random.Random(seed)
+    pg_up = {}
+    pg_stats = []
+    for poolid, (name, root, pg_num, size, has_objects) in POOLS.items():
+        # crush does not map pgs to out or zero weight osds
+        osds = sorted(osd for osd, weight in ROOTS[root][1].items()
+                      if weight > 0 and REWEIGHTS.get(osd, 1.0) > 0)
+        for ps in range(pg_num):
+            pgid = '%d.%x' % (poolid, ps)
+            up = rand.sample(osds, size)
+            if name == 'ec' and ps % 5 == 0:
+                # a hole in an erasure coded up set
+                up[rand.randrange(size)] = CRUSHMap.ITEM_NONE
+            pg_up[pgid] = up
+            objects = rand.randrange(1000) if has_objects else 0
+            pg_stats.append({
+                'pgid': pgid,
+                'stat_sum': {'num_objects': objects,
+                             'num_bytes': objects * rand.randrange(1, 1 << 22)},
+            })
+    pg_dump = {
+        'pg_stats': pg_stats,
+        'pool_stats': [{'poolid': poolid} for poolid in POOLS],
+    }
+    return MappingState(FakeOSDMap(pg_up), pg_dump, 'seed %d' % seed)
+
+
+class FakeModule(Module):
+    log = logging.getLogger(__name__)
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, columnar):
+        self.config = {'columnar_eval': 'true' if columnar else 'false'}
+
+    def get_config(self, key, default=None):
+        return self.config.get(key, default)
+
+
+@unittest.skipIf(np is None, 'numpy is not available')
+class ColumnarEvalTest(unittest.TestCase):
+
+    def assertClose(self, first, second, path=''):
+        if isinstance(first, dict):
+            self.assertEqual(sorted(first), sorted(second), path)
+            for k in first:
+                self.assertClose(first[k], second[k], '%s/%s' % (path, k))
+        elif isinstance(first, float) or isinstance(second, float):
+            self.assertAlmostEqual(first, second, places=9, msg=path)
+        else:
+            self.assertEqual(first, second, path)
+
+    def evaluate(self, ms, pools):
+        pe = FakeModule(False).calc_eval(ms, pools)
+        columnar_pe = FakeModule(True).calc_eval(ms, pools)
+        self.assertIs(type(pe), Eval)
+        self.assertIs(type(columnar_pe), ColumnarEval)
+        return pe, columnar_pe
+
+    def assertSameEval(self, pe, columnar_pe):
+        for attr in ('pool_roots', 'root_pools', 'target_by_root',
+                     'count_by_pool', 'count_by_root',
+                     'count_by_pool_root', 'total_by_pool_root',
+                     'total_by_pool', 'total_by_root',
+                     'actual_by_pool', 'actual_by_root',
+                     'stats_by_root', 'score_by_root'):
+            self.assertClose(getattr(pe, attr), getattr(columnar_pe, attr),
+                             attr)
+        self.assertAlmostEqual(pe.score, columnar_pe.score, places=9)
+
+    def test_all_pools(self):
+        for seed in range(5):
+            pe, columnar_pe = self.evaluate(mapping_state(seed), [])
+            self.assertSameEval(pe, columnar_pe)
+            self.assertGreater(pe.score, 0)
+            stats = pe.stats_by_root['default']['pgs']
+            self.assertGreater(stats['stddev'], 0)
+            self.assertGreater(stats['score'], 0)
+
+    def test_pool_subset(self):
+        ms = mapping_state(0)
+        for pools in (['rbd'], ['ec', 'fast'], ['empty']):
+            pe, columnar_pe = self.evaluate(ms, pools)
+            self.assertEqual(sorted(pe.count_by_pool), sorted(pools))
+            self.assertSameEval(pe, columnar_pe)
+
+    def test_empty_root(self):
+        pe, columnar_pe = self.evaluate(mapping_state(0), ['empty'])
+        self.assertSameEval(pe, columnar_pe)
+        for t in ('objects', 'bytes'):
+            self.assertEqual(columnar_pe.stats_by_root['ssd'][t]['stddev'], 0)
+            self.assertEqual(columnar_pe.stats_by_root['ssd'][t]['score'], 0)
+
+    def test_holes_and_out_osds(self):
+        pe, columnar_pe = self.evaluate(mapping_state(0), ['ec'])
+        self.assertSameEval(pe, columnar_pe)
+        counts = columnar_pe.count_by_pool['ec']['pgs']
+        # holes are not counted
+        self.assertLess(sum(counts.values()), 32 * 4)
+        self.assertNotIn(CRUSHMap.ITEM_NONE, counts)
+        # out and zero weight osds are not part of the target
+        self.assertEqual(sorted(counts), [0, 1, 2, 3])
+        self.assertEqual(sorted(columnar_pe.target_by_root['default']),
+                         [0, 1, 2, 3])
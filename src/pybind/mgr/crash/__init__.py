@@ -1 +1,5 @@
-from .module import Module
+from __future__ import absolute_import
+import os
+
+if 'UNITTEST' not in os.environ:
+    from .module import Module
@@ -4,16 +4,29 @@ import errno
 import json
 import six
 from collections import defaultdict
+from threading import Lock
 
 
 DATEFMT = '%Y-%m-%d %H:%M:%S.%f'
 
+# store key of the crash index, outside of the crash/ prefix
+INDEX_KEY = 'crash_index'
+# format version of the stored crash index, indexes of any other version
+# are rebuilt from the crash reports
+INDEX_VERSION = 1
+# the crash metadata fields kept in the index
+INDEX_FIELDS = ['timestamp', 'entity_name', 'ceph_version']
+
 
 class Module(MgrModule):
 
     def __init__(self, *args, **kwargs):
         super(Module, self).__init__(*args, **kwargs)
 
+        # crash_id -> the INDEX_FIELDS of the crash, loaded on first use
+        self._index = None
+        self._index_lock = Lock()
+
     def handle_command(self, inbuf, command):
         for cmd in self.COMMANDS:
             if cmd['cmd'].startswith(command['prefix']):
@@ -38,21 +51,86 @@ class Module(MgrModule):
         timestr = timestr.rstrip('Z')
         return datetime.datetime.strptime(timestr, DATEFMT)
 
+    @staticmethod
+    def index_entry(metadata):
+        return dict((field, metadata[field]) for field in INDEX_FIELDS
+                    if field in metadata)
+
+    def _load_index(self):
+        """
+        :returns: the stored crash index, or None if there is none, or
+                  it is of another version
+        """
+        index = self.get_store(INDEX_KEY)
+        if not index:
+            return None
+        try:
+            index = json.loads(index)
+        except ValueError:
+            return None
+        if not isinstance(index, dict) or \
+                index.get('version') != INDEX_VERSION:
+            return None
+        return index['crashes']
+
+    def _get_index(self):
+        """
+        Get the crash index, loading it on first use. A missing or
+        outdated index is rebuilt from the crash reports. As mgrs without
+        the index (e.g. during an upgrade) post and remove crashes without
+        updating it, the crash ids of the index are checked against the
+        crash reports when loading it. Call with _index_lock held.
+        """
+        if self._index is None:
+            crashes = self.get_store_prefix('crash/')
+            crashids = set(key[len('crash/'):] for key in crashes)
+            index = self._load_index()
+            changed = index is None
+            if index is None:
+                self.log.info('building crash index')
+                index = {}
+            for crashid in set(index) - crashids:
+                del index[crashid]
+                changed = True
+            for crashid in crashids - set(index):
+                try:
+                    meta = json.loads(crashes['crash/' + crashid])
+                except ValueError:
+                    self.log.warn('skipping malformed crash %s' % crashid)
+                    continue
+                index[crashid] = self.index_entry(meta)
+                changed = True
+            self._index = index
+            if changed:
+                self._save_index()
+        return self._index
+
+    def _save_index(self):
+        self.set_store(INDEX_KEY, json.dumps({
+            'version': INDEX_VERSION,
+            'crashes': self._index,
+        }))
+
+    def get_index(self):
+        """
+        :returns: a copy of the crash index, as a dict mapping crash ids
+                  to the INDEX_FIELDS of the crashes
+        """
+        with self._index_lock:
+            return dict(self._get_index())
+
     def timestamp_filter(self, f):
         """
-        Filter crash reports by timestamp.
+        Filter crashes by timestamp.
 
         :param f: f(time) return true to keep crash report
-        :returns: crash reports for which f(time) returns true
+        :returns: (crash id, index entry) pairs of the crashes for which
+                  f(time) returns true
         """
-        def inner(pair):
-            _, meta = pair
-            meta = json.loads(meta)
-            time = self.time_from_string(meta["timestamp"])
-            return f(time)
-        matches = filter(inner, six.iteritems(
-            self.get_store_prefix("crash/")))
-        return [(k, json.loads(m)) for k, m in matches]
+        return [(crashid, entry)
+                for crashid, entry in six.iteritems(self.get_index())
+                if 'timestamp' in entry and
+                f(self.time_from_string(entry['timestamp']))]
 
     # command handlers
 
@@ -75,18 +153,36 @@ class Module(MgrModule):
         # repeated stores of same item are ignored silently
         if not self.get_store(key):
             self.set_store(key, inbuf)
+            with self._index_lock:
+                self._get_index()[crashid] = self.index_entry(metadata)
+                self._save_index()
         return 0, '', ''
 
     def do_ls(self, cmd, inbuf):
-        keys = []
-        for key in self.get_store_prefix('crash/').iterkeys():
-            keys.append(key.replace('crash/', ''))
-        return 0, '\n'.join(keys), ''
+        # crash ids start with the timestamp, list them oldest first
+        crashids = sorted(self.get_index())
+        start = cmd.get('start')
+        if start:
+            crashids = [c for c in crashids if c > start]
+        limit = cmd.get('limit')
+        if limit is not None:
+            if limit < 0:
+                return errno.EINVAL, '', 'limit must not be negative'
+            crashids = crashids[:limit]
+        return 0, '\n'.join(crashids), ''
+
+    def remove_crashes(self, crashids):
+        for crashid in crashids:
+            self.set_store('crash/%s' % crashid, None)       # removes key
+        with self._index_lock:
+            index = self._get_index()
+            removed = [index.pop(crashid) for crashid in crashids
+                       if crashid in index]
+            if removed:
+                self._save_index()
 
     def do_rm(self, cmd, inbuf):
-        crashid = cmd['id']
-        key = 'crash/%s' % crashid
-        self.set_store(key, None)       # removes key
+        self.remove_crashes([cmd['id']])
         return 0, '', ''
 
     def do_prune(self, cmd, inbuf):
@@ -100,8 +196,8 @@ class Module(MgrModule):
 
         cutoff = now - datetime.timedelta(days=keep)
 
-        for key, _ in self.timestamp_filter(lambda ts: ts <= cutoff):
-            self.set_store(key, None)
+        self.remove_crashes([crashid for crashid, _ in
+                             self.timestamp_filter(lambda ts: ts <= cutoff)])
 
         return 0, '', ''
 
@@ -131,11 +227,9 @@ class Module(MgrModule):
                 'idlist': list()
             }
 
-        for key, meta in six.iteritems(self.get_store_prefix('crash/')):
+        for crashid, entry in six.iteritems(self.get_index()):
             total += 1
-            meta = json.loads(meta)
-            stamp = self.time_from_string(meta['timestamp'])
-            crashid = meta['crash_id']
+            stamp = self.time_from_string(entry['timestamp'])
             for i, bindict in enumerate(bins):
                 if stamp <= bindict['agelimit']:
                     bindict['idlist'].append(crashid)
@@ -188,8 +282,11 @@ class Module(MgrModule):
             'handler': do_info,
         },
         {
-            'cmd': 'crash ls',
-            'desc': 'Show saved crash dumps',
+            'cmd': 'crash ls '
+                   'name=limit,type=CephInt,req=false '
+                   'name=start,type=CephString,req=false',
+            'desc': 'Show saved crash dumps, oldest first, at most <limit> '
+                    'of them after crash <start>',
             'perm': 'r',
             'handler': do_ls,
         },
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import json
+import logging
+import sys
+import types
+import unittest
+from threading import Lock
+
+# mgr_module derives its classes from the ones of the C++ ceph_module, give
+# it plain classes to derive from
+if not isinstance(sys.modules.get('ceph_module'), types.ModuleType):
+    ceph_module = types.ModuleType('ceph_module')
+    for name in ('BasePyOSDMap', 'BasePyOSDMapIncremental', 'BasePyCRUSH',
+                 'BaseMgrStandbyModule', 'BaseMgrModule'):
+        setattr(ceph_module, name, type(name, (object,), {}))
+    sys.modules['ceph_module'] = ceph_module
+
+from ..module import INDEX_KEY, INDEX_VERSION, Module  # noqa: E402 pylint: disable=wrong-import-position
+
+
+class FakeModule(Module):
+    log = logging.getLogger(__name__)
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, store):
+        self._index = None
+        self._index_lock = Lock()
+        self.store = store
+
+    def get_store(self, key, default=None):
+        return self.store.get(key, default)
+
+    def set_store(self, key, val):
+        if val is None:
+            self.store.pop(key, None)
+        else:
+            self.store[key] = val
+
+    def get_store_prefix(self, key_prefix):
+        return dict((k, v) for k, v in self.store.items()
+                    if k.startswith(key_prefix))
+
+
+def crash(crashid, entity_name='osd.0'):
+    return json.dumps({
+        'crash_id': crashid,
+        'timestamp': crashid[:26],
+        'entity_name': entity_name,
+        'ceph_version': '14.0.0',
+        'backtrace': ['a', 'b'],
+    })
+
+
+ID1 = '2019-01-01 00:00:00.000000_1'
+ID2 = '2019-01-02 00:00:00.000000_2'
+ID3 = '2019-01-03 00:00:00.000000_3'
+
+
+class CrashIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = {
+            'crash/' + ID1: crash(ID1),
+            'crash/' + ID2: crash(ID2, 'mon.a'),
+        }
+
+    def module(self):
+        return FakeModule(self.store)
+
+    def stored_index(self):
+        index = json.loads(self.store[INDEX_KEY])
+        self.assertEqual(index['version'], INDEX_VERSION)
+        return index['crashes']
+
+    def test_build(self):
+        index = self.module().get_index()
+        self.assertEqual(sorted(index), [ID1, ID2])
+        self.assertEqual(index[ID2], {
+            'timestamp': ID2[:26],
+            'entity_name': 'mon.a',
+            'ceph_version': '14.0.0',
+        })
+        self.assertEqual(self.stored_index(), index)
+
+    def test_post_and_rm(self):
+        module = self.module()
+        module.do_post({}, crash(ID3))
+        self.assertEqual(sorted(self.stored_index()), [ID1, ID2, ID3])
+        module.do_rm({'id': ID1}, '')
+        self.assertEqual(sorted(self.stored_index()), [ID2, ID3])
+        self.assertNotIn('crash/' + ID1, self.store)
+        # a new mgr loads the stored index
+        self.assertEqual(sorted(self.module().get_index()), [ID2, ID3])
+
+    def test_stored_index_is_used(self):
+        self.module().get_index()
+        self.store['crash/' + ID1] = 'malformed, but already indexed'
+        self.assertEqual(sorted(self.module().get_index()), [ID1, ID2])
+
+    def test_rebuild_unversioned_index(self):
+        # the index of a previous version: no version, and incomplete
+        self.store[INDEX_KEY] = json.dumps({ID1: {}})
+        index = self.module().get_index()
+        self.assertEqual(sorted(index), [ID1, ID2])
+        self.assertEqual(index[ID1]['entity_name'], 'osd.0')
+        self.assertEqual(self.stored_index(), index)
+
+    def test_rebuild_other_version(self):
+        self.store[INDEX_KEY] = json.dumps({'version': INDEX_VERSION + 1,
+                                            'crashes': {}})
+        self.assertEqual(sorted(self.module().get_index()), [ID1, ID2])
+        self.assertEqual(sorted(self.stored_index()), [ID1, ID2])
+
+    def test_changes_without_index(self):
+        self.module().get_index()
+        # an older mgr posts and removes crashes without updating the index
+        self.store['crash/' + ID3] = crash(ID3)
+        del self.store['crash/' + ID1]
+        index = self.module().get_index()
+        self.assertEqual(sorted(index), [ID2, ID3])
+        self.assertEqual(index[ID3]['entity_name'], 'osd.0')
+        self.assertEqual(sorted(self.stored_index()), [ID2, ID3])
+
+    def test_malformed_crash(self):
+        self.store['crash/' + ID3] = 'not json'
+        self.assertEqual(sorted(self.module().get_index()), [ID1, ID2])
+
+    def test_ls(self):
+        module = self.module()
+        self.assertEqual(module.do_ls({}, ''), (0, '\n'.join([ID1, ID2]), ''))
+        self.assertEqual(module.do_ls({'start': ID1}, ''), (0, ID2, ''))
+        self.assertEqual(module.do_ls({'limit': 1}, ''), (0, ID1, ''))
@@ -3,12 +3,14 @@
 from __future__ import absolute_import
 
 import collections
+import hashlib
 import importlib
 import inspect
 import json
 import os
 import pkgutil
 import sys
+import uuid
 from six import add_metaclass
 
 if sys.version_info >= (3, 0):
@@ -18,6 +20,7 @@ else:
 
 # pylint: disable=wrong-import-position
 import cherrypy
+from cherrypy.lib.cptools import validate_etags
 
 from .. import logger
 from ..security import Scope, Permission
@@ -350,6 +353,158 @@ class Task(object):
         return wrapper
 
 
+class Paginated(object):
+    """
+    Opt-in paging, sorting, filtering and field selection for endpoints
+    returning a list, controlled by these query parameters:
+
+    * ``offset``, ``limit``: return at most ``limit`` items, starting at
+      ``offset``
+    * ``sort``: comma separated list of (dotted) keys to sort the items by,
+      prefix a key with ``-`` to sort in descending order
+    * ``filter``: comma separated list of ``key:value`` pairs the items need
+      to match
+    * ``search``: only return items containing this string in any of the
+      ``search_keys`` (all values of an item by default)
+    * ``fields``: comma separated list of keys to return for every item
+
+    Without these parameters the response is the same as without this
+    decorator. The number of items matching the filters is returned in the
+    ``X-Total-Count`` header. JSON responses carry an ETag, computed from
+    the response body, so that unchanged results are not sent again to
+    clients sending ``If-None-Match``.
+
+    If ``group_key`` is set, the endpoint returns a list of groups of items
+    (e.g. RBD images by pool), and the items in ``group[group_key]`` of every
+    group are paged, sorted and filtered separately.
+
+    If ``validator`` is set, it is called with the arguments of the endpoint
+    and returns a cheap version of the data the list is built from (e.g.
+    map epochs), or None if there is none.  The ETag is then derived from
+    that version and the query parameters, and clients whose
+    ``If-None-Match`` matches get a ``304 Not Modified`` before the list is
+    built at all.
+    """
+    PARAMS = ['offset', 'limit', 'sort', 'filter', 'search', 'fields']
+    # versions are only comparable within the same mgr daemon, which may
+    # run another release after a failover
+    _ETAG_SALT = uuid.uuid4().hex
+
+    def __init__(self, search_keys=None, group_key=None, validator=None):
+        self.search_keys = search_keys
+        self.group_key = group_key
+        self.validator = validator
+
+    def _validate(self, version, params, args, kwargs):
+        tag = json.dumps([self._ETAG_SALT, version, params, args, kwargs],
+                         sort_keys=True)
+        cherrypy.response.headers['ETag'] = '"{}"'.format(
+            hashlib.md5(tag.encode('utf8')).hexdigest())
+        # answers 'If-None-Match' requests with '304 Not Modified'
+        validate_etags()
+
+    @staticmethod
+    def _lookup(item, path):
+        for key in path:
+            if not isinstance(item, dict):
+                return None
+            item = item.get(key)
+        return item
+
+    def _matches_search(self, item, search):
+        if not isinstance(item, dict):
+            values = [item]
+        elif self.search_keys:
+            values = [self._lookup(item, key.split('.'))
+                      for key in self.search_keys]
+        else:
+            values = item.values()
+        return any(search in str(value).lower() for value in values
+                   if not isinstance(value, (dict, list)))
+
+    def _process(self, items, params):
+        if params['filter']:
+            for condition in params['filter'].split(','):
+                key, _, value = condition.partition(':')
+                path = key.split('.')
+                items = [item for item in items
+                         if str(self._lookup(item, path)) == value]
+
+        if params['search']:
+            search = params['search'].lower()
+            items = [item for item in items
+                     if self._matches_search(item, search)]
+
+        if params['sort']:
+            # stable sort, starting with the least significant key
+            for key in reversed(params['sort'].split(',')):
+                reverse = key.startswith('-')
+                path = key.lstrip('-+').split('.')
+
+                def sort_key(item, path=path):
+                    value = item if not isinstance(item, dict) \
+                        else self._lookup(item, path)
+                    return value is not None, value
+                try:
+                    items = sorted(items, key=sort_key, reverse=reverse)
+                except TypeError:
+                    raise cherrypy.HTTPError(400, 'Unable to sort by {}'
+                                             .format(key))
+
+        total = len(items)
+        try:
+            offset = int(params['offset'] or 0)
+            limit = int(params['limit']) if params['limit'] else None
+        except ValueError:
+            raise cherrypy.HTTPError(400, 'offset and limit must be integers')
+        if offset or limit is not None:
+            items = items[offset:offset + limit if limit is not None else None]
+
+        if params['fields']:
+            fields = params['fields'].split(',')
+            items = [dict((f, item[f]) for f in fields if f in item)
+                     if isinstance(item, dict) else item for item in items]
+
+        return items, total
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            params = dict((p, kwargs.pop(p, None)) for p in self.PARAMS)
+            version = None
+            if self.validator is not None:
+                version = self.validator(*args, **kwargs)
+            if version is not None:
+                self._validate(version, params, args[1:], kwargs)
+            result = func(*args, **kwargs)
+
+            if not isinstance(result, list):
+                return result
+
+            if self.group_key is None:
+                result, total = self._process(result, params)
+            else:
+                total = 0
+                groups = []
+                for group in result:
+                    if isinstance(group.get(self.group_key), list):
+                        items, group_total = self._process(
+                            group[self.group_key], params)
+                        group = dict(group, **{self.group_key: items})
+                        total += group_total
+                    groups.append(group)
+                result = groups
+
+            cherrypy.response.headers['X-Total-Count'] = str(total)
+            if version is None:
+                # the ETag is computed from the serialized response body by
+                # BaseController._request_wrapper, so the result is
+                # serialized only once
+                cherrypy.request.json_etag = True
+            return result
+        return wrapper
+
+
 class BaseController(object):
     """
     Base class for all controllers providing API endpoints.
@@ -364,7 +519,10 @@ class BaseController(object):
             self.inst = None
             self.func = func
 
-            if not self.config['proxy']:
+            # endpoints() may be called more than once for the same class
+            # (e.g. by the unit tests), don't wrap the function twice
+            if not self.config['proxy'] and \
+                    not getattr(func, '_request_wrapped', False):
                 setattr(self.ctrl, func.__name__, self.function)
 
         @property
@@ -557,8 +715,17 @@ class BaseController(object):
                 ret = ret.decode('utf-8')
             if json_response:
                 cherrypy.response.headers['Content-Type'] = 'application/json'
-                ret = json.dumps(ret).encode('utf8')
+                etag = getattr(cherrypy.request, 'json_etag', False)
+                # sorted keys keep the ETag of unchanged results stable
+                ret = json.dumps(ret, sort_keys=etag).encode('utf8')
+                if etag:
+                    cherrypy.response.headers['ETag'] = '"{}"'.format(
+                        hashlib.md5(ret).hexdigest())
+                    # answers 'If-None-Match' requests with
+                    # '304 Not Modified'
+                    validate_etags()
             return ret
+        inner._request_wrapped = True
         return inner
 
 
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
-from . import ApiController, RESTController, UpdatePermission
+from . import ApiController, RESTController, UpdatePermission, Paginated
 from .. import mgr, logger
 from ..security import Scope
 from ..services.ceph_service import CephService, SendCommandError
@@ -10,6 +10,7 @@ from ..tools import str_to_bool
 
 @ApiController('/osd', Scope.OSD)
 class Osd(RESTController):
+    @Paginated(search_keys=['id', 'host.name'])
     def list(self):
         osds = self.get_osd_map()
 
@@ -18,7 +19,7 @@ class Osd(RESTController):
             osds[str(s['osd'])].update({'osd_stats': s})
 
         # Extending by osd node information
-        nodes = mgr.get('osd_map_tree')['nodes']
+        nodes = mgr.get_snapshot('osd_map_tree')['nodes']
         osd_tree = [(str(o['id']), o) for o in nodes if o['id'] >= 0]
         for o in osd_tree:
             osds[o[0]].update({'tree': o[1]})
@@ -30,26 +31,21 @@ class Osd(RESTController):
                 if o_id >= 0:
                     osds[str(o_id)]['host'] = h[1]
 
-        # Extending by osd histogram data
-        for o_id in osds:
-            o = osds[o_id]
-            o['stats'] = {}
-            o['stats_history'] = {}
-            osd_spec = str(o['osd'])
-            for s in ['osd.op_w', 'osd.op_in_bytes', 'osd.op_r', 'osd.op_out_bytes']:
-                prop = s.split('.')[1]
-                o['stats'][prop] = CephService.get_rate('osd', osd_spec, s)
-                o['stats_history'][prop] = CephService.get_rates('osd', osd_spec, s)
+        # Extending by osd histogram data, fetched for all OSDs at once
+        counters = CephService.get_all_counters(
+            'osd', osds.keys(),
+            ['osd.op_w', 'osd.op_in_bytes', 'osd.op_r', 'osd.op_out_bytes'],
             # Gauge stats
-            for s in ['osd.numpg', 'osd.stat_bytes', 'osd.stat_bytes_used']:
-                o['stats'][s.split('.')[1]] = mgr.get_latest('osd', osd_spec, s)
+            ['osd.numpg', 'osd.stat_bytes', 'osd.stat_bytes_used'])
+        for o_id, o in osds.items():
+            o['stats'], o['stats_history'] = counters[o_id]
 
         return list(osds.values())
 
     def get_osd_map(self):
         osds = {}
-        for osd in mgr.get('osd_map')['osds']:
-            osd['id'] = osd['osd']
+        for osd in mgr.get_snapshot('osd_map')['osds']:
+            osd = dict(osd, id=osd['osd'])
             osds[str(osd['id'])] = osd
         return osds
 
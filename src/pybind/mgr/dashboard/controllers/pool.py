@@ -4,7 +4,8 @@ from __future__ import absolute_import
 
 import cherrypy
 
-from . import ApiController, RESTController, Endpoint, ReadPermission, Task
+from . import ApiController, RESTController, Endpoint, ReadPermission, Task, \
+    Paginated
 from .. import mgr
 from ..security import Scope
 from ..services.ceph_service import CephService
@@ -16,6 +17,13 @@ def pool_task(name, metadata, wait_for=2.0):
     return Task("pool/{}".format(name), metadata, wait_for)
 
 
+def _pool_list_version(_, attrs=None, stats=False):
+    # the statistics are sampled on every call
+    if str_to_bool(stats):
+        return None
+    return mgr.get('map_epochs')['osd_map']
+
+
 @ApiController('/pool', Scope.POOL)
 class Pool(RESTController):
 
@@ -24,7 +32,8 @@ class Pool(RESTController):
         if not attrs or not isinstance(attrs, list):
             attrs = pool.keys()
 
-        crush_rules = {r['rule_id']: r["rule_name"] for r in mgr.get('osd_map_crush')['rules']}
+        crush_rules = {r['rule_id']: r["rule_name"]
+                       for r in mgr.get_snapshot('osd_map_crush')['rules']}
 
         res = {}
         for attr in attrs:
@@ -54,6 +63,7 @@ class Pool(RESTController):
 
         return [self._serialize_pool(pool, attrs) for pool in pools]
 
+    @Paginated(search_keys=['pool_name', 'type'], validator=_pool_list_version)
     def list(self, attrs=None, stats=False):
         return self._pool_list(attrs, stats)
 
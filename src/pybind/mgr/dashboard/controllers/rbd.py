@@ -3,19 +3,25 @@
 # pylint: disable=too-many-statements,too-many-branches
 from __future__ import absolute_import
 
+import collections
 import math
+import struct
+import threading
+import time
 from functools import partial
 
 import cherrypy
 import six
 
+import rados
 import rbd
 
-from . import ApiController, RESTController, Task, UpdatePermission
-from .. import mgr
+from . import ApiController, RESTController, Task, UpdatePermission, \
+    Paginated
+from .. import logger, mgr
 from ..security import Scope
 from ..services.ceph_service import CephService
-from ..tools import ViewCache
+from ..tools import ViewCache, WorkerPool
 from ..services.exception import handle_rados_error, handle_rbd_error, \
     serialize_dashboard_exception
 
@@ -126,6 +132,50 @@ class Rbd(RESTController):
     ALLOW_DISABLE_FEATURES = set(["exclusive-lock", "object-map", "fast-diff",
                                   "deep-flatten", "journaling"])
 
+    # Number of threads fetching image metadata for the image list
+    IMAGE_WORKERS = 10
+    # Cached image metadata is fetched again after this many seconds, even if
+    # the image header did not change (e.g. for clone v1 children, which
+    # are tracked outside of the parent's header)
+    IMAGE_CACHE_TTL = 300.0
+    # Disk usage of listed images is recomputed in the background after this
+    # many seconds
+    DISK_USAGE_TTL = 60.0
+    # Number of images whose metadata and disk usage is cached, the least
+    # recently listed ones are dropped first
+    IMAGE_CACHE_MAX_ENTRIES = 10000
+
+    _image_pool = None
+    _disk_usage_pool = None
+    _cache_lock = threading.Lock()
+    # (pool_name, image_name) -> (header version, time, (stat, fast-diff)),
+    # least recently used first
+    _image_cache = collections.OrderedDict()
+    # (pool_name, image_name) -> (header version, time, disk usage),
+    # least recently used first
+    _disk_usage_cache = collections.OrderedDict()
+    _disk_usage_pending = set()
+
+    @staticmethod
+    def _cache_get(cache, key):
+        """
+        Must be called with _cache_lock held.
+        """
+        value = cache.pop(key, None)
+        if value is not None:
+            cache[key] = value
+        return value
+
+    @classmethod
+    def _cache_put(cls, cache, key, value):
+        """
+        Must be called with _cache_lock held.
+        """
+        cache.pop(key, None)
+        cache[key] = value
+        while len(cache) > cls.IMAGE_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
     @classmethod
     def _rbd_disk_usage(cls, image, snaps, whole_object=True):
         class DUCallback(object):
@@ -150,100 +200,241 @@ class Rbd(RESTController):
 
         return total_used_size, snap_map
 
+    @staticmethod
+    def _has_fast_diff(img, features_name):
+        return 'fast-diff' in features_name and \
+            not rbd.RBD_FLAG_FAST_DIFF_INVALID & img.flags()
+
+    @classmethod
+    def _calc_disk_usage(cls, img, stat):
+        """
+        :return: dict with the total_disk_usage and disk_usage of the image
+            and the disk usage of every snapshot by name
+        """
+        snaps = [(s['id'], s['size'], s['name']) for s in stat['snapshots']]
+        snaps.sort(key=lambda s: s[0])
+        snaps += [(snaps[-1][0]+1 if snaps else 0, stat['size'], None)]
+        total_prov_bytes, snaps_prov_bytes = cls._rbd_disk_usage(img, snaps,
+                                                                 True)
+        return {
+            'total_disk_usage': total_prov_bytes,
+            'disk_usage': snaps_prov_bytes.pop(None),
+            'snapshots': snaps_prov_bytes
+        }
+
+    @staticmethod
+    def _set_disk_usage(stat, disk_usage):
+        if disk_usage is None:
+            stat['total_disk_usage'] = None
+            stat['disk_usage'] = None
+            return
+
+        stat['total_disk_usage'] = disk_usage['total_disk_usage']
+        stat['disk_usage'] = disk_usage['disk_usage']
+        for snap in stat['snapshots']:
+            if snap['name'] in disk_usage['snapshots']:
+                snap['disk_usage'] = disk_usage['snapshots'][snap['name']]
+
+    def _rbd_image_stat(self, img, pool_name, image_name):
+        stat = img.stat()
+        stat['name'] = image_name
+        stat['id'] = img.id()
+        stat['pool_name'] = pool_name
+        features = img.features()
+        stat['features'] = features
+        stat['features_name'] = _format_bitmask(features)
+
+        # the following keys are deprecated
+        del stat['parent_pool']
+        del stat['parent_name']
+
+        stat['timestamp'] = "{}Z".format(img.create_timestamp()
+                                         .isoformat())
+
+        stat['stripe_count'] = img.stripe_count()
+        stat['stripe_unit'] = img.stripe_unit()
+
+        data_pool_name = CephService.get_pool_name_from_id(
+            img.data_pool_id())
+        if data_pool_name == pool_name:
+            data_pool_name = None
+        stat['data_pool'] = data_pool_name
+
+        try:
+            parent_info = img.parent_info()
+            stat['parent'] = {
+                'pool_name': parent_info[0],
+                'image_name': parent_info[1],
+                'snap_name': parent_info[2]
+            }
+        except rbd.ImageNotFound:
+            # no parent image
+            stat['parent'] = None
+
+        # snapshots
+        stat['snapshots'] = []
+        for snap in img.list_snaps():
+            snap['timestamp'] = "{}Z".format(
+                img.get_snap_timestamp(snap['id']).isoformat())
+            snap['is_protected'] = img.is_protected_snap(snap['name'])
+            snap['used_bytes'] = None
+            snap['children'] = []
+            img.set_snap(snap['name'])
+            for child_pool_name, child_image_name in img.list_children():
+                snap['children'].append({
+                    'pool_name': child_pool_name,
+                    'image_name': child_image_name
+                })
+            stat['snapshots'].append(snap)
+
+        return stat
+
     def _rbd_image(self, ioctx, pool_name, image_name):
         with rbd.Image(ioctx, image_name) as img:
-            stat = img.stat()
-            stat['name'] = image_name
-            stat['id'] = img.id()
-            stat['pool_name'] = pool_name
-            features = img.features()
-            stat['features'] = features
-            stat['features_name'] = _format_bitmask(features)
-
-            # the following keys are deprecated
-            del stat['parent_pool']
-            del stat['parent_name']
-
-            stat['timestamp'] = "{}Z".format(img.create_timestamp()
-                                             .isoformat())
-
-            stat['stripe_count'] = img.stripe_count()
-            stat['stripe_unit'] = img.stripe_unit()
-
-            data_pool_name = CephService.get_pool_name_from_id(
-                img.data_pool_id())
-            if data_pool_name == pool_name:
-                data_pool_name = None
-            stat['data_pool'] = data_pool_name
-
-            try:
-                parent_info = img.parent_info()
-                stat['parent'] = {
-                    'pool_name': parent_info[0],
-                    'image_name': parent_info[1],
-                    'snap_name': parent_info[2]
-                }
-            except rbd.ImageNotFound:
-                # no parent image
-                stat['parent'] = None
-
-            # snapshots
-            stat['snapshots'] = []
-            for snap in img.list_snaps():
-                snap['timestamp'] = "{}Z".format(
-                    img.get_snap_timestamp(snap['id']).isoformat())
-                snap['is_protected'] = img.is_protected_snap(snap['name'])
-                snap['used_bytes'] = None
-                snap['children'] = []
-                img.set_snap(snap['name'])
-                for child_pool_name, child_image_name in img.list_children():
-                    snap['children'].append({
-                        'pool_name': child_pool_name,
-                        'image_name': child_image_name
-                    })
-                stat['snapshots'].append(snap)
+            stat = self._rbd_image_stat(img, pool_name, image_name)
 
             # disk usage
-            img_flags = img.flags()
-            if 'fast-diff' in stat['features_name'] and \
-                    not rbd.RBD_FLAG_FAST_DIFF_INVALID & img_flags:
-                snaps = [(s['id'], s['size'], s['name'])
-                         for s in stat['snapshots']]
-                snaps.sort(key=lambda s: s[0])
-                snaps += [(snaps[-1][0]+1 if snaps else 0, stat['size'], None)]
-                total_prov_bytes, snaps_prov_bytes = self._rbd_disk_usage(
-                    img, snaps, True)
-                stat['total_disk_usage'] = total_prov_bytes
-                for snap, prov_bytes in snaps_prov_bytes.items():
-                    if snap is None:
-                        stat['disk_usage'] = prov_bytes
-                        continue
-                    for ss in stat['snapshots']:
-                        if ss['name'] == snap:
-                            ss['disk_usage'] = prov_bytes
-                            break
-            else:
-                stat['total_disk_usage'] = None
-                stat['disk_usage'] = None
+            disk_usage = None
+            if self._has_fast_diff(img, stat['features_name']):
+                disk_usage = self._calc_disk_usage(img, stat)
+            self._set_disk_usage(stat, disk_usage)
 
             return stat
 
+    @staticmethod
+    def _rbd_image_version(ioctx, image_name):
+        """
+        A cheap indicator for changes of the image metadata: the id of the
+        image and the modification time of its header object, which is
+        written whenever the size, features, flags, parent or snapshots of
+        the image change.
+
+        :return: the version, or None if it can't be determined, e.g. for
+            format 1 images
+        """
+        try:
+            data = ioctx.read('rbd_id.{}'.format(image_name))
+            length = struct.unpack('<I', data[:4])[0]
+            image_id = data[4:4 + length].decode('utf-8')
+            _, mtime = ioctx.stat('rbd_header.{}'.format(image_id))
+        except (rados.ObjectNotFound, struct.error):
+            return None
+
+        mtime = time.mktime(mtime)
+        # the modification time has a resolution of one second, so another
+        # update within the same second would go unnoticed
+        if mtime >= math.floor(time.time()) - 1:
+            return None
+        return image_id, mtime
+
+    @classmethod
+    def _get_pools(cls):
+        with cls._cache_lock:
+            if cls._image_pool is None:
+                cls._image_pool = WorkerPool(cls.IMAGE_WORKERS, 'rbd image')
+                cls._disk_usage_pool = WorkerPool(1, 'rbd disk usage')
+            return cls._image_pool, cls._disk_usage_pool
+
+    def _update_disk_usage(self, pool_name, image_name, version):
+        key = (pool_name, image_name)
+        try:
+            with mgr.rados.open_ioctx(pool_name) as ioctx, \
+                    rbd.Image(ioctx, image_name, read_only=True) as img:
+                stat = img.stat()
+                stat['snapshots'] = list(img.list_snaps())
+                disk_usage = self._calc_disk_usage(img, stat)
+            with self._cache_lock:
+                self._cache_put(self._disk_usage_cache, key,
+                                (version, time.time(), disk_usage))
+        except (rados.Error, rbd.Error):
+            logger.exception("Failed to calculate disk usage of %s/%s",
+                             pool_name, image_name)
+        finally:
+            with self._cache_lock:
+                self._disk_usage_pending.discard(key)
+
+    def _cached_disk_usage(self, stat, version):
+        """
+        Returns the disk usage of the image last computed in the background,
+        and schedules its computation if it is missing or outdated.
+        """
+        key = (stat['pool_name'], stat['name'])
+        with self._cache_lock:
+            cached = self._cache_get(self._disk_usage_cache, key)
+            disk_usage = None
+            if cached is not None and cached[0] == version:
+                disk_usage = cached[2]
+                if time.time() - cached[1] < self.DISK_USAGE_TTL:
+                    return disk_usage
+            if key in self._disk_usage_pending:
+                return disk_usage
+            self._disk_usage_pending.add(key)
+
+        _, disk_usage_pool = self._get_pools()
+        disk_usage_pool.submit(partial(self._update_disk_usage, key[0],
+                                       key[1], version))
+        return disk_usage
+
+    def _rbd_pool_image(self, ioctx, pool_name, image_name):
+        key = (pool_name, image_name)
+        version = self._rbd_image_version(ioctx, image_name)
+        with self._cache_lock:
+            cached = self._cache_get(self._image_cache, key)
+        if version is not None and cached is not None and \
+                cached[0] == version and \
+                time.time() - cached[1] < self.IMAGE_CACHE_TTL:
+            stat, fast_diff = cached[2]
+        else:
+            try:
+                with rbd.Image(ioctx, image_name, read_only=True) as img:
+                    stat = self._rbd_image_stat(img, pool_name, image_name)
+                    fast_diff = self._has_fast_diff(img, stat['features_name'])
+            except rbd.ImageNotFound:
+                # may have been removed in the meanwhile
+                return None
+            if version is not None:
+                with self._cache_lock:
+                    self._cache_put(self._image_cache, key,
+                                    (version, time.time(), (stat, fast_diff)))
+
+        # the cached stat is shared with other listings, don't modify it
+        stat = dict(stat, snapshots=[dict(snap) for snap in stat['snapshots']])
+        disk_usage = None
+        if fast_diff:
+            disk_usage = self._cached_disk_usage(stat, version)
+        self._set_disk_usage(stat, disk_usage)
+        return stat
+
     @ViewCache()
     def _rbd_pool_list(self, pool_name):
         rbd_inst = rbd.RBD()
+        image_pool, _ = self._get_pools()
         with mgr.rados.open_ioctx(pool_name) as ioctx:
             names = rbd_inst.list(ioctx)
-            result = []
-            for name in names:
-                try:
-                    stat = self._rbd_image(ioctx, pool_name, name)
-                except rbd.ImageNotFound:
-                    # may have been removed in the meanwhile
-                    continue
-                result.append(stat)
-            return result
+            result = image_pool.map(
+                partial(self._rbd_pool_image, ioctx, pool_name), names)
+
+        # forget about removed images
+        names = set(names)
+        with self._cache_lock:
+            for cache in [self._image_cache, self._disk_usage_cache]:
+                for key in list(cache.keys()):
+                    if key[0] == pool_name and key[1] not in names:
+                        del cache[key]
+
+        return [stat for stat in result if stat is not None]
+
+    @classmethod
+    def _forget_removed_pools(cls):
+        pools = set(p['pool_name'] for p in CephService.get_pool_list())
+        with cls._cache_lock:
+            for cache in [cls._image_cache, cls._disk_usage_cache]:
+                for key in list(cache.keys()):
+                    if key[0] not in pools:
+                        del cache[key]
 
     def _rbd_list(self, pool_name=None):
+        self._forget_removed_pools()
         if pool_name:
             pools = [pool_name]
         else:
@@ -258,6 +449,8 @@ class Rbd(RESTController):
 
     @handle_rbd_error()
     @handle_rados_error('pool')
+    @Paginated(search_keys=['name', 'pool_name', 'data_pool', 'parent.image_name'],
+               group_key='value')
     def list(self, pool_name=None):
         return self._rbd_list(pool_name)
 
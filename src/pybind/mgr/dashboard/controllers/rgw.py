@@ -5,7 +5,7 @@ import json
 import cherrypy
 
 from . import ApiController, BaseController, RESTController, Endpoint, \
-              ReadPermission
+              ReadPermission, Paginated
 from .. import logger
 from ..security import Scope
 from ..services.ceph_service import CephService
@@ -105,6 +105,7 @@ class RgwRESTController(RESTController):
 @ApiController('/rgw/bucket', Scope.RGW)
 class RgwBucket(RgwRESTController):
 
+    @Paginated()
     def list(self):
         return self.proxy('GET', 'bucket')
 
@@ -135,6 +136,7 @@ class RgwBucket(RgwRESTController):
 @ApiController('/rgw/user', Scope.RGW)
 class RgwUser(RgwRESTController):
 
+    @Paginated()
     def list(self):
         return self.proxy('GET', 'metadata/user')
 
@@ -2,18 +2,44 @@
 from __future__ import absolute_import
 
 import json
+import threading
 
+import cherrypy
 
 from . import ApiController, Endpoint, BaseController
 from .. import mgr
 from ..security import Permission, Scope
 from ..controllers.rbd_mirroring import get_daemons_and_pools
 from ..exceptions import ViewCacheNoDataException
-from ..tools import TaskManager
+from ..tools import TaskManager, ChangeFeed
 
 
 @ApiController('/summary')
 class Summary(BaseController):
+    # upper limit of the time a `changes` request is held open
+    CHANGES_MAX_TIMEOUT = 30
+    # every waiting `changes` request blocks one of the (by default 10)
+    # CherryPy worker threads, leave enough of them to the other requests
+    CHANGES_MAX_WAITERS = 4
+    _changes_waiters = threading.BoundedSemaphore(CHANGES_MAX_WAITERS)
+
+    def __init__(self):
+        super(Summary, self).__init__()
+        ChangeFeed.add_topic('health',
+                             fingerprint=lambda: mgr.get('health')['json'])
+        ChangeFeed.add_topic('mon_status',
+                             fingerprint=lambda: mgr.get('mon_status')['json'])
+        # 'map_epochs' and 'pg_status' are cheap, unlike dumping the maps
+        for topic in ['mon_map', 'fs_map', 'osd_map', 'service_map']:
+            ChangeFeed.add_topic(
+                topic,
+                fingerprint=lambda topic=topic: mgr.get('map_epochs')[topic])
+        ChangeFeed.add_topic(
+            'pg_summary',
+            fingerprint=lambda: mgr.get('pg_status')['pgs_by_state'])
+        ChangeFeed.add_topic('clog')
+        ChangeFeed.add_topic('tasks', ['cd_task_created', 'cd_task_finished'])
+
     def _health_status(self):
         health_data = mgr.get("health")
         return json.loads(health_data["json"])['status']
@@ -55,3 +81,57 @@ class Summary(BaseController):
         if self._has_permissions(Permission.READ, Scope.RBD_MIRRORING):
             result['rbd_mirroring'] = self._rbd_mirroring()
         return result
+
+    @Endpoint()
+    def changes(self, since=0, topics=None, timeout=30, instance=None):
+        """
+        Long-polls for changes of the cluster state, to be used instead of
+        periodically polling the other endpoints.
+
+        The request returns as soon as one of `topics` (comma separated, all
+        by default) changed after version `since`, or after `timeout`
+        seconds. Clients pass the returned `version` and `instance` as
+        `since` and `instance` of their next request. The summary fields
+        affected by the changes are included, any other endpoints need to
+        be fetched again by the client if their topic is listed in
+        `changed`. After a mgr failover, the `instance` differs and all
+        topics are listed in `changed`.
+
+        `timeout` is capped at `CHANGES_MAX_TIMEOUT` seconds. As every
+        waiting request occupies a server thread, at most
+        `CHANGES_MAX_WAITERS` requests wait at the same time, further ones
+        fail with 503 and should fall back to polling.
+        """
+        try:
+            since = int(since)
+            timeout = min(float(timeout), self.CHANGES_MAX_TIMEOUT)
+        except ValueError:
+            raise cherrypy.HTTPError(400, 'since and timeout must be numbers')
+        if topics is not None:
+            topics = topics.split(',')
+
+        if not self._changes_waiters.acquire(False):
+            raise cherrypy.HTTPError(503, 'Too many clients waiting for '
+                                          'changes')
+        try:
+            version, changed = ChangeFeed.wait(since, topics, timeout,
+                                               instance)
+        finally:
+            self._changes_waiters.release()
+        result = {
+            'instance': ChangeFeed.instance,
+            'version': version,
+            'changed': changed
+        }
+
+        summary = {}
+        if 'health' in changed:
+            summary['health_status'] = self._health_status()
+        if 'mon_status' in changed:
+            summary['have_mon_connection'] = mgr.have_mon_connection()
+        if 'tasks' in changed:
+            summary['executing_tasks'], summary['finished_tasks'] = \
+                TaskManager.list_serializable()
+        if summary:
+            result['summary'] = summary
+        return result
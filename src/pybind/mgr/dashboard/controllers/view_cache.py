@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from . import ApiController, RESTController
+from ..security import Scope
+from ..tools import ViewCache
+
+
+@ApiController('/view_cache', Scope.DASHBOARD_SETTINGS)
+class ViewCacheStats(RESTController):
+    """
+    Hit, miss and refresh latency statistics of the view caches.
+    """
+    def list(self):
+        return ViewCache.list_stats()
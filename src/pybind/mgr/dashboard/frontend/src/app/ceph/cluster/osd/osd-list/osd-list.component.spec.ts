@@ -1,6 +1,7 @@
 import { HttpClientModule } from '@angular/common/http';
 import { ComponentFixture, TestBed } from '@angular/core/testing';
 import { By } from '@angular/platform-browser';
+import { RouterTestingModule } from '@angular/router/testing';
 
 import { TabsModule } from 'ngx-bootstrap/tabs';
 
@@ -32,6 +33,7 @@ describe('OsdListComponent', () => {
     imports: [
       HttpClientModule,
       PerformanceCounterModule,
+      RouterTestingModule,
       TabsModule.forRoot(),
       DataTableModule,
       ComponentsModule,
@@ -1,6 +1,7 @@
-import { Component, OnInit, TemplateRef, ViewChild } from '@angular/core';
+import { Component, OnDestroy, OnInit, TemplateRef, ViewChild } from '@angular/core';
 
 import { BsModalRef, BsModalService } from 'ngx-bootstrap';
+import { Subscription } from 'rxjs';
 
 import { OsdService } from '../../../../shared/api/osd.service';
 import { TableComponent } from '../../../../shared/datatable/table/table.component';
@@ -11,6 +12,7 @@ import { CdTableSelection } from '../../../../shared/models/cd-table-selection';
 import { Permission } from '../../../../shared/models/permissions';
 import { DimlessBinaryPipe } from '../../../../shared/pipes/dimless-binary.pipe';
 import { AuthStorageService } from '../../../../shared/services/auth-storage.service';
+import { SummaryService } from '../../../../shared/services/summary.service';
 import { OsdFlagsModalComponent } from '../osd-flags-modal/osd-flags-modal.component';
 import { OsdScrubModalComponent } from '../osd-scrub-modal/osd-scrub-modal.component';
 
@@ -19,7 +21,7 @@ import { OsdScrubModalComponent } from '../osd-scrub-modal/osd-scrub-modal.compo
   templateUrl: './osd-list.component.html',
   styleUrls: ['./osd-list.component.scss']
 })
-export class OsdListComponent implements OnInit {
+export class OsdListComponent implements OnInit, OnDestroy {
   @ViewChild('statusColor')
   statusColor: TemplateRef<any>;
   @ViewChild('osdUsageTpl')
@@ -33,12 +35,14 @@ export class OsdListComponent implements OnInit {
   osds = [];
   columns: CdTableColumn[];
   selection = new CdTableSelection();
+  subscription: Subscription;
 
   constructor(
     private authStorageService: AuthStorageService,
     private osdService: OsdService,
     private dimlessBinaryPipe: DimlessBinaryPipe,
-    private modalService: BsModalService
+    private modalService: BsModalService,
+    private summaryService: SummaryService
   ) {
     this.permission = this.authStorageService.getPermissions().osd;
     const scrubAction: CdTableAction = {
@@ -77,6 +81,15 @@ export class OsdListComponent implements OnInit {
       { prop: 'stats.op_r', name: 'Read ops', cellTransformation: CellTemplate.perSecond },
       { prop: 'stats.op_w', name: 'Write ops', cellTransformation: CellTemplate.perSecond }
     ];
+    this.subscription = this.summaryService.subscribeToChanges(['osd_map', 'pg_summary'], () =>
+      this.tableComponent.reloadData()
+    );
+  }
+
+  ngOnDestroy() {
+    if (this.subscription) {
+      this.subscription.unsubscribe();
+    }
   }
 
   updateSelection(selection: CdTableSelection) {
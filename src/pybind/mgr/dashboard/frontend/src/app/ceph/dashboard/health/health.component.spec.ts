@@ -1,6 +1,7 @@
 import { HttpClientTestingModule } from '@angular/common/http/testing';
 import { NO_ERRORS_SCHEMA } from '@angular/core';
 import { ComponentFixture, TestBed } from '@angular/core/testing';
+import { RouterTestingModule } from '@angular/router/testing';
 
 import { configureTestBed } from '../../../../testing/unit-test-helper';
 import { DashboardService } from '../../../shared/api/dashboard.service';
@@ -20,7 +21,7 @@ describe('HealthComponent', () => {
 
   configureTestBed({
     providers: [DashboardService],
-    imports: [SharedModule, HttpClientTestingModule],
+    imports: [SharedModule, HttpClientTestingModule, RouterTestingModule],
     declarations: [
       HealthComponent,
       MonSummaryPipe,
@@ -1,8 +1,10 @@
 import { Component, OnDestroy, OnInit } from '@angular/core';
 
 import * as _ from 'lodash';
+import { Subscription } from 'rxjs';
 
 import { DashboardService } from '../../../shared/api/dashboard.service';
+import { SummaryService } from '../../../shared/services/summary.service';
 
 @Component({
   selector: 'cd-health',
@@ -11,19 +13,22 @@ import { DashboardService } from '../../../shared/api/dashboard.service';
 })
 export class HealthComponent implements OnInit, OnDestroy {
   contentData: any;
-  interval: number;
+  subscription: Subscription;
 
-  constructor(private dashboardService: DashboardService) {}
+  constructor(private dashboardService: DashboardService, private summaryService: SummaryService) {}
 
   ngOnInit() {
     this.getInfo();
-    this.interval = window.setInterval(() => {
-      this.getInfo();
-    }, 5000);
+    this.subscription = this.summaryService.subscribeToChanges(
+      ['health', 'mon_status', 'mon_map', 'fs_map', 'osd_map', 'pg_summary', 'clog'],
+      () => this.getInfo()
+    );
   }
 
   ngOnDestroy() {
-    clearInterval(this.interval);
+    if (this.subscription) {
+      this.subscription.unsubscribe();
+    }
   }
 
   getInfo() {
@@ -1,5 +1,6 @@
 import { HttpClientTestingModule } from '@angular/common/http/testing';
 import { ComponentFixture, TestBed } from '@angular/core/testing';
+import { RouterTestingModule } from '@angular/router/testing';
 
 import { TabsModule } from 'ngx-bootstrap/tabs/tabs.module';
 
@@ -13,7 +14,7 @@ describe('PoolListComponent', () => {
 
   configureTestBed({
     declarations: [PoolListComponent],
-    imports: [SharedModule, TabsModule.forRoot(), HttpClientTestingModule]
+    imports: [SharedModule, TabsModule.forRoot(), HttpClientTestingModule, RouterTestingModule]
   });
 
   beforeEach(() => {
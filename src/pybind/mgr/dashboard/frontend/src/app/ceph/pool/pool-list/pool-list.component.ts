@@ -1,21 +1,29 @@
-import { Component } from '@angular/core';
+import { Component, OnDestroy, OnInit, ViewChild } from '@angular/core';
+
+import { Subscription } from 'rxjs';
 
 import { PoolService } from '../../../shared/api/pool.service';
+import { TableComponent } from '../../../shared/datatable/table/table.component';
 import { CdTableColumn } from '../../../shared/models/cd-table-column';
 import { CdTableFetchDataContext } from '../../../shared/models/cd-table-fetch-data-context';
 import { CdTableSelection } from '../../../shared/models/cd-table-selection';
+import { SummaryService } from '../../../shared/services/summary.service';
 
 @Component({
   selector: 'cd-pool-list',
   templateUrl: './pool-list.component.html',
   styleUrls: ['./pool-list.component.scss']
 })
-export class PoolListComponent {
+export class PoolListComponent implements OnInit, OnDestroy {
+  @ViewChild(TableComponent)
+  table: TableComponent;
+
   pools = [];
   columns: CdTableColumn[];
   selection = new CdTableSelection();
+  subscription: Subscription;
 
-  constructor(private poolService: PoolService) {
+  constructor(private poolService: PoolService, private summaryService: SummaryService) {
     this.columns = [
       {
         prop: 'pool_name',
@@ -63,6 +71,18 @@ export class PoolListComponent {
     ];
   }
 
+  ngOnInit() {
+    this.subscription = this.summaryService.subscribeToChanges(['osd_map', 'pg_summary'], () =>
+      this.table.reloadData()
+    );
+  }
+
+  ngOnDestroy() {
+    if (this.subscription) {
+      this.subscription.unsubscribe();
+    }
+  }
+
   updateSelection(selection: CdTableSelection) {
     this.selection = selection;
   }
@@ -1,8 +1,8 @@
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpErrorResponse } from '@angular/common/http';
 import { fakeAsync, TestBed, tick } from '@angular/core/testing';
 import { RouterTestingModule } from '@angular/router/testing';
 
-import { of as observableOf, Subscriber } from 'rxjs';
+import { of as observableOf, Subject, Subscriber } from 'rxjs';
 
 import { configureTestBed } from '../../../testing/unit-test-helper';
 import { ExecutingTask } from '../models/executing-task';
@@ -24,8 +24,19 @@ describe('SummaryService', () => {
     filesystems: [{ id: 1, name: 'cephfs_a' }]
   };
 
+  // the pending request for changes
+  let changes: Subject<any>;
+  let changesParams;
+
   const httpClientSpy = {
-    get: () => observableOf(summary)
+    get: (url, options?) => {
+      if (url === 'api/summary/changes') {
+        changesParams = options.params;
+        changes = new Subject();
+        return changes;
+      }
+      return observableOf(summary);
+    }
   };
 
   configureTestBed({
@@ -46,21 +57,82 @@ describe('SummaryService', () => {
     expect(summaryService).toBeTruthy();
   });
 
-  it(
-    'should call refresh',
-    fakeAsync(() => {
+  it('should call refresh', () => {
+    authStorageService.set('foobar');
+    let result = false;
+    summaryService.refresh();
+    summaryService.subscribe(() => {
+      result = true;
+    });
+    expect(result).toEqual(true);
+  });
+
+  describe('Should wait for changes', () => {
+    beforeEach(() => {
       authStorageService.set('foobar');
-      let result = false;
       summaryService.refresh();
-      summaryService.subscribe(() => {
-        result = true;
+      // the first answer of a mgr daemon reports all topics changed
+      changes.next({ instance: 'a', version: 1, changed: ['health', 'osd_map'] });
+    });
+
+    it('should pass on version and instance', () => {
+      expect(changesParams.get('since')).toBe('1');
+      expect(changesParams.get('instance')).toBe('a');
+    });
+
+    it('should merge the changed summary fields', () => {
+      spyOn(summaryService, 'refresh');
+      changes.next({
+        instance: 'a',
+        version: 2,
+        changed: ['health'],
+        summary: { health_status: 'HEALTH_WARN' }
       });
-      tick(5000);
-      spyOn(summaryService, 'refresh').and.callFake(() => true);
-      tick(5000);
-      expect(result).toEqual(true);
-    })
-  );
+      expect(summaryService.refresh).not.toHaveBeenCalled();
+      expect(summaryService.getCurrentSummary().health_status).toBe('HEALTH_WARN');
+      expect(summaryService.getCurrentSummary().mgr_id).toBe('x');
+      expect(changesParams.get('since')).toBe('2');
+    });
+
+    it('should refresh the summary on a mgr failover', () => {
+      spyOn(summaryService, 'refresh');
+      changes.next({ instance: 'b', version: 1, changed: ['health'] });
+      expect(summaryService.refresh).toHaveBeenCalled();
+      expect(changesParams.get('instance')).toBe('b');
+    });
+
+    it('should call subscribeToChanges', () => {
+      const calls = [];
+      const subscription = summaryService.subscribeToChanges(['osd_map'], () => calls.push(1));
+      changes.next({ instance: 'a', version: 2, changed: ['health'] });
+      expect(calls.length).toBe(0);
+      changes.next({ instance: 'a', version: 3, changed: ['health', 'osd_map'] });
+      expect(calls.length).toBe(1);
+      // nothing changed within the timeout
+      changes.next({ instance: 'a', version: 3, changed: [] });
+      expect(calls.length).toBe(2);
+      subscription.unsubscribe();
+    });
+
+    it(
+      'should fall back to polling',
+      fakeAsync(() => {
+        const calls = [];
+        const subscription = summaryService.subscribeToChanges(['osd_map'], () => calls.push(1));
+        const error = new HttpErrorResponse({ status: 503 });
+        error['preventDefault'] = jasmine.createSpy('preventDefault');
+        const failed = changes;
+        failed.error(error);
+        expect(error['preventDefault']).toHaveBeenCalled();
+        // the changes are unknown
+        expect(calls.length).toBe(1);
+        expect(changes).toBe(failed);
+        tick(SummaryService.RETRY_INTERVAL);
+        expect(changes).not.toBe(failed);
+        subscription.unsubscribe();
+      })
+    );
+  });
 
   describe('Should test methods after first refresh', () => {
     beforeEach(() => {
@@ -1,9 +1,10 @@
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams } from '@angular/common/http';
 import { Injectable, NgZone } from '@angular/core';
 import { Router } from '@angular/router';
 
 import * as _ from 'lodash';
-import { BehaviorSubject, Subscription } from 'rxjs';
+import { BehaviorSubject, Subject, Subscription } from 'rxjs';
+import { filter } from 'rxjs/operators';
 
 import { ExecutingTask } from '../models/executing-task';
 import { ServicesModule } from './services.module';
@@ -12,29 +13,115 @@ import { ServicesModule } from './services.module';
   providedIn: ServicesModule
 })
 export class SummaryService {
+  // Seconds the server holds a request for changes open if nothing changes
+  static readonly CHANGES_TIMEOUT = 30;
+  // Milliseconds to wait before trying again if waiting for changes failed,
+  // e.g. because too many other clients are waiting
+  static readonly RETRY_INTERVAL = 5000;
+
   // Observable sources
   private summaryDataSource = new BehaviorSubject(null);
+  private changesSource = new Subject<string[]>();
 
   // Observable streams
   summaryData$ = this.summaryDataSource.asObservable();
+  changes$ = this.changesSource.asObservable();
+
+  // Version of the change feed and the mgr daemon it belongs to
+  private changesVersion = 0;
+  private changesInstance: string = null;
 
   constructor(private http: HttpClient, private router: Router, private ngZone: NgZone) {
     this.refresh();
+    this.waitForChanges();
   }
 
+  /**
+   * Fetches the whole summary.
+   *
+   * @memberof SummaryService
+   */
   refresh() {
     if (this.router.url !== '/login') {
       this.http.get('api/summary').subscribe((data) => {
         this.summaryDataSource.next(data);
       });
     }
+  }
+
+  /**
+   * Long-polls the change feed and pushes the changed topics to changes$.
+   *
+   * The requests are kept outside of Angular, otherwise the application
+   * would never become stable while a request is waiting. If waiting fails,
+   * the summary is fetched and all topics are reported changed every
+   * RETRY_INTERVAL until waiting succeeds again.
+   *
+   * @memberof SummaryService
+   */
+  private waitForChanges() {
+    if (this.router.url === '/login') {
+      this.retryLater();
+      return;
+    }
 
+    let params = new HttpParams()
+      .set('since', String(this.changesVersion))
+      .set('timeout', String(SummaryService.CHANGES_TIMEOUT));
+    if (this.changesInstance) {
+      params = params.set('instance', this.changesInstance);
+    }
+    this.ngZone.runOutsideAngular(() => {
+      this.http.get('api/summary/changes', { params: params }).subscribe(
+        (changes: any) => {
+          this.ngZone.run(() => {
+            this.applyChanges(changes);
+            this.waitForChanges();
+          });
+        },
+        (error) => {
+          if (_.isFunction(error.preventDefault)) {
+            // the fallback request shows the error if the server is broken
+            error.preventDefault();
+          }
+          this.ngZone.run(() => {
+            this.refresh();
+            this.changesSource.next(null);
+            this.retryLater();
+          });
+        }
+      );
+    });
+  }
+
+  private applyChanges(changes: any) {
+    const current = this.summaryDataSource.getValue();
+    if (
+      changes.instance !== this.changesInstance ||
+      _.isEmpty(changes.changed) ||
+      _.includes(changes.changed, 'service_map') ||
+      !current
+    ) {
+      // Either another mgr daemon answered, so versions are not comparable
+      // and all topics are reported changed, or the summary fields not
+      // covered by the change feed (e.g. the mgr id or the RBD mirroring
+      // status) may have changed.
+      this.refresh();
+    } else if (changes.summary) {
+      this.summaryDataSource.next(_.assign({}, current, changes.summary));
+    }
+    this.changesInstance = changes.instance;
+    this.changesVersion = changes.version;
+    this.changesSource.next(changes.changed);
+  }
+
+  private retryLater() {
     this.ngZone.runOutsideAngular(() => {
       setTimeout(() => {
         this.ngZone.run(() => {
-          this.refresh();
+          this.waitForChanges();
         });
-      }, 5000);
+      }, SummaryService.RETRY_INTERVAL);
     });
   }
 
@@ -50,7 +137,7 @@ export class SummaryService {
 
   /**
    * Subscribes to the summaryData,
-   * which is updated once every 5 seconds or when a new task is created.
+   * which is updated when the cluster state changes or a new task is created.
    *
    * @param {(summary: any) => void} call
    * @param {(error: any) => void} error
@@ -61,6 +148,37 @@ export class SummaryService {
     return this.summaryData$.subscribe(call, error);
   }
 
+  /**
+   * Calls `call` when one of `topics` of the change feed changed, when the
+   * changes are unknown, or at least every CHANGES_TIMEOUT seconds, so that
+   * data not covered by the change feed (e.g. I/O statistics) is refreshed,
+   * too.
+   *
+   * @param {string[]} topics
+   * @param {() => void} call
+   * @returns {Subscription}
+   * @memberof SummaryService
+   */
+  subscribeToChanges(topics: string[], call: () => void): Subscription {
+    let last = Date.now();
+    return this.changes$
+      .pipe(
+        filter((changed: string[]) => {
+          const now = Date.now();
+          if (
+            !_.isEmpty(changed) &&
+            _.isEmpty(_.intersection(changed, topics)) &&
+            now - last < SummaryService.CHANGES_TIMEOUT * 1000
+          ) {
+            return false;
+          }
+          last = now;
+          return true;
+        })
+      )
+      .subscribe(() => call());
+  }
+
   /**
    * Inserts a newly created task to the local list of executing tasks.
    * After that, it will automatically push that new information
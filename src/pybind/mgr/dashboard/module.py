@@ -60,7 +60,7 @@ if 'COVERAGE_ENABLED' in os.environ:
 from . import logger, mgr
 from .controllers import generate_routes, json_error_page
 from .tools import SessionExpireAtBrowserCloseTool, NotificationQueue, \
-                   RequestLoggingTool, TaskManager
+                   RequestLoggingTool, TaskManager, ChangeFeed
 from .services.auth import AuthManager, AuthManagerTool
 from .services.access_control import ACCESS_CONTROL_COMMANDS, \
                                      handle_access_control_command
@@ -304,10 +304,12 @@ class Module(MgrModule, CherryPyConfig):
         cherrypy.engine.start()
         NotificationQueue.start_queue()
         TaskManager.init()
+        ChangeFeed.start()
         logger.info('Engine started.')
         # wait for the shutdown event
         self.shutdown_event.wait()
         self.shutdown_event.clear()
+        ChangeFeed.stop()
         NotificationQueue.stop()
         cherrypy.engine.stop()
         if 'COVERAGE_ENABLED' in os.environ:
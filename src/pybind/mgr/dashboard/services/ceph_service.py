@@ -78,11 +78,11 @@ class CephService(object):
 
     @classmethod
     def get_pool_list(cls, application=None):
-        osd_map = mgr.get('osd_map')
-        if not application:
-            return osd_map['pools']
-        return [pool for pool in osd_map['pools']
-                if application in pool.get('application_metadata', {})]
+        osd_map = mgr.get_snapshot('osd_map')
+        # callers add their own keys, copy the read-only snapshot entries
+        return [dict(pool) for pool in osd_map['pools']
+                if not application or
+                application in pool.get('application_metadata', {})]
 
     @classmethod
     def get_pool_list_with_stats(cls, application=None):
@@ -124,11 +124,7 @@ class CephService(object):
 
     @classmethod
     def get_pool_name_from_id(cls, pool_id):
-        pool_list = cls.get_pool_list()
-        for pool in pool_list:
-            if pool['pool'] == pool_id:
-                return pool['pool_name']
-        return None
+        return mgr.get_pool_names().get(pool_id)
 
     @classmethod
     def send_command(cls, srv_type, prefix, srv_spec='', **kwargs):
@@ -174,11 +170,7 @@ class CephService(object):
         :return: the derivative of mgr.get_counter()
         :rtype: list[tuple[int, float]]"""
         data = mgr.get_counter(svc_type, svc_name, path)[path]
-        if not data:
-            return [(0, 0.0)]
-        elif len(data) == 1:
-            return [(data[0][0], 0.0)]
-        return [(data2[0], differentiate(data1, data2)) for data1, data2 in pairwise(data)]
+        return derivative(data)
 
     @classmethod
     def get_rate(cls, svc_type, svc_name, path):
@@ -189,6 +181,51 @@ class CephService(object):
             return differentiate(*data[-2:])
         return 0.0
 
+    @classmethod
+    def get_all_counters(cls, svc_type, svc_ids, rate_paths, gauge_paths):
+        """
+        Fetches the counter history of all daemons of `svc_type` with a
+        single call into the mgr, instead of one `get_counter()` per daemon
+        and counter.
+
+        :return: a dict mapping `svc_ids` to a `(stats, stats_history)`
+                 tuple. `stats` contains the most recent rate of the
+                 `rate_paths` and the latest value of the `gauge_paths`,
+                 `stats_history` the derivative of the `rate_paths`. Both
+                 are keyed by the counter name without its subsystem.
+        :rtype: dict[str, tuple[dict, dict]]
+        """
+        result = {}
+        counters = mgr.get_counters(svc_type, list(rate_paths) + list(gauge_paths))
+        for svc_id in svc_ids:
+            data = counters.get(svc_id, {})
+            stats = {}
+            stats_history = {}
+            for path in rate_paths:
+                prop = path.split('.')[1]
+                rates = derivative(data.get(path))
+                stats_history[prop] = rates
+                stats[prop] = rates[-1][1]
+            for path in gauge_paths:
+                series = data.get(path)
+                stats[path.split('.')[1]] = series[-1][1] if series else 0
+            result[svc_id] = (stats, stats_history)
+        return result
+
+
+def derivative(data):
+    """
+    >>> derivative([(0, 100), (2, 101), (4, 105)])
+    [(2, 0.5), (4, 2.0)]
+    >>> derivative([(2, 101)])
+    [(2, 0.0)]
+    """
+    if not data:
+        return [(0, 0.0)]
+    elif len(data) == 1:
+        return [(data[0][0], 0.0)]
+    return [(data2[0], differentiate(data1, data2)) for data1, data2 in pairwise(data)]
+
 
 def differentiate(data1, data2):
     """
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import unittest
+
+from mock import patch
+
+from .. import mgr
+from ..services.ceph_service import CephService
+
+COUNTERS = {
+    '0': {
+        'osd.op_w': [[10, 100], [15, 110], [20, 160]],
+        'osd.op_r': [[20, 5]],
+        'osd.numpg': [[10, 30], [20, 32]],
+    },
+    '1': {
+        'osd.op_w': [],
+        'osd.op_r': [],
+        'osd.numpg': [],
+    },
+}
+
+
+def _get_counter(svc_type, svc_name, path):
+    assert svc_type == 'osd'
+    return {path: COUNTERS.get(svc_name, {}).get(path, [])}
+
+
+class CephServiceTest(unittest.TestCase):
+    def test_get_all_counters(self):
+        with patch.object(mgr, 'get_counters', create=True,
+                          return_value=COUNTERS) as get_counters:
+            counters = CephService.get_all_counters(
+                'osd', ['0', '1', '2'], ['osd.op_w', 'osd.op_r'], ['osd.numpg'])
+
+        get_counters.assert_called_once_with(
+            'osd', ['osd.op_w', 'osd.op_r', 'osd.numpg'])
+        self.assertEqual(counters['0'], (
+            {'op_w': 10.0, 'op_r': 0.0, 'numpg': 32},
+            {'op_w': [(15, 2.0), (20, 10.0)], 'op_r': [(20, 0.0)]}))
+        # daemons without data, or unknown to the mgr, get empty stats
+        for svc_id in ['1', '2']:
+            self.assertEqual(counters[svc_id], (
+                {'op_w': 0.0, 'op_r': 0.0, 'numpg': 0},
+                {'op_w': [(0, 0.0)], 'op_r': [(0, 0.0)]}))
+
+    def test_get_all_counters_matches_get_rate(self):
+        with patch.object(mgr, 'get_counters', create=True,
+                          return_value=COUNTERS), \
+                patch.object(mgr, 'get_counter', side_effect=_get_counter):
+            counters = CephService.get_all_counters(
+                'osd', ['0', '1'], ['osd.op_w', 'osd.op_r'], [])
+            for svc_id, (stats, stats_history) in counters.items():
+                for path in ['osd.op_w', 'osd.op_r']:
+                    prop = path.split('.')[1]
+                    self.assertEqual(stats[prop],
+                                     CephService.get_rate('osd', svc_id, path))
+                    self.assertEqual(stats_history[prop],
+                                     CephService.get_rates('osd', svc_id, path))
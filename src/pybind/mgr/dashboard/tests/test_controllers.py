@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 
+import hashlib
+
 from .helper import ControllerTestCase
 from ..controllers import BaseController, RESTController, Controller, \
-                          ApiController, Endpoint
+                          ApiController, Endpoint, Paginated
 
 
 @Controller("/btest/{key}", base_url="/ui", secure=False)
@@ -72,6 +74,29 @@ class RTest(RESTController):
         return {'key': key, 'skey': skey, 'ekey': ekey, 'opt': opt}
 
 
+@ApiController("/ptest", secure=False)
+class PTest(RESTController):
+    @Paginated(search_keys=['name'])
+    def list(self):
+        return [
+            {'id': 1, 'name': 'foo', 'size': 30},
+            {'id': 2, 'name': 'bar', 'size': 10},
+            {'id': 3, 'name': 'foobar', 'size': 20},
+            {'id': 4, 'name': 'baz', 'size': 10},
+        ]
+
+
+@ApiController("/vtest", secure=False)
+class VTest(RESTController):
+    version = 1
+    calls = 0
+
+    @Paginated(validator=lambda _, key=None: VTest.version)
+    def list(self, key=None):
+        VTest.calls += 1
+        return [{'id': 1, 'key': key, 'version': VTest.version}]
+
+
 @Controller("/", secure=False)
 class Root(BaseController):
     @Endpoint(json_response=False)
@@ -190,3 +215,85 @@ class RootControllerTest(ControllerTestCase):
     def test_index(self):
         self._get("/")
         self.assertBody("<html></html>")
+
+
+class PaginatedTest(ControllerTestCase):
+    @classmethod
+    def setup_server(cls):
+        cls.setup_controllers([PTest, VTest], "/test")
+
+    def test_unchanged(self):
+        self._get('/test/api/ptest')
+        self.assertStatus(200)
+        self.assertEqual([i['id'] for i in self.jsonBody()], [1, 2, 3, 4])
+        self.assertHeader('X-Total-Count', '4')
+
+    def test_page(self):
+        self._get('/test/api/ptest?offset=1&limit=2')
+        self.assertStatus(200)
+        self.assertEqual([i['id'] for i in self.jsonBody()], [2, 3])
+        self.assertHeader('X-Total-Count', '4')
+
+    def test_sort(self):
+        self._get('/test/api/ptest?sort=size,-name')
+        self.assertStatus(200)
+        self.assertEqual([i['id'] for i in self.jsonBody()], [4, 2, 3, 1])
+
+    def test_filter_and_search(self):
+        self._get('/test/api/ptest?filter=size:10')
+        self.assertEqual([i['id'] for i in self.jsonBody()], [2, 4])
+        self._get('/test/api/ptest?search=FOO')
+        self.assertEqual([i['id'] for i in self.jsonBody()], [1, 3])
+        self.assertHeader('X-Total-Count', '2')
+
+    def test_fields(self):
+        self._get('/test/api/ptest?fields=id&limit=1')
+        self.assertJsonBody([{'id': 1}])
+
+    def test_invalid_limit(self):
+        self._get('/test/api/ptest?limit=x')
+        self.assertStatus(400)
+
+    def test_etag(self):
+        self._get('/test/api/ptest?limit=2')
+        self.assertStatus(200)
+        etag = self.assertHeader('ETag')
+        self.getPage('/test/api/ptest?limit=2',
+                     headers=[('If-None-Match', etag)])
+        self.assertStatus(304)
+        self.getPage('/test/api/ptest?limit=3',
+                     headers=[('If-None-Match', etag)])
+        self.assertStatus(200)
+
+    def test_etag_of_sent_body(self):
+        self._get('/test/api/ptest?fields=name,id')
+        self.assertStatus(200)
+        self.assertHeader('ETag', '"{}"'.format(
+            hashlib.md5(self.body).hexdigest()))
+        self.assertIn(b'[{"id": 1, "name": ', self.body)
+
+    def test_validator(self):
+        VTest.version = 1
+        self._get('/test/api/vtest?key=a')
+        self.assertStatus(200)
+        etag = self.assertHeader('ETag')
+        calls = VTest.calls
+
+        # not modified: the list is not built
+        self.getPage('/test/api/vtest?key=a',
+                     headers=[('If-None-Match', etag)])
+        self.assertStatus(304)
+        self.assertEqual(VTest.calls, calls)
+
+        # other arguments or parameters
+        for query in ['key=b', 'key=a&limit=1']:
+            self.getPage('/test/api/vtest?' + query,
+                         headers=[('If-None-Match', etag)])
+            self.assertStatus(200)
+
+        VTest.version = 2
+        self.getPage('/test/api/vtest?key=a',
+                     headers=[('If-None-Match', etag)])
+        self.assertStatus(200)
+        self.assertEqual(self.jsonBody()[0]['version'], 2)
+        self.assertNotEqual(self.assertHeader('ETag'), etag)
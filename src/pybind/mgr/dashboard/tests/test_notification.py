@@ -2,11 +2,12 @@
 from __future__ import absolute_import
 
 import random
+import threading
 import time
 import unittest
 
 
-from ..tools import NotificationQueue
+from ..tools import NotificationQueue, ChangeFeed
 
 
 class Listener(object):
@@ -136,3 +137,117 @@ class NotificationQueueTest(unittest.TestCase):
         NotificationQueue.stop()
         self.assertEqual(self.listener.type1, [1, 4])
         self.assertEqual(self.listener.type1_3, [1, 3, 5])
+
+
+class ChangeFeedTest(unittest.TestCase):
+    TOPICS = ['cf_map', 'cf_log']
+
+    @classmethod
+    def setUpClass(cls):
+        cls.epoch = 1
+        cls.fingerprints = 0
+        ChangeFeed.add_topic('cf_map', fingerprint=cls._fingerprint)
+        ChangeFeed.add_topic('cf_log', ['cf_log1', 'cf_log2'])
+
+    @classmethod
+    def _fingerprint(cls):
+        cls.fingerprints += 1
+        return cls.epoch
+
+    def setUp(self):
+        ChangeFeed.start()
+        NotificationQueue.start_queue()
+
+    def tearDown(self):
+        NotificationQueue.stop()
+        ChangeFeed.stop()
+
+    def _notify_and_flush(self, *n_types):
+        for n_type in n_types:
+            NotificationQueue.new_notification(n_type, None)
+        # stopping the queue delivers all pending notifications
+        NotificationQueue.stop()
+        NotificationQueue.start_queue()
+
+    def test_initial(self):
+        version, changed = ChangeFeed.wait(0, self.TOPICS, 0)
+        self.assertGreater(version, 0)
+        self.assertEqual(changed, ['cf_log', 'cf_map'])
+
+    def test_unchanged_fingerprint(self):
+        self._notify_and_flush('cf_map')
+        version, _ = ChangeFeed.wait(0, self.TOPICS, 0)
+
+        # same epoch: not a change
+        self._notify_and_flush('cf_map')
+        self.assertEqual(ChangeFeed.wait(version, self.TOPICS, 0), (version, []))
+
+        self.__class__.epoch += 1
+        self._notify_and_flush('cf_map')
+        version2, changed = ChangeFeed.wait(version, self.TOPICS, 0)
+        self.assertGreater(version2, version)
+        self.assertEqual(changed, ['cf_map'])
+
+    def test_notification_types(self):
+        version, _ = ChangeFeed.wait(0, self.TOPICS, 0)
+        self._notify_and_flush('cf_log2')
+        _, changed = ChangeFeed.wait(version, self.TOPICS, 0)
+        self.assertEqual(changed, ['cf_log'])
+        self.assertEqual(ChangeFeed.wait(version, ['cf_map'], 0)[1], [])
+
+    def test_wait(self):
+        version, _ = ChangeFeed.wait(0, self.TOPICS, 0)
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(
+            ChangeFeed.wait(version, self.TOPICS, 10)))
+        waiter.start()
+        time.sleep(0.1)
+        self.assertEqual(result, [])
+        NotificationQueue.new_notification('cf_log1', None)
+        waiter.join(5)
+        self.assertEqual(result[0][1], ['cf_log'])
+
+    def test_wait_fingerprint(self):
+        version, _ = ChangeFeed.wait(0, self.TOPICS, 0)
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(
+            ChangeFeed.wait(version, self.TOPICS, 10)))
+        waiter.start()
+        time.sleep(0.1)
+        self.__class__.epoch += 1
+        NotificationQueue.new_notification('cf_map', None)
+        waiter.join(5)
+        self.assertEqual(result[0][1], ['cf_map'])
+
+    def test_lazy_fingerprint(self):
+        version, _ = ChangeFeed.wait(0, self.TOPICS, 0)
+        fingerprints = self.fingerprints
+        # nobody is waiting: notifications don't evaluate the fingerprint
+        self._notify_and_flush('cf_map', 'cf_map')
+        self.assertEqual(self.fingerprints, fingerprints)
+
+        self.__class__.epoch += 1
+        _, changed = ChangeFeed.wait(version, self.TOPICS, 0)
+        self.assertEqual(changed, ['cf_map'])
+        self.assertEqual(self.fingerprints, fingerprints + 1)
+
+    def test_timeout(self):
+        version, _ = ChangeFeed.wait(0, self.TOPICS, 0)
+        start = time.time()
+        self.assertEqual(ChangeFeed.wait(version, self.TOPICS, 0.2), (version, []))
+        self.assertGreaterEqual(time.time() - start, 0.2)
+
+    def test_reset(self):
+        # a version from before a mgr failover returns all topics
+        version, _ = ChangeFeed.wait(0, self.TOPICS, 0)
+        _, changed = ChangeFeed.wait(version + 1000, self.TOPICS, 0)
+        self.assertEqual(changed, ['cf_log', 'cf_map'])
+
+    def test_other_instance(self):
+        version, _ = ChangeFeed.wait(0, self.TOPICS, 0)
+        self.assertEqual(ChangeFeed.wait(version, self.TOPICS, 0,
+                                         ChangeFeed.instance),
+                         (version, []))
+        # the same version of the feed of another mgr
+        _, changed = ChangeFeed.wait(version, self.TOPICS, 0, 'other')
+        self.assertEqual(changed, ['cf_log', 'cf_map'])
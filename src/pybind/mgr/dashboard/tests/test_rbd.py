@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import datetime
+import struct
+import time
+import unittest
+
+import mock
+
+from .. import mgr
+from ..controllers import rbd as rbd_controller
+from ..controllers.rbd import Rbd
+
+rados = rbd_controller.rados
+rbd = rbd_controller.rbd
+
+
+class FakeIoctx(object):
+    """
+    The `rbd_id.<name>` and `rbd_header.<id>` objects of `images`
+    """
+    def __init__(self, images):
+        self.images = images
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def read(self, oid):
+        image = self.images.get(oid[len('rbd_id.'):])
+        if image is None:
+            raise rados.ObjectNotFound(oid)
+        image_id = image['id'].encode('utf-8')
+        return struct.pack('<I', len(image_id)) + image_id
+
+    def stat(self, oid):
+        for image in self.images.values():
+            if oid == 'rbd_header.{}'.format(image['id']):
+                return 0, time.localtime(image['mtime'])
+        raise rados.ObjectNotFound(oid)
+
+
+class FakeImage(object):
+    images = {}
+    opened = []
+
+    def __init__(self, ioctx, name, read_only=False):
+        if name not in self.images:
+            raise rbd.ImageNotFound(name)
+        self.image = self.images[name]
+        self.opened.append(name)
+        if self.image.get('error'):
+            raise self.image['error']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def stat(self):
+        return {'size': self.image['size'], 'obj_size': 4194304,
+                'num_objs': 1, 'order': 22, 'block_name_prefix': '',
+                'parent_pool': -1, 'parent_name': ''}
+
+    def id(self):
+        return self.image['id']
+
+    def features(self):
+        return rbd.RBD_FEATURE_LAYERING
+
+    def flags(self):
+        return 0
+
+    def create_timestamp(self):
+        return datetime.datetime(2019, 1, 1)
+
+    def stripe_count(self):
+        return 1
+
+    def stripe_unit(self):
+        return 4194304
+
+    def data_pool_id(self):
+        return 1
+
+    def parent_info(self):
+        raise rbd.ImageNotFound('no parent')
+
+    def list_snaps(self):
+        return []
+
+
+class FakeRBD(object):
+    def list(self, ioctx):
+        return sorted(ioctx.images)
+
+
+def image(image_id, size=1024, mtime=None):
+    return {'id': image_id, 'size': size,
+            'mtime': mtime if mtime is not None else time.time() - 100}
+
+
+class RbdImageCacheTest(unittest.TestCase):
+    def setUp(self):
+        FakeImage.images = {'a': image('1a'), 'b': image('2b')}
+        FakeImage.opened = []
+        self.ioctx = FakeIoctx(FakeImage.images)
+        mgr.rados.open_ioctx.return_value = self.ioctx
+        # pylint: disable=protected-access
+        Rbd._image_cache.clear()
+        Rbd._disk_usage_cache.clear()
+
+        patches = [
+            mock.patch.object(rbd, 'Image', FakeImage),
+            mock.patch.object(rbd, 'RBD', FakeRBD),
+            mock.patch.object(rbd_controller.CephService,
+                              'get_pool_name_from_id', return_value='rbd'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.controller = Rbd()
+
+    def _get(self, name):
+        # pylint: disable=protected-access
+        return self.controller._rbd_pool_image(self.ioctx, 'rbd', name)
+
+    def test_cache_hit(self):
+        stat = self._get('a')
+        self.assertEqual(stat['name'], 'a')
+        self.assertEqual(stat['size'], 1024)
+        self.assertEqual(self._get('a'), stat)
+        self.assertEqual(FakeImage.opened, ['a'])
+
+    def test_cached_stat_is_copied(self):
+        self._get('a')['size'] = 0
+        self.assertEqual(self._get('a')['size'], 1024)
+
+    def test_header_changed(self):
+        self._get('a')
+        FakeImage.images['a'].update(size=2048, mtime=time.time() - 50)
+        self.assertEqual(self._get('a')['size'], 2048)
+        self.assertEqual(FakeImage.opened, ['a', 'a'])
+
+    def test_image_recreated(self):
+        self._get('a')
+        FakeImage.images['a'].update(id='3a', size=2048)
+        self.assertEqual(self._get('a')['size'], 2048)
+        self.assertEqual(FakeImage.opened, ['a', 'a'])
+
+    def test_recent_header_is_not_cached(self):
+        FakeImage.images['a']['mtime'] = time.time()
+        self._get('a')
+        self._get('a')
+        self.assertEqual(FakeImage.opened, ['a', 'a'])
+
+    def test_expired(self):
+        self._get('a')
+        with mock.patch.object(Rbd, 'IMAGE_CACHE_TTL', 0):
+            self._get('a')
+        self.assertEqual(FakeImage.opened, ['a', 'a'])
+
+    def test_removed_image(self):
+        self._get('a')
+        del FakeImage.images['a']
+        self.assertIsNone(self._get('a'))
+
+    def test_pool_list(self):
+        # pylint: disable=protected-access
+        _, images = self.controller._rbd_pool_list('rbd_list')
+        self.assertEqual([i['name'] for i in images], ['a', 'b'])
+
+        # removed images are forgotten, a new controller instance isn't
+        # served from the view cache
+        del FakeImage.images['b']
+        _, images = Rbd()._rbd_pool_list('rbd_list')
+        self.assertEqual([i['name'] for i in images], ['a'])
+        self.assertEqual(sorted(Rbd._image_cache),
+                         [('rbd_list', 'a')])
+        self.assertEqual(sorted(FakeImage.opened), ['a', 'b'])
+
+    def test_failing_image(self):
+        # pylint: disable=protected-access
+        FakeImage.images['c'] = image('3c')
+        FakeImage.images['b']['error'] = rbd.IOError('b is broken')
+        with self.assertRaises(rbd.IOError):
+            self.controller._rbd_pool_list('rbd_error')
+        # the other images were fetched and cached nevertheless
+        self.assertEqual(sorted(FakeImage.opened), ['a', 'b', 'c'])
+        self.assertEqual(sorted(Rbd._image_cache),
+                         [('rbd_error', 'a'), ('rbd_error', 'c')])
+
+        del FakeImage.images['b']['error']
+        _, images = self.controller._rbd_pool_list('rbd_error')
+        self.assertEqual([i['name'] for i in images], ['a', 'b', 'c'])
+        # only the failed image is opened again
+        self.assertEqual(sorted(FakeImage.opened), ['a', 'b', 'b', 'c'])
+
+    def test_bounded(self):
+        FakeImage.images['c'] = image('3c')
+        with mock.patch.object(Rbd, 'IMAGE_CACHE_MAX_ENTRIES', 2):
+            for name in ['a', 'b', 'a', 'c']:
+                self._get(name)
+            # b was the least recently used image
+            self.assertEqual(list(Rbd._image_cache),
+                             [('rbd', 'a'), ('rbd', 'c')])
+            self._get('a')
+            self._get('b')
+        self.assertEqual(FakeImage.opened, ['a', 'b', 'c', 'b'])
+
+    def test_removed_pool(self):
+        # pylint: disable=protected-access
+        self._get('a')
+        Rbd._image_cache[('gone', 'a')] = Rbd._image_cache[('rbd', 'a')]
+        Rbd._disk_usage_cache[('gone', 'a')] = (None, 0, None)
+        with mock.patch.object(rbd_controller.CephService, 'get_pool_list',
+                               return_value=[{'pool_name': 'rbd'}]):
+            self.controller._rbd_list('rbd')
+        self.assertEqual(sorted(Rbd._image_cache),
+                         [('rbd', 'a'), ('rbd', 'b')])
+        self.assertEqual(list(Rbd._disk_usage_cache), [])
@@ -56,6 +56,7 @@ class RbdMirroringControllerTest(ControllerTestCase):
             'fs_map': {'filesystems': []},
 
         }[key]
+        mgr.get_snapshot.side_effect = mgr.get.side_effect
         mgr.url_prefix = ''
         mgr.get_mgr_id.return_value = 0
         mgr.have_mon_connection.return_value = True
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import threading
+
+import mock
+
+from .. import mgr
+from ..controllers.summary import Summary
+from ..tools import ChangeFeed
+from .helper import ControllerTestCase
+
+
+class SummaryControllerTest(ControllerTestCase):
+
+    @classmethod
+    def setup_server(cls):
+        mgr.get.side_effect = lambda key: {
+            'health': {'json': '{"status": "HEALTH_OK"}'},
+            'mon_status': {'json': '{}'},
+        }[key]
+        mgr.url_prefix = ''
+        mgr.have_mon_connection.return_value = True
+
+        Summary._cp_config['tools.authenticate.on'] = False  # pylint: disable=protected-access
+
+        cls.setup_controllers([Summary], '/test')
+
+    def setUp(self):
+        ChangeFeed.start()
+
+    def tearDown(self):
+        ChangeFeed.stop()
+
+    def test_changes(self):
+        self._get('/test/api/summary/changes?since=0&timeout=0')
+        self.assertStatus(200)
+        result = self.jsonBody()
+        self.assertIn('health', result['changed'])
+        self.assertIn('osd_map', result['changed'])
+        self.assertEqual(result['summary']['health_status'], 'HEALTH_OK')
+        self.assertEqual(result['summary']['have_mon_connection'], True)
+        self.assertEqual(result['summary']['executing_tasks'], [])
+
+        self._get('/test/api/summary/changes?since={}&timeout=0&instance={}'
+                  .format(result['version'], result['instance']))
+        self.assertStatus(200)
+        self.assertJsonBody({'instance': ChangeFeed.instance,
+                             'version': result['version'], 'changed': []})
+
+    def test_changes_other_instance(self):
+        # a version of the mgr before a failover: everything changed
+        self._get('/test/api/summary/changes?since=0&timeout=0')
+        version = self.jsonBody()['version']
+        self._get('/test/api/summary/changes?since={}&timeout=0&instance=old'
+                  .format(version))
+        self.assertStatus(200)
+        result = self.jsonBody()
+        self.assertEqual(result['instance'], ChangeFeed.instance)
+        self.assertIn('health', result['changed'])
+        self.assertIn('osd_map', result['changed'])
+
+    def test_changes_topics(self):
+        self._get('/test/api/summary/changes?since=0&timeout=0&topics=osd_map')
+        self.assertStatus(200)
+        result = self.jsonBody()
+        self.assertEqual(result['changed'], ['osd_map'])
+        self.assertNotIn('summary', result)
+
+    def test_changes_too_many_waiters(self):
+        with mock.patch.object(Summary, '_changes_waiters',
+                               threading.Semaphore(0)):
+            self._get('/test/api/summary/changes?since=0&timeout=0')
+        self.assertStatus(503)
+
+    def test_changes_invalid(self):
+        self._get('/test/api/summary/changes?since=foo')
+        self.assertStatus(400)
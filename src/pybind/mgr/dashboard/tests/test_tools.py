@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 
+import time
 import unittest
 
 import cherrypy
@@ -11,7 +12,8 @@ from ..services.exception import handle_rados_error
 from .helper import ControllerTestCase
 from ..controllers import RESTController, ApiController, Controller, \
                           BaseController, Proxy
-from ..tools import is_valid_ipv6_address, dict_contains_path
+from ..tools import is_valid_ipv6_address, dict_contains_path, ViewCache, \
+    WorkerPool
 
 
 # pylint: disable=W0613
@@ -163,3 +165,75 @@ class TestFunctions(unittest.TestCase):
         self.assertTrue(dict_contains_path(x, ['a']))
         self.assertFalse(dict_contains_path(x, ['a', 'c']))
         self.assertTrue(dict_contains_path(x, []))
+
+
+class ViewCacheTest(unittest.TestCase):
+
+    def test_cached(self):
+        calls = []
+
+        @ViewCache(timeout=5, stale_period=60)
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        self.assertEqual(double(2), (ViewCache.VALUE_OK, 4))
+        self.assertEqual(double(2), (ViewCache.VALUE_OK, 4))
+        self.assertEqual(calls, [2])
+
+    def test_lru_eviction(self):
+        cache = ViewCache(timeout=5, stale_period=60, max_entries=2)
+        double = cache(lambda x: x * 2)
+
+        for x in [1, 2, 1, 3]:
+            double(x)
+        self.assertEqual(list(cache.cache_by_args.keys()), [(1,), (3,)])
+        self.assertEqual(cache.serializable_stats()['evictions'], 1)
+
+    def test_refresh_ahead(self):
+        calls = []
+
+        @ViewCache(timeout=5, stale_period=0.2)
+        def value():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(value(), (ViewCache.VALUE_OK, 1))
+        time.sleep(0.15)
+        # still fresh, but old enough to be refreshed in the background
+        self.assertEqual(value(), (ViewCache.VALUE_OK, 1))
+        time.sleep(0.1)
+        self.assertEqual(value(), (ViewCache.VALUE_OK, 2))
+
+    def test_nested(self):
+        inner = ViewCache(timeout=5)(lambda: 'inner')
+        outer = ViewCache(timeout=5)(lambda: inner()[1])
+        self.assertEqual(outer(), (ViewCache.VALUE_OK, 'inner'))
+
+    def test_stats(self):
+        cache = ViewCache(timeout=5, stale_period=60)
+        cache(lambda: None)()
+        stats = cache.serializable_stats()
+        self.assertIn(stats, ViewCache.list_stats())
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['refreshes'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+
+class WorkerPoolTest(unittest.TestCase):
+
+    def test_map(self):
+        pool = WorkerPool(3)
+        self.assertEqual(pool.map(lambda x: x * 2, range(10)),
+                         [x * 2 for x in range(10)])
+        self.assertEqual(pool.map(lambda x: x, []), [])
+
+    def test_map_exception(self):
+        def fail_on_five(x):
+            if x == 5:
+                raise ValueError(x)
+            return x
+
+        pool = WorkerPool(3)
+        with self.assertRaises(ValueError):
+            pool.map(fail_on_five, range(10))
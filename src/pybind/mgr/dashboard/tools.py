@@ -12,7 +12,9 @@ import fnmatch
 import time
 import threading
 import socket
-from six.moves import urllib
+import uuid
+import weakref
+from six.moves import queue, urllib
 import cherrypy
 
 from . import logger
@@ -101,65 +103,156 @@ class RequestLoggingTool(cherrypy.Tool):
                       "{0:.3f}s".format(lat), length, req.path_info)
 
 
+class WorkerPool(object):
+    """
+    A fixed number of daemon threads running the jobs submitted to them.
+    """
+    def __init__(self, size, name='worker'):
+        self.queue = queue.Queue()
+        self.local = threading.local()
+        for i in range(size):
+            thread = threading.Thread(target=self._run,
+                                      name='{} {}'.format(name, i))
+            thread.daemon = True
+            thread.start()
+
+    def in_worker(self):
+        return getattr(self.local, 'worker', False)
+
+    def submit(self, job):
+        self.queue.put(job)
+
+    def map(self, fn, items):
+        """
+        Call `fn` for every item on the workers and return the results in
+        the order of `items`. The first exception raised by `fn` is raised
+        once all items have been processed. Must not be called by one of
+        the workers of the same pool.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        errors = []
+        remaining = [len(items)]
+        lock = threading.Lock()
+        done = threading.Event()
+
+        # pylint: disable=broad-except
+        def job(index, item):
+            try:
+                results[index] = fn(item)
+            except Exception as ex:
+                errors.append(ex)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        done.set()
+
+        if not items:
+            return results
+        for index, item in enumerate(items):
+            self.submit(functools.partial(job, index, item))
+        done.wait()
+        if errors:
+            raise errors[0]
+        return results
+
+    # pylint: disable=broad-except
+    def _run(self):
+        self.local.worker = True
+        while True:
+            job = self.queue.get()
+            try:
+                job()
+            except Exception:
+                logger.exception("unhandled exception in %s",
+                                 threading.current_thread().name)
+
+
 # pylint: disable=too-many-instance-attributes
 class ViewCache(object):
     VALUE_OK = 0
     VALUE_STALE = 1
     VALUE_NONE = 2
 
-    class GetterThread(threading.Thread):
-        def __init__(self, view, fn, args, kwargs):
-            super(ViewCache.GetterThread, self).__init__()
-            self._view = view
-            self.event = threading.Event()
-            self.fn = fn
-            self.args = args
-            self.kwargs = kwargs
-
-        # pylint: disable=broad-except
-        def run(self):
-            t0 = 0.0
-            t1 = 0.0
-            try:
-                t0 = time.time()
-                logger.debug("VC: starting execution of %s", self.fn)
-                val = self.fn(*self.args, **self.kwargs)
-                t1 = time.time()
-            except Exception as ex:
-                with self._view.lock:
-                    logger.exception("Error while calling fn=%s ex=%s", self.fn,
-                                     str(ex))
-                    self._view.value = None
-                    self._view.value_when = None
-                    self._view.getter_thread = None
-                    self._view.exception = ex
-            else:
-                with self._view.lock:
-                    self._view.latency = t1 - t0
-                    self._view.value = val
-                    self._view.value_when = datetime.now()
-                    self._view.getter_thread = None
-                    self._view.exception = None
-
-            logger.debug("VC: execution of %s finished in: %s", self.fn,
-                         t1 - t0)
-            self.event.set()
+    # Values younger than this are returned without fetching them again
+    STALE_PERIOD = 1.0
+    # Values which are requested after this fraction of STALE_PERIOD are
+    # refreshed in the background, so that frequently requested values do
+    # not go stale in the first place
+    REFRESH_AHEAD = 0.5
+    # Number of argument tuples cached per decorated function
+    MAX_ENTRIES = 64
+    # Values which have not been requested for this long are dropped
+    ENTRY_TTL = 300.0
+    # Number of threads fetching values, shared by all view caches
+    WORKERS = 8
+
+    _instances = weakref.WeakSet()
+    _pool = None
+    _pool_lock = threading.Lock()
 
     class RemoteViewCache(object):
-        # Return stale data if
-        STALE_PERIOD = 1.0
-
-        def __init__(self, timeout):
-            self.getter_thread = None
-            # Consider data within 1s old to be sufficiently fresh
-            self.timeout = timeout
-            self.event = threading.Event()
+        def __init__(self, view):
+            self._view = view
+            # set once the fetch in progress, if any, finished
+            self.fetching = None
             self.value_when = None
             self.value = None
             self.latency = 0
             self.exception = None
+            self.last_access = time.time()
             self.lock = threading.Lock()
 
+        def _fetch(self, fn, args, kwargs, event):
+            t0 = time.time()
+            try:
+                logger.debug("VC: starting execution of %s", fn)
+                val = fn(*args, **kwargs)
+            except Exception as ex:  # pylint: disable=broad-except
+                with self.lock:
+                    logger.exception("Error while calling fn=%s ex=%s", fn,
+                                     str(ex))
+                    self.value = None
+                    self.value_when = None
+                    self.fetching = None
+                    self.exception = ex
+                self._view.count('errors')
+            else:
+                latency = time.time() - t0
+                with self.lock:
+                    self.latency = latency
+                    self.value = val
+                    self.value_when = time.time()
+                    self.fetching = None
+                    self.exception = None
+                self._view.record_refresh(latency)
+
+            logger.debug("VC: execution of %s finished in: %s", fn,
+                         time.time() - t0)
+            event.set()
+
+        def _start_fetch(self, fn, args, kwargs):
+            """
+            Must be called with the lock held. Returns the event of the fetch
+            in progress and whether the caller has to run the fetch itself.
+            """
+            if self.fetching is not None:
+                logger.debug("VC: fetch still in progress for: %s", fn)
+                return self.fetching, False
+
+            self.fetching = threading.Event()
+            pool = ViewCache.get_pool()
+            if pool.in_worker():
+                # Called by a value being fetched: fetch in this thread,
+                # rather than waiting for another worker which might never
+                # become available.
+                return self.fetching, True
+
+            pool.submit(functools.partial(self._fetch, fn, args, kwargs,
+                                          self.fetching))
+            return self.fetching, False
+
         def run(self, fn, args, kwargs):
             """
             If data less than `stale_period` old is available, return it
@@ -175,21 +268,24 @@ class ViewCache(object):
             :return: 2-tuple of value status code, value
             """
             with self.lock:
-                now = datetime.now()
-                if self.value_when and now - self.value_when < timedelta(
-                        seconds=self.STALE_PERIOD):
-                    return ViewCache.VALUE_OK, self.value
-
-                if self.getter_thread is None:
-                    self.getter_thread = ViewCache.GetterThread(self, fn, args,
-                                                                kwargs)
-                    self.getter_thread.start()
-                else:
-                    logger.debug("VC: getter_thread still alive for: %s", fn)
-
-                ev = self.getter_thread.event
-
-            success = ev.wait(timeout=self.timeout)
+                now = time.time()
+                self.last_access = now
+                if self.value_when is not None:
+                    age = now - self.value_when
+                    if age < self._view.stale_period:
+                        if age >= self._view.stale_period * \
+                                ViewCache.REFRESH_AHEAD and \
+                                not ViewCache.get_pool().in_worker():
+                            self._start_fetch(fn, args, kwargs)
+                        self._view.count('hits')
+                        return ViewCache.VALUE_OK, self.value
+
+                ev, run_here = self._start_fetch(fn, args, kwargs)
+
+            self._view.count('misses')
+            if run_here:
+                self._fetch(fn, args, kwargs, ev)
+            success = ev.wait(timeout=self._view.timeout)
 
             with self.lock:
                 if success:
@@ -201,21 +297,89 @@ class ViewCache(object):
                     return ViewCache.VALUE_OK, self.value
                 elif self.value_when is not None:
                     # We have some data, but it doesn't meet freshness requirements
+                    self._view.count('stale')
                     return ViewCache.VALUE_STALE, self.value
                 # We have no data, not even stale data
                 raise ViewCacheNoDataException()
 
-    def __init__(self, timeout=5):
+    def __init__(self, timeout=5, stale_period=None, max_entries=None,
+                 ttl=None):
         self.timeout = timeout
-        self.cache_by_args = {}
+        self.stale_period = stale_period if stale_period is not None \
+            else self.STALE_PERIOD
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else self.ENTRY_TTL
+        self.name = None
+        # least recently used first
+        self.cache_by_args = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = dict.fromkeys(['hits', 'misses', 'stale', 'errors',
+                                    'refreshes', 'evictions'], 0)
+        self.refresh_latency_sum = 0.0
+        self.refresh_latency_max = 0.0
+        with ViewCache._pool_lock:
+            ViewCache._instances.add(self)
+
+    @classmethod
+    def get_pool(cls):
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = WorkerPool(cls.WORKERS, 'ViewCache worker')
+            return cls._pool
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def record_refresh(self, latency):
+        with self.lock:
+            self.stats['refreshes'] += 1
+            self.refresh_latency_sum += latency
+            self.refresh_latency_max = max(self.refresh_latency_max, latency)
+
+    def _get_entry(self, args):
+        with self.lock:
+            rvc = self.cache_by_args.pop(args, None)
+            if rvc is None:
+                rvc = ViewCache.RemoteViewCache(self)
+            self.cache_by_args[args] = rvc
+
+            while len(self.cache_by_args) > self.max_entries:
+                self.cache_by_args.popitem(last=False)
+                self.stats['evictions'] += 1
+
+            expire = time.time() - self.ttl
+            while True:
+                oldest = next(iter(self.cache_by_args.values()))
+                if oldest is rvc or oldest.last_access >= expire:
+                    break
+                self.cache_by_args.popitem(last=False)
+                self.stats['evictions'] += 1
+            return rvc
+
+    def serializable_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['name'] = self.name
+            stats['entries'] = len(self.cache_by_args)
+            stats['refresh_latency_avg'] = \
+                self.refresh_latency_sum / stats['refreshes'] \
+                if stats['refreshes'] else 0.0
+            stats['refresh_latency_max'] = self.refresh_latency_max
+        return stats
+
+    @classmethod
+    def list_stats(cls):
+        with cls._pool_lock:
+            instances = list(cls._instances)
+        return sorted([vc.serializable_stats() for vc in instances],
+                      key=lambda s: s['name'] or '')
 
     def __call__(self, fn):
+        self.name = '{}.{}'.format(fn.__module__, fn.__name__)
+
         def wrapper(*args, **kwargs):
-            rvc = self.cache_by_args.get(args, None)
-            if not rvc:
-                rvc = ViewCache.RemoteViewCache(self.timeout)
-                self.cache_by_args[args] = rvc
-            return rvc.run(fn, args, kwargs)
+            return self._get_entry(args).run(fn, args, kwargs)
         return wrapper
 
 
@@ -400,6 +564,131 @@ class NotificationQueue(threading.Thread):
         logger.debug("notification queue finished")
 
 
+class ChangeFeed(object):
+    """
+    Keeps a version number for each topic, fed by the notifications of the
+    `NotificationQueue`. A topic's version is only bumped when its data
+    actually changed, so clients can wait for changes instead of polling
+    every endpoint on a timer.
+
+    Fingerprints are only evaluated while clients are waiting: without
+    waiters, notifications just mark their topic as dirty, and the next
+    waiter evaluates the fingerprints of the dirty topics.
+
+    Versions start over in every mgr daemon, clients tell them apart by
+    `instance`.
+    """
+    instance = uuid.uuid4().hex
+    _cond = threading.Condition()
+    # starts at 1, so that clients asking for changes since 0 get all topics
+    _version = 1
+    # topic -> [fingerprint function, version, last fingerprint]
+    _topics = {}
+    # topics notified while nobody was waiting, fingerprints not evaluated yet
+    _dirty = set()
+    _waiters = 0
+    _running = False
+
+    _UNKNOWN = object()
+
+    @classmethod
+    def start(cls):
+        with cls._cond:
+            cls._running = True
+
+    @classmethod
+    def stop(cls):
+        with cls._cond:
+            cls._running = False
+            # wake up all waiting clients
+            cls._cond.notify_all()
+
+    @classmethod
+    def add_topic(cls, topic, n_types=None, fingerprint=None):
+        """Adds a topic that changes on notifications of `n_types`
+
+        Args:
+            topic (str): the topic name
+            n_types (list): the notification types, defaults to `[topic]`
+            fingerprint (function): returns a cheap, comparable digest of the
+                topic's data. Notifications that leave it unchanged are
+                ignored. Without it, every notification is a change.
+        """
+        with cls._cond:
+            if topic in cls._topics:
+                return
+            cls._topics[topic] = [fingerprint, cls._version, cls._UNKNOWN]
+        NotificationQueue.register(functools.partial(cls._handle_notification,
+                                                     topic),
+                                   n_types or [topic])
+
+    @classmethod
+    def _handle_notification(cls, topic, _notify_value):
+        with cls._cond:
+            if cls._topics[topic][0] and not cls._waiters:
+                cls._dirty.add(topic)
+                return
+        cls._update(topic)
+
+    @classmethod
+    def _update(cls, topic):
+        fingerprint = cls._topics[topic][0]
+        digest = fingerprint() if fingerprint else None
+        with cls._cond:
+            cls._dirty.discard(topic)
+            if fingerprint and cls._topics[topic][2] == digest:
+                return
+            cls._version += 1
+            cls._topics[topic][1:] = [cls._version, digest]
+            cls._cond.notify_all()
+
+    @classmethod
+    def wait(cls, since, topics=None, timeout=None, instance=None):
+        """
+        Waits until at least one of `topics` (all by default) has changed
+        after version `since`, or until `timeout` seconds have passed.
+
+        A `since` version of another `instance` of the feed (e.g. before a
+        mgr failover), or newer than the current one, is treated like 0,
+        i.e. all topics are reported changed.
+
+        :return: tuple of the current version and the changed topics
+        :rtype: tuple[int, list[str]]
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        if instance is not None and instance != cls.instance:
+            since = 0
+        with cls._cond:
+            cls._waiters += 1
+            dirty = list(cls._dirty)
+        try:
+            for topic in dirty:
+                cls._update(topic)
+            return cls._wait(since, topics, deadline)
+        finally:
+            with cls._cond:
+                cls._waiters -= 1
+
+    @classmethod
+    def _wait(cls, since, topics, deadline):
+        with cls._cond:
+            if since > cls._version:
+                since = 0
+            while True:
+                changed = [topic for topic, (_, version, _) in cls._topics.items()
+                           if version > since and
+                           (topics is None or topic in topics)]
+                if changed or not cls._running:
+                    return cls._version, sorted(changed)
+                if deadline is None:
+                    cls._cond.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return cls._version, []
+                    cls._cond.wait(remaining)
+
+
 # pylint: disable=too-many-arguments, protected-access
 class TaskManager(object):
     FINISHED_TASK_SIZE = 10
@@ -444,6 +733,7 @@ class TaskManager(object):
                         return t
             logger.debug("TM: created %s", task)
             cls._executing_tasks.add(task)
+        NotificationQueue.new_notification('cd_task_created', task)
         logger.info("TM: running %s", task)
         task._run()
         return task
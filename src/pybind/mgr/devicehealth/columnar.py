@@ -0,0 +1,262 @@
+"""
+Columnar storage of device health metrics.
+
+The samples of a device are grouped into chunks that span CHUNK_DAYS
+days each, stored as one OMAP value per chunk on the device's object.
+Within a chunk, every sample is flattened into (path, value) pairs and
+stored column by column: integer columns (the bulk of the SMART data)
+as delta-encoded, fixed-width int64 arrays, everything else as a list
+of the points at which the value changes. The whole chunk is then
+compressed, so values which stay the same from one scrape to the next
+cost next to nothing.
+
+Range queries only need to read the chunks overlapping the range, and
+retention is enforced by dropping whole chunks.
+"""
+import base64
+import json
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+CHUNK_PREFIX = 'chunk-'
+CHUNK_KEY_FORMAT = '%Y%m%d'
+CHUNK_DAYS = 7
+
+FORMAT_VERSION = 1
+
+# Keep values well within int64, so that their deltas fit as well
+INT_LIMIT = 2 ** 62
+
+try:
+    INT_TYPES = (int, long)
+except NameError:
+    INT_TYPES = (int,)
+
+EPOCH = datetime.utcfromtimestamp(0)
+
+
+class _Missing(object):
+    def __repr__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+def chunk_key(when):
+    """
+    :param datetime when: the time of a sample
+    :return: the OMAP key of the chunk the sample belongs to
+    """
+    days = (when - EPOCH).days
+    days -= days % CHUNK_DAYS
+    return CHUNK_PREFIX + (EPOCH + timedelta(days=days)).strftime(
+        CHUNK_KEY_FORMAT)
+
+
+def chunk_range(key):
+    """
+    :return: the (start, end) datetimes covered by the chunk with the
+             OMAP key ``key``
+    """
+    start = datetime.strptime(key[len(CHUNK_PREFIX):], CHUNK_KEY_FORMAT)
+    return start, start + timedelta(days=CHUNK_DAYS)
+
+
+def chunk_expired(key, oldest):
+    """
+    :return: whether the chunk with the OMAP key ``key`` only holds samples
+             taken before the datetime ``oldest``, chunks expire as a whole
+    """
+    return chunk_range(key)[1] <= oldest
+
+
+def to_timestamp(when):
+    return int((when - EPOCH).total_seconds())
+
+
+def from_timestamp(timestamp):
+    return datetime.utcfromtimestamp(timestamp)
+
+
+def flatten(value, path=()):
+    """
+    Yield the (path, value) pairs of all scalars and empty containers of
+    a JSON-like structure. Path elements are dict keys or list indices.
+    """
+    if isinstance(value, dict) and value:
+        for k, v in value.items():
+            for item in flatten(v, path + (k,)):
+                yield item
+    elif isinstance(value, list) and value:
+        for i, v in enumerate(value):
+            for item in flatten(v, path + (i,)):
+                yield item
+    else:
+        yield path, value
+
+
+def unflatten(items):
+    """
+    The reverse of ``flatten``
+    """
+    root = None
+    for path, value in items:
+        if not path:
+            return value
+        if root is None:
+            root = [] if isinstance(path[0], int) else {}
+        node = root
+        for i, key in enumerate(path):
+            if i == len(path) - 1:
+                child = value
+            else:
+                child = [] if isinstance(path[i + 1], int) else {}
+            if isinstance(node, list):
+                while len(node) <= key:
+                    node.append(None)
+                if node[key] is None:
+                    node[key] = child
+                node = node[key]
+            else:
+                node = node.setdefault(key, child)
+    return root
+
+
+def _is_int(value):
+    # bool is an int too, but would not survive the round trip
+    return type(value) in INT_TYPES and -INT_LIMIT < value < INT_LIMIT
+
+
+def _same(a, b):
+    return type(a) is type(b) and a == b
+
+
+def _pack_ints(values):
+    deltas = [b - a for a, b in zip([0] + values[:-1], values)]
+    packed = struct.pack('<%dq' % len(deltas), *deltas)
+    return base64.b64encode(packed).decode('ascii')
+
+
+def _unpack_ints(data):
+    packed = base64.b64decode(data)
+    values = []
+    value = 0
+    for delta in struct.unpack('<%dq' % (len(packed) // 8), packed):
+        value += delta
+        values.append(value)
+    return values
+
+
+class MetricsChunk(object):
+    """
+    The samples of one device within one chunk.
+    """
+
+    def __init__(self):
+        # seconds since the epoch, one per sample
+        self.timestamps = []
+        # path -> one int per sample
+        self.ints = {}
+        # path -> list of (index, value) changes, (index,) for missing
+        self.changes = {}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def decode(cls, data):
+        doc = json.loads(zlib.decompress(data).decode('utf-8'))
+        if doc['v'] > FORMAT_VERSION:
+            raise ValueError('unsupported metrics chunk version {0}'.format(
+                doc['v']))
+        chunk = cls()
+        chunk.timestamps = _unpack_ints(doc['t'])
+        chunk.ints = dict((tuple(json.loads(path)), _unpack_ints(values))
+                          for path, values in doc['i'].items())
+        chunk.changes = dict((tuple(json.loads(path)),
+                              [tuple(c) for c in changes])
+                             for path, changes in doc['c'].items())
+        return chunk
+
+    def encode(self):
+        doc = {
+            'v': FORMAT_VERSION,
+            't': _pack_ints(self.timestamps),
+            'i': dict((json.dumps(path), _pack_ints(values))
+                      for path, values in self.ints.items()),
+            'c': dict((json.dumps(path), changes)
+                      for path, changes in self.changes.items()),
+        }
+        return zlib.compress(
+            json.dumps(doc, separators=(',', ':')).encode('utf-8'))
+
+    def _last_value(self, path):
+        changes = self.changes[path]
+        if not changes or len(changes[-1]) == 1:
+            return MISSING
+        return changes[-1][1]
+
+    def _set_value(self, path, index, value):
+        if not _same(self._last_value(path), value):
+            self.changes[path].append(
+                (index,) if value is MISSING else (index, value))
+
+    def _demote(self, path):
+        """
+        Move an int column over to the changes
+        """
+        self.changes[path] = []
+        for index, value in enumerate(self.ints.pop(path)):
+            self._set_value(path, index, value)
+
+    def append(self, when, sample):
+        """
+        Add a sample taken at the datetime ``when``
+        """
+        index = len(self.timestamps)
+        self.timestamps.append(to_timestamp(when))
+
+        values = dict(flatten(sample))
+        for path in set(self.ints) | set(self.changes) | set(values):
+            value = values.get(path, MISSING)
+            if path in self.ints:
+                if _is_int(value):
+                    self.ints[path].append(value)
+                    continue
+                self._demote(path)
+            elif path not in self.changes:
+                if index == 0 and _is_int(value):
+                    self.ints[path] = [value]
+                    continue
+                # a new path, missing from all the previous samples
+                self.changes[path] = [(0,)] if index else []
+            self._set_value(path, index, value)
+
+    def samples(self, start=None, end=None):
+        """
+        Yield the (datetime, sample) pairs of the chunk, optionally only
+        those taken within [start, end).
+        """
+        changes = {}
+        for path, path_changes in self.changes.items():
+            values = [MISSING] * len(self.timestamps)
+            for i, change in enumerate(path_changes):
+                stop = path_changes[i + 1][0] if i + 1 < len(path_changes) \
+                    else len(values)
+                value = MISSING if len(change) == 1 else change[1]
+                values[change[0]:stop] = [value] * (stop - change[0])
+            changes[path] = values
+
+        for index, timestamp in enumerate(self.timestamps):
+            when = from_timestamp(timestamp)
+            if (start is not None and when < start) or \
+                    (end is not None and when >= end):
+                continue
+            items = [(path, values[index])
+                     for path, values in self.ints.items()]
+            items.extend((path, values[index])
+                         for path, values in changes.items()
+                         if values[index] is not MISSING)
+            yield when, unflatten(items)
@@ -7,10 +7,14 @@ import json
 from mgr_module import MgrModule, CommandResult
 import operator
 import rados
-from threading import Event
-from datetime import datetime, timedelta, date, time
+import time
+from threading import Condition, Event
+from datetime import datetime, timedelta, date
 from six import iteritems
 
+from .columnar import CHUNK_PREFIX, MetricsChunk, chunk_expired, chunk_key, \
+    chunk_range
+
 TIME_FORMAT = '%Y%m%d-%H%M%S'
 
 DEVICE_HEALTH = 'DEVICE_HEALTH'
@@ -22,6 +26,25 @@ HEALTH_MESSAGES = {
     DEVICE_HEALTH_TOOMANY: 'Too many daemons are expected to fail soon',
 }
 
+# number of the slowest OSDs reported after a scrape
+SCRAPE_STRAGGLERS = 5
+
+
+class ScrapeResult(CommandResult):
+    """
+    A ``smart`` command in flight, waking up the scraper once complete
+    """
+    def __init__(self, osd_id, cond):
+        super(ScrapeResult, self).__init__('')
+        self.osd_id = osd_id
+        self.cond = cond
+        self.started = time.time()
+
+    def complete(self, r, outb, outs):
+        with self.cond:
+            super(ScrapeResult, self).complete(r, outb, outs)
+            self.cond.notify()
+
 
 class Module(MgrModule):
     OPTIONS = [
@@ -33,6 +56,14 @@ class Module(MgrModule):
             'name': 'scrape_frequency',
             'default': str(86400),
         },
+        {
+            'name': 'scrape_concurrency',
+            'default': str(32),
+        },
+        {
+            'name': 'scrape_timeout',
+            'default': str(300),
+        },
         {
             'name': 'pool_name',
             'default': 'device_health_metrics',
@@ -41,6 +72,10 @@ class Module(MgrModule):
             'name': 'retention_period',
             'default': str(86400 * 14),
         },
+        {
+            'name': 'storage_format',
+            'default': 'json',
+        },
         {
             'name': 'mark_out_threshold',
             'default': str(86400 * 14 * 2),
@@ -271,9 +306,9 @@ class Module(MgrModule):
         ioctx = self.open_connection()
         raw_smart_data = self.do_scrape_osd(osd_id)
         if raw_smart_data:
-            for device, raw_data in raw_smart_data.items():
-                data = self.extract_smart_features(raw_data)
-                self.put_device_metrics(ioctx, device, data)
+            self.put_devices_metrics(ioctx, dict(
+                (device, self.extract_smart_features(raw_data))
+                for device, raw_data in raw_smart_data.items()))
         ioctx.close()
         return 0, "", ""
 
@@ -281,22 +316,50 @@ class Module(MgrModule):
         osdmap = self.get("osd_map")
         assert osdmap is not None
         ioctx = self.open_connection()
+        started = time.time()
         did_device = {}
-        for osd in osdmap['osds']:
-            osd_id = osd['osd']
-            raw_smart_data = self.do_scrape_osd(osd_id)
-            if not raw_smart_data:
-                continue
-            for device, raw_data in raw_smart_data.items():
-                if device in did_device:
-                    self.log.debug('skipping duplicate %s' % device)
+        latencies = {}
+        failed = []
+        timed_out = []
+        for results in self.do_scrape_osds([osd['osd']
+                                            for osd in osdmap['osds']]):
+            metrics = {}
+            for osd_id, raw_smart_data, latency in results:
+                if latency is None:
+                    timed_out.append(osd_id)
                     continue
-                did_device[device] = 1
-                data = self.extract_smart_features(raw_data)
-                self.put_device_metrics(ioctx, device, data)
-
+                latencies[osd_id] = latency
+                if not raw_smart_data:
+                    failed.append(osd_id)
+                    continue
+                for device, raw_data in raw_smart_data.items():
+                    if device in did_device:
+                        self.log.debug('skipping duplicate %s' % device)
+                        continue
+                    did_device[device] = 1
+                    metrics[device] = self.extract_smart_features(raw_data)
+            if metrics:
+                self.put_devices_metrics(ioctx, metrics)
         ioctx.close()
-        return 0, "", ""
+
+        slowest = sorted(latencies.items(), key=operator.itemgetter(1),
+                         reverse=True)[:SCRAPE_STRAGGLERS]
+        stats = {
+            'wall_time': round(time.time() - started, 3),
+            'num_osds': len(latencies) + len(timed_out),
+            'num_devices': len(did_device),
+            'failed': sorted(failed),
+            'timed_out': sorted(timed_out),
+            'slowest': [{'osd': osd_id, 'latency': round(latency, 3)}
+                        for osd_id, latency in slowest],
+        }
+        self.log.info('Scraped %d devices of %d OSDs in %.3fs, slowest %s, '
+                      'failed %s, timed out %s' % (
+                          stats['num_devices'], stats['num_osds'],
+                          stats['wall_time'],
+                          ', '.join('osd.%d (%.3fs)' % i for i in slowest),
+                          stats['failed'], stats['timed_out']))
+        return 0, json.dumps(stats, indent=4), ''
 
     def scrape_device(self, devid):
         r = self.get("device " + devid)
@@ -312,27 +375,20 @@ class Module(MgrModule):
         ioctx = self.open_connection()
         raw_smart_data = self.do_scrape_osd(osd_id, devid=devid)
         if raw_smart_data:
-            for device, raw_data in raw_smart_data.items():
-                data = self.extract_smart_features(raw_data)
-                self.put_device_metrics(ioctx, device, data)
+            self.put_devices_metrics(ioctx, dict(
+                (device, self.extract_smart_features(raw_data))
+                for device, raw_data in raw_smart_data.items()))
         ioctx.close()
         return 0, "", ""
 
-    def do_scrape_osd(self, osd_id, devid=''):
-        """
-        :return: a dict, or None if the scrape failed.
-        """
-        self.log.debug('do_scrape_osd osd.%d' % osd_id)
-
-        # scrape from osd
-        result = CommandResult('')
+    def send_smart_command(self, result, osd_id, devid=''):
         self.send_command(result, 'osd', str(osd_id), json.dumps({
             'prefix': 'smart',
             'format': 'json',
             'devid': devid,
         }), '')
-        r, outb, outs = result.wait()
 
+    def parse_smart_result(self, osd_id, outb):
         try:
             return json.loads(outb)
         except (IndexError, ValueError):
@@ -340,70 +396,244 @@ class Module(MgrModule):
                 "Fail to parse JSON result from OSD {0} ({1})".format(
                     osd_id, outb))
 
+    def do_scrape_osd(self, osd_id, devid=''):
+        """
+        :return: a dict, or None if the scrape failed.
+        """
+        self.log.debug('do_scrape_osd osd.%d' % osd_id)
+
+        # scrape from osd
+        result = CommandResult('')
+        self.send_smart_command(result, osd_id, devid)
+        r, outb, outs = result.wait()
+        return self.parse_smart_result(osd_id, outb)
+
+    def do_scrape_osds(self, osd_ids):
+        """
+        Scrape several OSDs concurrently, with at most scrape_concurrency
+        smart commands in flight, giving up on those still running after
+        scrape_timeout seconds.
+
+        :return: a generator of lists of (osd_id, raw_smart_data, latency)
+                 tuples, one list for every batch of commands found
+                 complete at once. raw_smart_data is None if the scrape
+                 failed, latency is None if it timed out.
+        """
+        window = max(int(self.scrape_concurrency), 1)
+        timeout = int(self.scrape_timeout)
+        cond = Condition()
+        pending = list(reversed(osd_ids))
+        in_flight = []
+        while self.run and (pending or in_flight):
+            while pending and len(in_flight) < window:
+                osd_id = pending.pop()
+                self.log.debug('do_scrape_osds osd.%d' % osd_id)
+                result = ScrapeResult(osd_id, cond)
+                in_flight.append(result)
+                self.send_smart_command(result, osd_id)
+
+            with cond:
+                if not any(r.ev.is_set() for r in in_flight):
+                    if timeout > 0:
+                        oldest = min(r.started for r in in_flight)
+                        cond.wait(max(oldest + timeout - time.time(), 0))
+                    else:
+                        cond.wait()
+
+            now = time.time()
+            done = []
+            for result in list(in_flight):
+                if result.ev.is_set():
+                    done.append((result.osd_id,
+                                 self.parse_smart_result(result.osd_id,
+                                                         result.outb),
+                                 now - result.started))
+                elif 0 < timeout <= now - result.started:
+                    self.log.warn('Scraping osd.%d timed out after %ds' %
+                                  (result.osd_id, timeout))
+                    done.append((result.osd_id, None, None))
+                else:
+                    continue
+                in_flight.remove(result)
+            if done:
+                yield done
+
+    def _list_device_metrics_keys(self, ioctx, devid):
+        with rados.ReadOpCtx() as op:
+            omap_iter, ret = ioctx.get_omap_keys(op, "", 500)  # fixme
+            assert ret == 0
+            ioctx.operate_read_op(op, devid)
+            return [key for key, _ in list(omap_iter)]
+
     def put_device_metrics(self, ioctx, devid, data):
-        old_key = datetime.utcnow() - timedelta(
-            seconds=int(self.retention_period))
+        self.put_devices_metrics(ioctx, {devid: data})
+
+    def put_devices_metrics(self, ioctx, metrics):
+        """
+        Store the metrics of several devices, with the OMAP reads of all
+        the devices in flight at once, and then their writes.
+
+        :param metrics: a dict mapping device ids to their metrics
+        """
+        now = datetime.utcnow()
+        old_key = now - timedelta(seconds=int(self.retention_period))
         prune = old_key.strftime(TIME_FORMAT)
-        self.log.debug('put_device_metrics device %s prune %s' %
-                       (devid, prune))
-        erase = []
-        try:
-            with rados.ReadOpCtx() as op:
-                omap_iter, ret = ioctx.get_omap_keys(op, "", 500)  # fixme
+        columnar = self.storage_format == 'columnar'
+        chunk_name = chunk_key(now)
+        self.log.debug('put_devices_metrics %d devices prune %s' %
+                       (len(metrics), prune))
+
+        reads = []
+        for devid in metrics:
+            op = ioctx.create_read_op()
+            omap_iter, ret = ioctx.get_omap_keys(op, "", 500)  # fixme
+            assert ret == 0
+            chunk_iter = None
+            if columnar:
+                # fetch the chunk we append to in the same round trip
+                chunk_iter, ret = ioctx.get_omap_vals_by_keys(
+                    op, (chunk_name,))
                 assert ret == 0
-                ioctx.operate_read_op(op, devid)
-                for key, _ in list(omap_iter):
-                    if key >= prune:
-                        break
-                    erase.append(key)
-        except rados.ObjectNotFound:
-            # The object doesn't already exist, no problem.
-            pass
-        except rados.Error as e:
-            # Do not proceed with writes if something unexpected
-            # went wrong with the reads.
-            self.log.exception("Error reading OMAP: {0}".format(e))
-            return
-
-        key = datetime.utcnow().strftime(TIME_FORMAT)
-        self.log.debug('put_device_metrics device %s key %s = %s, erase %s' %
-                       (devid, key, data, erase))
-        with rados.WriteOpCtx() as op:
-            ioctx.set_omap(op, (key,), (str(json.dumps(data)),))
+            completion = ioctx.operate_aio_read_op(op, devid)
+            reads.append((devid, op, completion, omap_iter, chunk_iter))
+
+        writes = []
+        for devid, op, completion, omap_iter, chunk_iter in reads:
+            completion.wait_for_complete()
+            ret = completion.get_return_value()
+            chunk = None
+            erase = []
+            try:
+                if ret == -errno.ENOENT:
+                    # The object doesn't already exist, no problem.
+                    pass
+                elif ret < 0:
+                    # Do not proceed with writes if something unexpected
+                    # went wrong with the reads.
+                    self.log.error('Error reading OMAP of device %s: %d' %
+                                   (devid, ret))
+                    continue
+                else:
+                    for key, _ in list(omap_iter):
+                        if key.startswith(CHUNK_PREFIX):
+                            if chunk_expired(key, old_key):
+                                erase.append(key)
+                        elif key < prune:
+                            erase.append(key)
+                    if columnar:
+                        for _, value in list(chunk_iter):
+                            chunk = MetricsChunk.decode(value)
+            except (ValueError, TypeError) as e:
+                # Do not overwrite a chunk we are unable to decode
+                self.log.error('Unable to decode metrics chunk %s of device '
+                               '%s: %s' % (chunk_name, devid, e))
+                continue
+            finally:
+                ioctx.release_read_op(op)
+
+            data = metrics[devid]
+            if columnar:
+                chunk = chunk or MetricsChunk()
+                chunk.append(now, data)
+                key = chunk_name
+                value = chunk.encode()
+            else:
+                key = now.strftime(TIME_FORMAT)
+                value = str(json.dumps(data))
+            self.log.debug('put_devices_metrics device %s key %s = %s, '
+                           'erase %s' % (devid, key, data, erase))
+            op = ioctx.create_write_op()
+            ioctx.set_omap(op, (key,), (value,))
             if len(erase):
                 ioctx.remove_omap_keys(op, tuple(erase))
-            ioctx.operate_write_op(op, devid)
+            writes.append((devid, op, ioctx.operate_aio_write_op(op, devid)))
+
+        for devid, op, completion in writes:
+            completion.wait_for_complete()
+            ret = completion.get_return_value()
+            ioctx.release_write_op(op)
+            if ret < 0:
+                self.log.error('Error writing OMAP of device %s: %d' %
+                               (devid, ret))
+
+    def get_device_metrics(self, devid, min_sample=None, max_sample=None):
+        """
+        Fetch the stored metrics of a device, in either storage format.
+
+        :param min_sample: if set, the earliest sample to return, in
+                           TIME_FORMAT
+        :param max_sample: if set, the latest sample to return, in
+                           TIME_FORMAT
+        :return: a dict mapping the sample time, in TIME_FORMAT, to the
+                 sample
+        """
+        start = datetime.strptime(min_sample, TIME_FORMAT) \
+            if min_sample else None
+        end = datetime.strptime(max_sample, TIME_FORMAT) + \
+            timedelta(seconds=1) if max_sample else None
 
-    def show_device_metrics(self, devid, sample):
-        # verify device exists
-        r = self.get("device " + devid)
-        if not r or 'device' not in r.keys():
-            return -errno.ENOENT, '', 'device ' + devid + ' not found'
-        # fetch metrics
         res = {}
         ioctx = self.open_connection(create_if_missing=False)
-        if ioctx:
+        if not ioctx:
+            return res
+        try:
+            try:
+                keys = self._list_device_metrics_keys(ioctx, devid)
+            except rados.ObjectNotFound:
+                return res
+
+            # only fetch the values we need: the legacy samples within the
+            # range and the chunks overlapping it
+            wanted = []
+            for key in keys:
+                if key.startswith(CHUNK_PREFIX):
+                    chunk_start, chunk_end = chunk_range(key)
+                    if (end is None or chunk_start < end) and \
+                            (start is None or chunk_end > start):
+                        wanted.append(key)
+                elif (min_sample is None or key >= min_sample) and \
+                        (max_sample is None or key <= max_sample):
+                    wanted.append(key)
+            if not wanted:
+                return res
+
             with rados.ReadOpCtx() as op:
-                omap_iter, ret = ioctx.get_omap_vals(op, "", sample or '', 500)  # fixme
+                omap_iter, ret = ioctx.get_omap_vals_by_keys(op,
+                                                             tuple(wanted))
                 assert ret == 0
                 try:
                     ioctx.operate_read_op(op, devid)
-                    for key, value in list(omap_iter):
-                        if sample and key != sample:
-                            break
-                        try:
-                            v = json.loads(value)
-                        except (ValueError, IndexError):
-                            self.log.debug('unable to parse value for %s: "%s"' %
-                                           (key, value))
-                            pass
-                        res[key] = v
                 except rados.ObjectNotFound:
-                    pass
-                except rados.Error as e:
-                    self.log.exception("RADOS error reading omap: {0}".format(e))
-                    raise
+                    return res
+                for key, value in list(omap_iter):
+                    try:
+                        if not key.startswith(CHUNK_PREFIX):
+                            res[key] = json.loads(value)
+                            continue
+                        chunk = MetricsChunk.decode(value)
+                        for when, sample in chunk.samples(start, end):
+                            res[when.strftime(TIME_FORMAT)] = sample
+                    except (ValueError, IndexError, TypeError):
+                        self.log.debug('unable to parse value for %s: "%s"' %
+                                       (key, value))
+        except rados.Error as e:
+            self.log.exception("RADOS error reading omap: {0}".format(e))
+            raise
+        finally:
+            ioctx.close()
+        return res
 
+    def show_device_metrics(self, devid, sample):
+        # verify device exists
+        r = self.get("device " + devid)
+        if not r or 'device' not in r.keys():
+            return -errno.ENOENT, '', 'device ' + devid + ' not found'
+        # fetch metrics
+        try:
+            res = self.get_device_metrics(devid, sample or None,
+                                          sample or None)
+        except ValueError:
+            return -errno.EINVAL, '', 'not a valid sample: ' + sample
         return 0, json.dumps(res, indent=4), ''
 
     def check_health(self):
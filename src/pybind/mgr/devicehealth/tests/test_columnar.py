@@ -0,0 +1,183 @@
+import base64
+import json
+import struct
+import unittest
+import zlib
+from datetime import datetime, timedelta
+
+from ..columnar import CHUNK_DAYS, FORMAT_VERSION, INT_LIMIT, \
+    MetricsChunk, _pack_ints, _unpack_ints, chunk_expired, chunk_key, \
+    chunk_range, flatten, unflatten
+
+START = datetime(2019, 1, 3, 12, 0, 0)
+
+
+def round_trip(samples):
+    chunk = MetricsChunk()
+    for i, sample in enumerate(samples):
+        chunk.append(START + timedelta(minutes=i), sample)
+    return [sample for _, sample in
+            MetricsChunk.decode(chunk.encode()).samples()]
+
+
+class ChunkKeyTest(unittest.TestCase):
+    def test_same_chunk(self):
+        key = chunk_key(START)
+        start, end = chunk_range(key)
+        self.assertEqual(end - start, timedelta(days=CHUNK_DAYS))
+        self.assertTrue(start <= START < end)
+        self.assertEqual(chunk_key(start), key)
+        self.assertEqual(chunk_key(end - timedelta(seconds=1)), key)
+
+    def test_boundary(self):
+        start, end = chunk_range(chunk_key(START))
+        self.assertNotEqual(chunk_key(end), chunk_key(start))
+        self.assertEqual(chunk_range(chunk_key(end))[0], end)
+        self.assertEqual(chunk_range(chunk_key(start - timedelta(seconds=1)))[1],
+                         start)
+
+    def test_expired(self):
+        key = chunk_key(START)
+        start, end = chunk_range(key)
+        # chunks are only dropped once all of their samples are too old
+        self.assertFalse(chunk_expired(key, start))
+        self.assertFalse(chunk_expired(key, end - timedelta(seconds=1)))
+        self.assertTrue(chunk_expired(key, end))
+        self.assertTrue(chunk_expired(key, end + timedelta(days=100)))
+
+
+class FlattenTest(unittest.TestCase):
+    def test_round_trip(self):
+        for value in [
+                {'a': 1, 'b': {'c': 'x', 'd': [1, 2, {'e': None}]}},
+                {'a': {}, 'b': [], 'c': [[1], [2, 3]]},
+                [{'a': 1}, {'b': 2}],
+                5,
+                'str',
+                {},
+        ]:
+            self.assertEqual(unflatten(flatten(value)), value)
+
+    def test_paths(self):
+        self.assertEqual(sorted(flatten({'a': [1, {'b': True}], 'c': {}})),
+                         [(('a', 0), 1), (('a', 1, 'b'), True), (('c',), {})])
+
+
+class PackIntsTest(unittest.TestCase):
+    def test_round_trip(self):
+        for values in [
+                [],
+                [0],
+                [1, 2, 3, 3, 3, 10],
+                [5, -5, 0, -(INT_LIMIT - 1), INT_LIMIT - 1, 0],
+        ]:
+            self.assertEqual(_unpack_ints(_pack_ints(values)), values)
+
+    def test_deltas(self):
+        # constant columns only hold zero deltas and compress well
+        packed = _pack_ints([1000] * 100)
+        self.assertEqual(_unpack_ints(packed), [1000] * 100)
+        self.assertEqual(struct.unpack('<100q', base64.b64decode(packed)),
+                         tuple([1000] + [0] * 99))
+
+
+class MetricsChunkTest(unittest.TestCase):
+    def test_mixed_values(self):
+        samples = [
+            {'int': 1, 'float': 1.5, 'str': 'a', 'bool': True, 'none': None,
+             'big': 2 ** 70, 'neg': -3, 'list': [1, 'x'], 'empty': {}},
+            {'int': 2, 'float': 1.5, 'str': 'b', 'bool': False, 'none': None,
+             'big': -2 ** 70, 'neg': -4, 'list': [2, 'x'], 'empty': {}},
+        ]
+        self.assertEqual(round_trip(samples), samples)
+
+    def test_types_are_kept(self):
+        samples = round_trip([{'a': True, 'b': 1, 'c': 1.0},
+                              {'a': 1, 'b': True, 'c': 1}])
+        for sample, expected in zip(samples, [(bool, int, float),
+                                              (int, bool, int)]):
+            self.assertEqual(tuple(type(sample[k]) for k in 'abc'),
+                             expected)
+
+    def test_missing_values(self):
+        samples = [
+            {'a': 1, 'b': 'x'},
+            {'a': 2},
+            {'b': 'y', 'c': 3},
+            {'a': 4, 'b': 'y', 'c': 3},
+        ]
+        self.assertEqual(round_trip(samples), samples)
+
+    def test_large_ints(self):
+        samples = [{'a': INT_LIMIT - 1}, {'a': INT_LIMIT}, {'a': 2 ** 64},
+                   {'a': -INT_LIMIT}, {'a': 1}]
+        self.assertEqual(round_trip(samples), samples)
+
+    def test_int_columns(self):
+        chunk = MetricsChunk()
+        for i in range(3):
+            chunk.append(START, {'a': i * 10, 'b': 'const'})
+        self.assertEqual(chunk.ints, {('a',): [0, 10, 20]})
+        # unchanged values are only stored once
+        self.assertEqual(chunk.changes, {('b',): [(0, 'const')]})
+
+    def test_demotion(self):
+        chunk = MetricsChunk()
+        chunk.append(START, {'a': 1})
+        chunk.append(START, {'a': 1})
+        chunk.append(START, {'a': 'x'})
+        chunk.append(START, {'b': 1})
+        chunk.append(START, {'a': 2})
+        self.assertEqual(chunk.ints, {})
+        self.assertEqual(chunk.changes[('a',)],
+                         [(0, 1), (2, 'x'), (3,), (4, 2)])
+        self.assertEqual([s for _, s in chunk.samples()],
+                         [{'a': 1}, {'a': 1}, {'a': 'x'}, {'b': 1}, {'a': 2}])
+
+    def test_new_path_is_not_an_int_column(self):
+        chunk = MetricsChunk()
+        chunk.append(START, {'a': 1})
+        chunk.append(START, {'a': 2, 'b': 3})
+        self.assertEqual(chunk.ints, {('a',): [1, 2]})
+        self.assertEqual(chunk.changes, {('b',): [(0,), (1, 3)]})
+
+    def test_encode_decode(self):
+        chunk = MetricsChunk()
+        for i in range(10):
+            chunk.append(START + timedelta(hours=i),
+                         {'a': i, 'b': {'c': [i % 2, 'x']}, 'd': i > 5})
+        decoded = MetricsChunk.decode(chunk.encode())
+        self.assertEqual(len(decoded), 10)
+        self.assertEqual(decoded.timestamps, chunk.timestamps)
+        self.assertEqual(decoded.ints, chunk.ints)
+        self.assertEqual(decoded.changes, chunk.changes)
+        self.assertEqual(list(decoded.samples()), list(chunk.samples()))
+
+    def test_decode_newer_version(self):
+        chunk = MetricsChunk()
+        chunk.append(START, {'a': 1})
+        doc = json.loads(zlib.decompress(chunk.encode()).decode('utf-8'))
+        doc['v'] = FORMAT_VERSION + 1
+        data = zlib.compress(json.dumps(doc).encode('utf-8'))
+        self.assertRaises(ValueError, MetricsChunk.decode, data)
+
+    def test_samples_range(self):
+        chunk = MetricsChunk()
+        times = [START + timedelta(hours=i) for i in range(5)]
+        for i, when in enumerate(times):
+            chunk.append(when, {'i': i})
+        self.assertEqual([when for when, _ in chunk.samples()], times)
+        # start is inclusive, end is exclusive
+        self.assertEqual([s['i'] for _, s in chunk.samples(times[1],
+                                                           times[3])],
+                         [1, 2])
+        self.assertEqual([s['i'] for _, s in chunk.samples(start=times[3])],
+                         [3, 4])
+        self.assertEqual([s['i'] for _, s in chunk.samples(end=times[1])],
+                         [0])
+        self.assertEqual(list(chunk.samples(times[4] + timedelta(1))), [])
+
+    def test_sub_second_timestamps(self):
+        chunk = MetricsChunk()
+        chunk.append(START + timedelta(microseconds=500), {'a': 1})
+        self.assertEqual([when for when, _ in chunk.samples()], [START])
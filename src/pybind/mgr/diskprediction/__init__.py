@@ -1,2 +1,5 @@
 from __future__ import absolute_import
-from .module import Module
+import os
+
+if 'UNITTEST' not in os.environ:
+    from .module import Module
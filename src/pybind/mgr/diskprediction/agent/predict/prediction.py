@@ -42,11 +42,21 @@ class PredictionAgent(BaseAgent):
     def _store_prediction_result(self, result):
         self._module_inst._prediction_result = result
 
-    def _parse_prediction_data(self, host_domain_id, disk_domain_id):
+    def _query_predictions(self, disk_domain_ids):
+        try:
+            return self._client.query_many(
+                '', disk_domain_ids, 'sai_disk_prediction')
+        except Exception as e:
+            self._logger.error(str(e))
+            return {}
+
+    def _parse_prediction_data(self, host_domain_id, disk_domain_id,
+                               query_info=None):
         result = {}
         try:
-            query_info = self._client.query_info(
-                host_domain_id, disk_domain_id, 'sai_disk_prediction')
+            if query_info is None:
+                query_info = self._client.query_info(
+                    host_domain_id, disk_domain_id, 'sai_disk_prediction')
             status_code = query_info.status_code
             if status_code == 200:
                 result = query_info.json()
@@ -79,6 +89,7 @@ class PredictionAgent(BaseAgent):
         cluster_id = obj_api.get_cluster_id()
 
         result = {}
+        osds_info = []
         osds = obj_api.get_osds()
         for osd in osds:
             osd_id = osd.get('osd')
@@ -92,7 +103,14 @@ class PredictionAgent(BaseAgent):
             osds_smart = obj_api.get_osd_smart(osd_id)
             if not osds_smart:
                 continue
+            osds_info.append((osd_id, osds_meta, osds_smart))
+
+        # predict all the disks at once, the disk domain id is the device
+        predictions = self._query_predictions(
+            list(set(dev_name for _, _, osds_smart in osds_info
+                     for dev_name in osds_smart)))
 
+        for osd_id, osds_meta, osds_smart in osds_info:
             hostname = osds_meta.get('hostname', 'None')
             host_domain_id = '%s_%s' % (cluster_id, hostname)
 
@@ -159,7 +177,8 @@ class PredictionAgent(BaseAgent):
                     'sector_size': tmp['sector_size'],
                     'size': str(user_capacity),
                     'prediction': self._parse_prediction_data(
-                        host_domain_id, tmp['disk_domain_id'])
+                        host_domain_id, tmp['disk_domain_id'],
+                        predictions.get(tmp['disk_domain_id']))
                 }
                 # Update osd life-expectancy
                 predicted = None
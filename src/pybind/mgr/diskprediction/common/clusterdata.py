@@ -295,13 +295,13 @@ class ClusterAPI(object):
         return self.module.get_metadata('mgr', mgr_id)
 
     def get_osd_epoch(self):
-        return self.module.get('osd_map').get('epoch', 0)
+        return self.module.get_snapshot('osd_map').get('epoch', 0)
 
     def get_osds(self):
         return self.module.get('osd_map').get('osds', [])
 
     def get_max_osd(self):
-        return self.module.get('osd_map').get('max_osd', '')
+        return self.module.get_snapshot('osd_map').get('max_osd', '')
 
     def get_osd_pools(self):
         return self.module.get('osd_map').get('pools', [])
@@ -371,6 +371,17 @@ class ClusterAPI(object):
         return osd_smart
 
     def get_device_health(self, device_id):
+        # devicehealth knows how its metrics are stored, columnar or not
+        try:
+            return self.module.remote('devicehealth', 'get_device_metrics',
+                                      device_id)
+        except (ImportError, NameError):
+            pass
+        except Exception as e:
+            self.module.log.error(
+                'unable to get device {} health, {}'.format(device_id, str(e)))
+            return {}
+
         res = {}
         try:
             with self._open_connection() as ioctx:
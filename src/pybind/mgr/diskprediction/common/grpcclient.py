@@ -196,6 +196,12 @@ class GRPcClient:
                 'failed to send info exception: {}'.format(resp.content))
         return resp
 
+    def query_many(self, host_domain_id, disk_domain_ids, measurement):
+        return dict((disk_domain_id,
+                     self.query_info(host_domain_id, disk_domain_id,
+                                     measurement))
+                    for disk_domain_id in disk_domain_ids)
+
     def query_info(self, host_domain_id, disk_domain_id, measurement):
         resp = DummyResonse()
         try:
@@ -66,55 +66,79 @@ class LocalPredictor:
         resp.content = ''
         return resp
 
-    def _local_predict(self, smart_datas):
+    def _local_predict_many(self, disks):
         obj_predictor = DiskFailurePredictor()
         predictor_path = get_diskfailurepredictor_path()
         models_path = "{}/models".format(predictor_path)
         obj_predictor.initialize(models_path)
-        return obj_predictor.predict(smart_datas)
+        return obj_predictor.predict_many(disks)
 
-    def query_info(self, host_domain_id, disk_domain_id, measurement):
+    @staticmethod
+    def _get_predict_datas(smart_datas):
         predict_datas = list()
-        obj_api = ClusterAPI(self.mgr_inst)
-        predicted_result = 'Unknown'
-        smart_datas = obj_api.get_device_health(disk_domain_id)
-        if len(smart_datas) >= 6:
-            o_keys = sorted(smart_datas.iterkeys(), reverse=True)
-            for o_key in o_keys:
-                dev_smart = {}
-                s_val = smart_datas[o_key]
-                ata_smart = s_val.get('ata_smart_attributes', {})
-                for attr in ata_smart.get('table', []):
-                    if attr.get('raw', {}).get('string'):
-                        if str(attr.get('raw', {}).get('string', '0')).isdigit():
+        o_keys = sorted(smart_datas.iterkeys(), reverse=True)
+        for o_key in o_keys:
+            dev_smart = {}
+            s_val = smart_datas[o_key]
+            ata_smart = s_val.get('ata_smart_attributes', {})
+            for attr in ata_smart.get('table', []):
+                if attr.get('raw', {}).get('string'):
+                    if str(attr.get('raw', {}).get('string', '0')).isdigit():
+                        dev_smart['smart_%s_raw' % attr.get('id')] = \
+                            int(attr.get('raw', {}).get('string', '0'))
+                    else:
+                        if str(attr.get('raw', {}).get('string', '0')).split(' ')[0].isdigit():
                             dev_smart['smart_%s_raw' % attr.get('id')] = \
-                                int(attr.get('raw', {}).get('string', '0'))
+                                int(attr.get('raw', {}).get('string',
+                                                            '0').split(' ')[0])
                         else:
-                            if str(attr.get('raw', {}).get('string', '0')).split(' ')[0].isdigit():
-                                dev_smart['smart_%s_raw' % attr.get('id')] = \
-                                    int(attr.get('raw', {}).get('string',
-                                                                '0').split(' ')[0])
-                            else:
-                                dev_smart['smart_%s_raw' % attr.get('id')] = \
-                                    attr.get('raw', {}).get('value', 0)
-                if s_val.get('power_on_time', {}).get('hours') is not None:
-                    dev_smart['smart_9_raw'] = int(s_val['power_on_time']['hours'])
-                if dev_smart:
-                    predict_datas.append(dev_smart)
-
-            if predict_datas:
-                predicted_result = self._local_predict(predict_datas)
+                            dev_smart['smart_%s_raw' % attr.get('id')] = \
+                                attr.get('raw', {}).get('value', 0)
+            if s_val.get('power_on_time', {}).get('hours') is not None:
+                dev_smart['smart_9_raw'] = int(s_val['power_on_time']['hours'])
+            if dev_smart:
+                predict_datas.append(dev_smart)
+        return predict_datas
+
+    def query_info(self, host_domain_id, disk_domain_id, measurement):
+        return self.query_many(
+            host_domain_id, [disk_domain_id], measurement)[disk_domain_id]
+
+    def query_many(self, host_domain_id, disk_domain_ids, measurement):
+        """
+        Predict several disks at once, running every model a single time
+        over all the disks it is selected for.
+
+        :return: a dict mapping the disk domain ids to their response
+        """
+        obj_api = ClusterAPI(self.mgr_inst)
+        result = {}
+        disks = {}
+        for disk_domain_id in disk_domain_ids:
+            smart_datas = obj_api.get_device_health(disk_domain_id)
+            if len(smart_datas) >= 6:
+                predict_datas = self._get_predict_datas(smart_datas)
+                if predict_datas:
+                    disks[disk_domain_id] = predict_datas
+            else:
+                resp = DummyResonse()
+                resp.status_code = 400
+                resp.content = '\'predict\' need least 6 pieces disk smart data'
+                resp.resp_json = \
+                    {'error': '\'predict\' need least 6 pieces disk smart data'}
+                result[disk_domain_id] = resp
+
+        predicted_results = self._local_predict_many(disks) if disks else {}
+        predicted = int(time.time() * (1000 ** 3))
+        for disk_domain_id in disk_domain_ids:
+            if disk_domain_id in result:
+                continue
             resp = DummyResonse()
             resp.status_code = 200
             resp.resp_json = {
                 "disk_domain_id": disk_domain_id,
-                "near_failure": predicted_result,
-                "predicted": int(time.time() * (1000 ** 3))}
-            return resp
-        else:
-            resp = DummyResonse()
-            resp.status_code = 400
-            resp.content = '\'predict\' need least 6 pieces disk smart data'
-            resp.resp_json = \
-                {'error': '\'predict\' need least 6 pieces disk smart data'}
-        return resp
+                "near_failure": predicted_results.get(disk_domain_id,
+                                                      'Unknown'),
+                "predicted": predicted}
+            result[disk_domain_id] = resp
+        return result
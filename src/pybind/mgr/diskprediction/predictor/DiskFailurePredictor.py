@@ -16,6 +16,12 @@ An example code is as follows:
 >>>     model.predict(disk_days)
 'Bad'
 
+Several disks can be predicted at once with predict_many(), which runs each
+model once over all the disks it was selected for:
+
+>>> model.predict_many({'sda': sda_days, 'sdb': sdb_days})
+{'sda': 'Good', 'sdb': 'Bad'}
+
 
 Provided by ProphetStor Data Services Inc.
 http://www.prophetstor.com/
@@ -25,6 +31,7 @@ http://www.prophetstor.com/
 from __future__ import print_function
 import os
 import json
+import threading
 from sklearn.externals import joblib
 
 
@@ -34,6 +41,59 @@ def get_diskfailurepredictor_path():
     return dir_path
 
 
+class ModelRegistry(object):
+    """Process-wide cache of model configurations and models
+
+    Every configuration file and model is loaded from disk the first time it
+    is needed, and shared by all the predictor instances from then on.
+    """
+
+    _lock = threading.Lock()
+    _contexts = {}
+    _models = {}
+
+    @classmethod
+    def get_context(cls, config_path):
+        """
+        Get the model configuration stored in a config file.
+
+        Args:
+            config_path: Path of the config file.
+
+        Returns:
+            A dictionary mapping model names to their attribute lists.
+
+        Raises:
+            Exceptions of wrong file operations.
+        """
+
+        with cls._lock:
+            if config_path not in cls._contexts:
+                with open(config_path) as f_conf:
+                    cls._contexts[config_path] = json.load(f_conf)
+            return cls._contexts[config_path]
+
+    @classmethod
+    def get_model(cls, model_path):
+        """
+        Get a model, loading it on first use.
+
+        Args:
+            model_path: Path of the model file.
+
+        Returns:
+            The model.
+
+        Raises:
+            Exceptions of wrong file operations.
+        """
+
+        with cls._lock:
+            if model_path not in cls._models:
+                cls._models[model_path] = joblib.load(model_path)
+            return cls._models[model_path]
+
+
 class DiskFailurePredictor(object):
     """Disk failure prediction
 
@@ -67,8 +127,7 @@ class DiskFailurePredictor(object):
         if not os.path.isfile(config_path):
             return "Missing config file: " + config_path
         else:
-            with open(config_path) as f_conf:
-                self.model_context = json.load(f_conf)
+            self.model_context = ModelRegistry.get_context(config_path)
 
         for model_name in self.model_context:
             model_path = os.path.join(model_dirpath, model_name)
@@ -230,28 +289,66 @@ class DiskFailurePredictor(object):
         Raises: None
         """
 
-        all_pred = []
+        return self.predict_many({None: disk_days})[None]
+
+    def predict_many(self, disks):
+        """
+        Predict several disks at once.
 
-        proc_disk_days = self.__preprocess(disk_days)
-        attr_list, diff_data = DiskFailurePredictor.__get_diff_attrs(proc_disk_days)
-        modellist = self.__get_best_models(attr_list)
-        if modellist is None:
-            return "Unknown"
+        Disks are grouped by the models selected for them, and each model
+        predicts all of its disks in a single call.
 
-        for modelpath in modellist:
-            model_attrlist = modellist[modelpath]
-            ordered_data = DiskFailurePredictor.__get_ordered_attrs(
-                diff_data, model_attrlist)
+        Args:
+            disks: A dictionary mapping disk names to their disk days, as
+                   passed to predict(...).
 
-            clf = joblib.load(modelpath)
-            pred = clf.predict(ordered_data)
+        Returns:
+            A dictionary mapping disk names to their prediction result, as
+            returned by predict(...).
 
-            all_pred.append(1 if any(pred) else 0)
+        Raises: None
+        """
 
-        score = 2 ** sum(all_pred) - len(modellist)
-        if score > 10:
-            return "Bad"
-        elif score > 4:
-            return "Warning"
-        else:
-            return "Good"
+        results = {}
+        # model path -> list of (disk name, first row, number of rows)
+        model_disks = {}
+        # model path -> rows of all the disks the model was selected for
+        model_rows = {}
+        disk_models = {}
+
+        for name, disk_days in disks.items():
+            proc_disk_days = self.__preprocess(disk_days)
+            attr_list, diff_data = DiskFailurePredictor.__get_diff_attrs(
+                proc_disk_days)
+            modellist = self.__get_best_models(attr_list)
+            if modellist is None:
+                results[name] = "Unknown"
+                continue
+
+            disk_models[name] = modellist
+            for modelpath in modellist:
+                ordered_data = DiskFailurePredictor.__get_ordered_attrs(
+                    diff_data, modellist[modelpath])
+                rows = model_rows.setdefault(modelpath, [])
+                model_disks.setdefault(modelpath, []).append(
+                    (name, len(rows), len(ordered_data)))
+                rows.extend(ordered_data)
+
+        all_pred = dict((name, []) for name in disk_models)
+        for modelpath, rows in model_rows.items():
+            clf = ModelRegistry.get_model(modelpath)
+            pred = clf.predict(rows)
+            for name, first, count in model_disks[modelpath]:
+                all_pred[name].append(
+                    1 if any(pred[first:first + count]) else 0)
+
+        for name, modellist in disk_models.items():
+            score = 2 ** sum(all_pred[name]) - len(modellist)
+            if score > 10:
+                results[name] = "Bad"
+            elif score > 4:
+                results[name] = "Warning"
+            else:
+                results[name] = "Good"
+
+        return results
@@ -33,6 +33,9 @@ def generate_sender_mock():
     query_value.status_code = 200
     query_value.resp_json = TEMP_RESPONSE
     sender_mock.query_info.return_value = query_value
+    sender_mock.query_many.side_effect = \
+        lambda host_domain_id, disk_domain_ids, measurement: dict(
+            (disk_domain_id, query_value) for disk_domain_id in disk_domain_ids)
     return sender
 
 
@@ -0,0 +1,127 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+from __future__ import absolute_import
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+import mock
+
+# the models are stubbed, only their loader needs to be importable
+try:
+    import sklearn.externals.joblib  # noqa: F401 pylint: disable=unused-import
+except ImportError:
+    for name in ('sklearn', 'sklearn.externals', 'sklearn.externals.joblib'):
+        sys.modules[name] = types.ModuleType(name)
+    sys.modules['sklearn'].externals = sys.modules['sklearn.externals']
+    sys.modules['sklearn.externals'].joblib = \
+        sys.modules['sklearn.externals.joblib']
+
+from ..predictor.DiskFailurePredictor import DiskFailurePredictor, ModelRegistry  # noqa: E402 pylint: disable=wrong-import-position
+
+
+# model name -> ordered attribute list
+MODELS = {
+    'svm_1.joblib': ['smart_5_raw', 'smart_187_raw', 'smart_197_raw'],
+    'svm_2.joblib': ['smart_5_raw', 'smart_197_raw', 'smart_198_raw',
+                     'smart_1_raw'],
+    'svm_3.joblib': ['smart_187_raw', 'smart_198_raw', 'smart_7_raw'],
+    'svm_4.joblib': ['smart_1_raw', 'smart_5_raw', 'smart_7_raw',
+                     'smart_197_raw'],
+    'svm_5.joblib': ['smart_3_raw', 'smart_4_raw', 'smart_12_raw'],
+}
+
+
+class StubModel(object):
+    """
+    Predicts a failure for the rows whose attribute at `index` grew by more
+    than `threshold` in a day.
+    """
+
+    def __init__(self, index, threshold):
+        self.index = index
+        self.threshold = threshold
+        self.calls = 0
+
+    def predict(self, rows):
+        self.calls += 1
+        return [1 if row[self.index] > self.threshold else 0 for row in rows]
+
+
+def disk_days(rand, attrs):
+    days = []
+    values = dict((attr, rand.randrange(100)) for attr in attrs)
+    for _ in range(6):
+        days.append(dict((attr, str(value))
+                         for attr, value in values.items()))
+        for attr in attrs:
+            values[attr] += rand.choice([0, 0, 1, 5, 20])
+    return days
+
+
+class PredictManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.model_dir, 'config.json'), 'w') as f:
+            json.dump(MODELS, f)
+        self.models = {}
+        for i, name in enumerate(sorted(MODELS)):
+            open(os.path.join(self.model_dir, name), 'w').close()
+            self.models[os.path.join(self.model_dir, name)] = \
+                StubModel(i % 3, 3 + i)
+        patcher = mock.patch.object(ModelRegistry, 'get_model',
+                                    side_effect=self.models.__getitem__)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.model_dir)
+
+        self.predictor = DiskFailurePredictor()
+        self.assertIsNone(self.predictor.initialize(self.model_dir))
+
+    def disks(self, seed):
+        rand = random.Random(seed)
+        attrs = sorted(set(a for attrs in MODELS.values() for a in attrs))
+        disks = {}
+        for i in range(20):
+            disks['sd%d' % i] = disk_days(
+                rand, rand.sample(attrs, rand.randrange(3, len(attrs))))
+        # too few attributes known by any model
+        disks['few'] = disk_days(rand, ['smart_5_raw', 'smart_187_raw',
+                                        'smart_9_raw'])
+        # the negative, i.e. invalid, values are left out
+        disks['invalid'] = disk_days(rand, ['smart_5_raw', 'smart_187_raw',
+                                            'smart_197_raw'])
+        for day in disks['invalid']:
+            day['smart_197_raw'] = '-1'
+        return disks
+
+    def test_same_as_one_disk_at_a_time(self):
+        for seed in range(5):
+            disks = self.disks(seed)
+            expected = dict((name, self.predictor.predict(days))
+                            for name, days in disks.items())
+            self.assertEqual(self.predictor.predict_many(disks), expected)
+            self.assertEqual(expected['few'], 'Unknown')
+            self.assertEqual(expected['invalid'], 'Unknown')
+            self.assertGreater(len(set(expected.values())), 2)
+
+    def test_each_model_predicts_once(self):
+        disks = self.disks(0)
+        results = self.predictor.predict_many(disks)
+        self.assertEqual(sorted(results), sorted(disks))
+        for model in self.models.values():
+            self.assertLessEqual(model.calls, 1)
+        self.assertTrue(any(model.calls for model in self.models.values()))
+
+    def test_only_unknown(self):
+        disks = self.disks(0)
+        disks = {'few': disks['few']}
+        self.assertEqual(self.predictor.predict_many(disks),
+                         {'few': 'Unknown'})
+        self.assertEqual(self.predictor.predict_many({}), {})
@@ -9,7 +9,7 @@ import errno
 import six
 import time
 
-from mgr_module import MgrModule
+from mgr_module import MgrModule, DaemonMetadataCache
 
 try:
     from influxdb import InfluxDBClient
@@ -60,9 +60,17 @@ class Module(MgrModule):
             {
                 'name': 'batch_size',
                 'default': 5000
+            },
+            {
+                'name': 'gzip',
+                'default': 'true'
             }
     ]
 
+    # options which require new connections to the InfluxDB server
+    CONNECTION_OPTIONS = ['hostname', 'port', 'database', 'username',
+                          'password', 'ssl', 'verify_ssl', 'gzip']
+
     @property
     def config_keys(self):
         return dict((o['name'], o.get('default', None))
@@ -95,9 +103,17 @@ class Module(MgrModule):
         self.workers = list()
         self.queue = queue.Queue(maxsize=100)
         self.health_checks = dict()
+        # bumped when the connection settings change, so that the queue
+        # workers replace their long-lived clients
+        self.client_generation = 0
+        self.database_verified = False
+        self.metadata_cache = DaemonMetadataCache(self)
 
     def get_fsid(self):
-        return self.get('mon_map')['fsid']
+        return self.metadata_cache.get_fsid()
+
+    def notify(self, notify_type, notify_id):
+        self.metadata_cache.notify(notify_type, notify_id)
 
     @staticmethod
     def can_run():
@@ -122,6 +138,10 @@ class Module(MgrModule):
             yield xs
 
     def queue_worker(self):
+        # every worker keeps its own client (and thereby HTTP connection)
+        # for as long as it works, instead of connecting for every chunk
+        client = None
+        generation = None
         while True:
             try:
                 points = self.queue.get()
@@ -130,9 +150,11 @@ class Module(MgrModule):
                     break
 
                 start = time.time()
-                client = self.get_influx_client()
+                if client is None or generation != self.client_generation:
+                    client = self.close_influx_client(client)
+                    generation = self.client_generation
+                    client = self.get_influx_client()
                 client.write_points(points, time_precision='ms')
-                client.close()
                 runtime = time.time() - start
                 self.log.debug('Writing points %d to Influx took %.3f seconds',
                                len(points), runtime)
@@ -149,6 +171,8 @@ class Module(MgrModule):
                         'detail': [str(e)]
                     }
                 })
+                # the connection is likely broken, open a new one next time
+                client = self.close_influx_client(client)
             except InfluxDBClientError as e:
                 self.health_checks.update({
                     'MGR_INFLUX_SEND_FAILED': {
@@ -162,9 +186,20 @@ class Module(MgrModule):
                 continue
             except:
                 self.log.exception('Unhandled Exception while sending to Influx')
+                client = self.close_influx_client(client)
             finally:
                 self.queue.task_done()
 
+        self.close_influx_client(client)
+
+    def close_influx_client(self, client):
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                self.log.exception('Failed to close InfluxDB client')
+        return None
+
     def get_latest(self, daemon_type, daemon_name, stat):
         data = self.get_counter(daemon_type, daemon_name, stat)[stat]
         if data:
@@ -192,6 +227,7 @@ class Module(MgrModule):
             'quota_bytes'
         ]
         
+        fsid = self.get_fsid()
         for df_type in df_types:
             for pool in df['pools']:
                 point = {
@@ -200,7 +236,7 @@ class Module(MgrModule):
                         "pool_name": pool['name'],
                         "pool_id": pool['id'],
                         "type_instance": df_type,
-                        "fsid": self.get_fsid()
+                        "fsid": fsid
                     },
                     "time": now,
                     "fields": {
@@ -215,7 +251,7 @@ class Module(MgrModule):
         pg_sum = self.get('pg_summary')
         osd_sum = pg_sum['by_osd']
         for osd_id, stats in six.iteritems(osd_sum):
-            metadata = self.get_metadata('osd', "%s" % osd_id)
+            metadata = self.metadata_cache.get_metadata('osd', "%s" % osd_id)
             if not metadata:
                 continue
 
@@ -253,25 +289,20 @@ class Module(MgrModule):
     def get_daemon_stats(self, now):
         for daemon, counters in six.iteritems(self.get_all_perf_counters()):
             svc_type, svc_id = daemon.split(".", 1)
-            metadata = self.get_metadata(svc_type, svc_id)
+            daemon_tags = self.metadata_cache.get_daemon_tags(svc_type, svc_id)
+            if daemon_tags is None:
+                continue
 
-            for path, counter_info in counters.items():
+            for path, counter_info in six.iteritems(counters):
                 if counter_info['type'] & self.PERFCOUNTER_HISTOGRAM:
                     continue
 
-                value = counter_info['value']
-
                 yield {
                     "measurement": "ceph_daemon_stats",
-                    "tags": {
-                        "ceph_daemon": daemon,
-                        "type_instance": path,
-                        "host": metadata['hostname'],
-                        "fsid": self.get_fsid()
-                    },
+                    "tags": dict(daemon_tags, type_instance=path),
                     "time": now,
                     "fields": {
-                        "value": value
+                        "value": counter_info['value']
                     }
                 }
 
@@ -290,15 +321,19 @@ class Module(MgrModule):
         if option == 'interval' and value < 5:
             raise RuntimeError('interval should be set to at least 5 seconds')
 
-        if option in ['ssl', 'verify_ssl']:
+        if option in ['ssl', 'verify_ssl', 'gzip']:
             value = value.lower() == 'true'
 
         if option == 'threads':
-            if 1 > value > 32:
+            if not 1 <= value <= 32:
                 raise RuntimeError('threads should be in range 1-32')
 
         self.config[option] = value
 
+        if option in self.CONNECTION_OPTIONS:
+            self.client_generation += 1
+            self.database_verified = False
+
     def init_module_config(self):
         self.config['hostname'] = \
             self.get_config("hostname", default=self.config_keys['hostname'])
@@ -324,6 +359,8 @@ class Module(MgrModule):
         verify_ssl = \
             self.get_config("verify_ssl", default=self.config_keys['verify_ssl'])
         self.config['verify_ssl'] = verify_ssl.lower() == 'true'
+        gzip = self.get_config("gzip", default=self.config_keys['gzip'])
+        self.config['gzip'] = gzip.lower() == 'true'
 
     def gather_statistics(self):
         now = self.get_timestamp()
@@ -333,13 +370,40 @@ class Module(MgrModule):
                      self.get_pg_summary_pool(pools, now))
 
     def get_influx_client(self):
-        return InfluxDBClient(self.config['hostname'],
-                                     self.config['port'],
-                                     self.config['username'],
-                                     self.config['password'],
-                              self.config['database'],
-                                     self.config['ssl'],
-                                     self.config['verify_ssl'])
+        args = (self.config['hostname'],
+                self.config['port'],
+                self.config['username'],
+                self.config['password'],
+                self.config['database'],
+                self.config['ssl'],
+                self.config['verify_ssl'])
+        if self.config['gzip']:
+            try:
+                return InfluxDBClient(*args, gzip=True)
+            except TypeError:
+                # influxdb < 5.2.1 can't compress requests
+                self.log.warning('influxdb python module does not support '
+                                 'gzip, sending uncompressed data')
+        return InfluxDBClient(*args)
+
+    def verify_influx_database(self):
+        client = self.get_influx_client()
+        try:
+            databases = client.get_list_database()
+            if {'name': self.config['database']} not in databases:
+                self.log.info("Database '%s' not found, trying to create "
+                              "(requires admin privs). You can also create "
+                              "manually and grant write privs to user "
+                              "'%s'", self.config['database'],
+                              self.config['database'])
+                client.create_database(self.config['database'])
+                client.create_retention_policy(name='8_weeks',
+                                               duration='8w',
+                                               replication='1',
+                                               default=True,
+                                               database=self.config['database'])
+        finally:
+            client.close()
 
     def send_to_influx(self):
         if not self.config['hostname']:
@@ -360,21 +424,11 @@ class Module(MgrModule):
         self.log.debug("Sending data to Influx host: %s",
                        self.config['hostname'])
         try:
-            client = self.get_influx_client()
-            databases = client.get_list_database()
-            if {'name': self.config['database']} not in databases:
-                self.log.info("Database '%s' not found, trying to create "
-                              "(requires admin privs). You can also create "
-                              "manually and grant write privs to user "
-                              "'%s'", self.config['database'],
-                              self.config['database'])
-                client.create_database(self.config['database'])
-                client.create_retention_policy(name='8_weeks',
-                                               duration='8w',
-                                               replication='1',
-                                               default=True,
-                                               database=self.config['database'])
-            client.close()
+            # the database only needs to be looked up (and possibly
+            # created) once per set of connection settings
+            if not self.database_verified:
+                self.verify_influx_database()
+                self.database_verified = True
 
             self.log.debug('Gathering statistics')
             points = self.gather_statistics()
@@ -159,6 +159,14 @@ class OSDMapIncremental(ceph_module.BasePyOSDMapIncremental):
         """
         return self._set_crush_compat_weight_set_weights(weightmap)
 
+    def merge_pg_upmaps(self, other):
+        """
+        Add the pg_upmap and pg_upmap_items changes of another
+        OSDMapIncremental (e.g. computed for a disjoint set of pools)
+        to this one.
+        """
+        return self._merge_pg_upmaps(other)
+
 class CRUSHMap(ceph_module.BasePyCRUSH):
     ITEM_NONE = 0x7fffffff
     DEFAULT_CHOOSE_ARGS = '-1'
@@ -188,6 +196,133 @@ class CRUSHMap(ceph_module.BasePyCRUSH):
         return dump.get('choose_args').get(CRUSHMap.DEFAULT_CHOOSE_ARGS, [])
 
 
+class ReadOnlyDict(dict):
+    """
+    A dict which refuses to be modified, used for the cluster map snapshots
+    that ``MgrModule.get_snapshot`` shares between all its callers.
+    """
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('cluster map snapshots are read-only, copy them '
+                        'before modifying')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def freeze(obj):
+    """
+    Return a read-only copy of a structure returned by ``MgrModule.get``:
+    dicts become ``ReadOnlyDict`` and lists become tuples.
+    """
+    if isinstance(obj, dict):
+        return ReadOnlyDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def thaw(obj):
+    """
+    Return a modifiable deep copy of a structure returned by ``freeze``.
+    """
+    if isinstance(obj, dict):
+        return dict((k, thaw(v)) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return [thaw(v) for v in obj]
+    return obj
+
+
+class DaemonMetadataCache(object):
+    """
+    Memoize daemon metadata and the cluster fsid for modules which export
+    a sample per perf counter, and so would otherwise look them up once for
+    every counter of every daemon.
+
+    The owning module must pass its notifications on to ``notify``, which
+    drops entries that may have gone stale: everything when the cluster maps
+    change, and a single daemon when it (re)declares its perf counters,
+    which it does when it restarts.
+    """
+    INVALIDATING_NOTIFY_TYPES = ('mon_map', 'osd_map', 'fs_map',
+                                 'service_map')
+
+    def __init__(self, module):
+        self._module = module
+        self._lock = threading.Lock()
+        self._fsid = None
+        # "type.id" -> metadata dict (or None if the mgr has none yet)
+        self._metadata = {}
+        # "type.id" -> tags shared by all samples of a daemon
+        self._tags = {}
+
+    def notify(self, notify_type, notify_id):
+        if notify_type in self.INVALIDATING_NOTIFY_TYPES:
+            self.clear()
+        elif notify_type == 'perf_schema_update':
+            with self._lock:
+                self._metadata.pop(notify_id, None)
+                self._tags.pop(notify_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._fsid = None
+            self._metadata.clear()
+            self._tags.clear()
+
+    def get_fsid(self):
+        fsid = self._fsid
+        if fsid is None:
+            fsid = self._module.get('mon_map')['fsid']
+            self._fsid = fsid
+        return fsid
+
+    def get_metadata(self, svc_type, svc_id):
+        """
+        Like ``MgrModule.get_metadata``, but a missing result is not cached
+        so that it is looked up again once the mgr received it.
+        """
+        key = '{0}.{1}'.format(svc_type, svc_id)
+        with self._lock:
+            metadata = self._metadata.get(key)
+        if metadata is None:
+            metadata = self._module.get_metadata(svc_type, svc_id)
+            if metadata is not None:
+                with self._lock:
+                    self._metadata[key] = metadata
+        return metadata
+
+    def get_daemon_tags(self, svc_type, svc_id):
+        """
+        Return the ``ceph_daemon``, ``host`` and ``fsid`` tags of a daemon,
+        or None if its metadata is not available (yet).  The returned dict
+        is shared, copy it before adding per-sample tags.
+        """
+        key = '{0}.{1}'.format(svc_type, svc_id)
+        with self._lock:
+            tags = self._tags.get(key)
+        if tags is None:
+            metadata = self.get_metadata(svc_type, svc_id)
+            if metadata is None:
+                return None
+            tags = {
+                'ceph_daemon': key,
+                'host': metadata['hostname'],
+                'fsid': self.get_fsid()
+            }
+            with self._lock:
+                self._tags[key] = tags
+        return tags
+
+
 class MgrStandbyModule(ceph_module.BaseMgrStandbyModule):
     """
     Standby modules only implement a serve and shutdown method, they
@@ -279,7 +414,27 @@ class MgrModule(ceph_module.BaseMgrModule):
     # units supported
     BYTES = 0
     NONE = 1
-    
+
+    # The maps the result of get(data_name) is derived from, see
+    # get_snapshot(). "pg_map" stands for the PG statistics, whose version
+    # is bumped whenever the mgr has received new stats.
+    SNAPSHOT_EPOCHS = {
+        'osd_map': ('osd_map',),
+        'osd_map_tree': ('osd_map',),
+        'osd_map_crush': ('osd_map',),
+        'osdmap_crush_map_text': ('osd_map',),
+        'mon_map': ('mon_map',),
+        'fs_map': ('fs_map',),
+        'service_map': ('service_map',),
+        'pg_summary': ('pg_map',),
+        'pg_status': ('pg_map',),
+        'pg_dump': ('pg_map',),
+        'io_rate': ('pg_map',),
+        'osd_stats': ('pg_map',),
+        'df': ('pg_map', 'osd_map'),
+        'osd_pool_stats': ('pg_map', 'osd_map'),
+    }
+
     def __init__(self, module_name, py_modules_ptr, this_ptr):
         self.module_name = module_name
 
@@ -292,7 +447,14 @@ class MgrModule(ceph_module.BaseMgrModule):
 
         self._version = self._ceph_get_version()
 
-        self._perf_schema_cache = None
+        # daemon name -> (counters generation, perf schema)
+        self._perf_schema_cache = {}
+
+        # data name -> (map epochs, frozen result), see get_snapshot()
+        self._snapshots = {}
+        # index name -> (snapshot it was built from, index)
+        self._snapshot_indexes = {}
+        self._snapshot_lock = threading.Lock()
 
         # Keep a librados instance for those that need it.
         self._rados = None
@@ -357,7 +519,7 @@ class MgrModule(ceph_module.BaseMgrModule):
         :param str data_name: Valid things to fetch are osd_crush_map_text, 
                 osd_map, osd_map_tree, osd_map_crush, config, mon_map, fs_map,
                 osd_metadata, pg_summary, io_rate, pg_dump, df, osd_stats,
-                health, mon_status, devices, device <devid>.
+                health, mon_status, devices, device <devid>, map_epochs.
 
         Note:
             All these structures have their own JSON representations: experiment
@@ -365,6 +527,85 @@ class MgrModule(ceph_module.BaseMgrModule):
         """
         return self._ceph_get(data_name)
 
+    def get_snapshot(self, data_name):
+        """
+        Like ``get``, but the result is cached until one of the maps it is
+        derived from changes, and is shared by all callers in this module.
+        Checking whether the cache is still valid only fetches the map
+        epochs, so this is much cheaper than ``get`` for the big
+        structures like ``osd_map`` or ``pg_dump``.
+
+        The returned structure is read-only: its dicts raise ``TypeError``
+        when modified and its lists are tuples. Use ``thaw``, ``copy.copy``
+        or ``copy.deepcopy`` to get a modifiable copy.
+
+        :param str data_name: one of the keys of ``SNAPSHOT_EPOCHS``, other
+            names are passed to ``get`` and the result is frozen, but not
+            cached.
+        """
+        dependencies = self.SNAPSHOT_EPOCHS.get(data_name)
+        if dependencies is None:
+            return freeze(self.get(data_name))
+
+        # Fetch the epochs before the data: if a map changes in between,
+        # the snapshot is stored with the old epoch and refreshed next time.
+        epochs = self._ceph_get('map_epochs')
+        key = tuple(epochs[d] for d in dependencies)
+        with self._snapshot_lock:
+            cached = self._snapshots.get(data_name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        snapshot = freeze(self.get(data_name))
+        with self._snapshot_lock:
+            self._snapshots[data_name] = (key, snapshot)
+        return snapshot
+
+    def _get_snapshot_index(self, index_name, data_name, build):
+        snapshot = self.get_snapshot(data_name)
+        with self._snapshot_lock:
+            cached = self._snapshot_indexes.get(index_name)
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+
+        index = ReadOnlyDict(build(snapshot))
+        with self._snapshot_lock:
+            self._snapshot_indexes[index_name] = (snapshot, index)
+        return index
+
+    def get_pool_names(self):
+        """
+        :return: a read-only dict of pool id to pool name, shared until the
+            OSDMap changes
+        """
+        return self._get_snapshot_index(
+            'pool_names', 'osd_map',
+            lambda osd_map: ((p['pool'], p['pool_name'])
+                             for p in osd_map['pools']))
+
+    def get_pool_ids(self):
+        """
+        :return: a read-only dict of pool name to pool id, shared until the
+            OSDMap changes
+        """
+        return self._get_snapshot_index(
+            'pool_ids', 'osd_map',
+            lambda osd_map: ((p['pool_name'], p['pool'])
+                             for p in osd_map['pools']))
+
+    def get_osd_hosts(self):
+        """
+        :return: a read-only dict of OSD id to the name of the CRUSH host
+            bucket it is in, shared until the OSDMap changes
+        """
+        def build(tree):
+            for node in tree['nodes']:
+                if node['type'] == 'host':
+                    for child in node.get('children', ()):
+                        yield child, node['name']
+
+        return self._get_snapshot_index('osd_hosts', 'osd_map_tree', build)
+
     def _stattype_to_str(self, stattype):
         
         typeonly = stattype & self.PERFCOUNTER_TYPE_MASK
@@ -483,6 +724,33 @@ class MgrModule(ceph_module.BaseMgrModule):
         """
         return self._ceph_get_counter(svc_type, svc_name, path)
 
+    def get_counters(self, svc_type, paths):
+        """
+        Like ``get_counter``, but fetches several counters of all the
+        daemons of one type in a single call.
+
+        :param str svc_type: daemon type, for example "osd".
+        :param list[str] paths: the counter paths, for example
+            ["osd.op_w", "osd.op_r"].
+        :return: A dict mapping daemon ids to dicts of counter paths to
+            lists of (timestamp, value) two-tuples. Daemons which do not
+            have a counter get an empty list for it.
+        """
+        return self._ceph_get_counters(svc_type, list(paths))
+
+    def get_pg_recovery_stats(self, pgids):
+        """
+        Fetches what recovery progress is computed from for some PGs,
+        without dumping the whole PG map.
+
+        :param list[str] pgids: the PG ids, for example ["1.0", "2.1f"].
+        :return: A dict mapping the PG ids to dicts of the PG's ``state``,
+            ``up``, ``acting``, ``num_bytes`` and ``num_bytes_recovered``,
+            among the other fields of the brief PG dump. PGs which do not
+            exist are left out.
+        """
+        return self._ceph_get_pg_recovery_stats(list(pgids))
+
     def get_latest_counter(self, svc_type, svc_name, path):
         """
         Called by the plugin to fetch only the newest performance counter data
@@ -753,10 +1021,33 @@ class MgrModule(ceph_module.BaseMgrModule):
         else:
             return (0, 0)
 
-    def get_all_perf_counters(self, prio_limit=PRIO_USEFUL):
+    def _get_cached_perf_schema(self, svc_full_name, generation):
+        """
+        Return the perf counter schema of a single daemon, only calling
+        into C++ when we have not seen this generation of its counters
+        before (i.e. the daemon is new or has restarted).
+        """
+        cached = self._perf_schema_cache.get(svc_full_name)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+
+        svc_type, svc_id = svc_full_name.split('.', 1)
+        schema = self.get_perf_schema(svc_type, svc_id)
+        if not schema:
+            return None
+
+        # Value is returned in a potentially-multi-service format,
+        # get just the service we're asking about
+        schema = schema[svc_full_name]
+        self._perf_schema_cache[svc_full_name] = (generation, schema)
+        return schema
+
+    def get_all_perf_counters(self, prio_limit=PRIO_USEFUL,
+                              services=("rgw", "mds", "osd", "mon")):
         """
         Return the perf counters currently known to this ceph-mgr
-        instance, filtered by priority equal to or greater than `prio_limit`.
+        instance, filtered by priority equal to or greater than `prio_limit`
+        and by daemon type.
 
         The result is a map of string to dict, associating services
         (like "osd.123") with their counters.  The counter
@@ -764,55 +1055,49 @@ class MgrModule(ceph_module.BaseMgrModule):
         info structure, which is the information from
         the schema, plus an additional "value" member with the latest
         value.
+
+        The latest values of all daemons are fetched from ceph-mgr in a
+        single call; the schema is cached per daemon and only fetched
+        again when the daemon restarts.
+
+        :param int prio_limit: minimum counter priority
+        :param services: daemon types to include
         """
 
         result = defaultdict(dict)
 
-
-        for server in self.list_servers():
-            for service in server['services']:
-                if service['type'] not in ("rgw", "mds", "osd", "mon"):
+        snapshot = self._ceph_get_perf_counters(prio_limit, list(services))
+
+        for svc_full_name, state in snapshot.items():
+            schema = self._get_cached_perf_schema(svc_full_name,
+                                                  state['generation'])
+            if not schema:
+                self.log.warn("No perf counter schema for {0}".format(
+                    svc_full_name
+                ))
+                continue
+
+            # Populate latest values
+            for counter_path, value in state['counters'].items():
+                counter_schema = schema.get(counter_path)
+                if counter_schema is None:
                     continue
 
-                schema = self.get_perf_schema(service['type'], service['id'])
-                if not schema:
-                    self.log.warn("No perf counter schema for {0}.{1}".format(
-                        service['type'], service['id']
-                    ))
-                    continue
+                counter_info = dict(counter_schema)
+
+                # Also populate count for the long running avgs
+                if counter_schema['type'] & self.PERFCOUNTER_LONGRUNAVG:
+                    counter_info['value'], counter_info['count'] = value
+                else:
+                    counter_info['value'] = value
+
+                result[svc_full_name][counter_path] = counter_info
 
-                # Value is returned in a potentially-multi-service format,
-                # get just the service we're asking about
-                svc_full_name = "{0}.{1}".format(service['type'], service['id'])
-                schema = schema[svc_full_name]
-
-                # Populate latest values
-                for counter_path, counter_schema in schema.items():
-                    # self.log.debug("{0}: {1}".format(
-                    #     counter_path, json.dumps(counter_schema)
-                    # ))
-                    if counter_schema['priority'] < prio_limit:
-                        continue
-
-                    counter_info = dict(counter_schema)
-
-                    # Also populate count for the long running avgs
-                    if counter_schema['type'] & self.PERFCOUNTER_LONGRUNAVG:
-                        v, c = self.get_latest_avg(
-                            service['type'],
-                            service['id'],
-                            counter_path
-                        )
-                        counter_info['value'], counter_info['count'] = v, c
-                        result[svc_full_name][counter_path] = counter_info
-                    else:
-                        counter_info['value'] = self.get_latest(
-                            service['type'],
-                            service['id'],
-                            counter_path
-                        )
-
-                    result[svc_full_name][counter_path] = counter_info
+        # Forget the schema of daemons which have gone away
+        for svc_full_name in list(self._perf_schema_cache.keys()):
+            if svc_full_name.split('.', 1)[0] in services and \
+                    svc_full_name not in snapshot:
+                del self._perf_schema_cache[svc_full_name]
 
         self.log.debug("returning {0} counter".format(len(result)))
 
@@ -1,2 +1,5 @@
+from __future__ import absolute_import
+import os
 
-from module import *
+if 'UNITTEST' not in os.environ:
+    from .module import Module
@@ -1,4 +1,5 @@
 from mgr_module import MgrModule
+from collections import defaultdict, namedtuple
 import threading
 import datetime
 import uuid
@@ -107,12 +108,86 @@ class RemoteEvent(Event):
         return self._progress
 
 
+class PgState(namedtuple('PgState', ['states', 'osds', 'num_bytes',
+                                     'num_bytes_recovered'])):
+    """
+    The few fields of a PG's stats that recovery progress is computed
+    from.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_stats(cls, info):
+        return cls(frozenset(info['state'].split('+')),
+                   frozenset(info['up']) | frozenset(info['acting']),
+                   info['num_bytes'],
+                   info['num_bytes_recovered'])
+
+
+class PgStateTable(object):
+    """
+    The state of all PGs tracked by the PgRecoveryEvents, shared between
+    them so that the PG stats are only looked at once per update, however
+    many events are in progress.
+    """
+
+    def __init__(self):
+        # PG id string -> PgState, or None if the PG does not exist
+        self._states = {}
+        # PG id string -> number of events tracking it
+        self._refs = defaultdict(int)
+
+    def track(self, pgs):
+        for pg in pgs:
+            self._refs[str(pg)] += 1
+
+    def untrack(self, pgs):
+        for pg in pgs:
+            pg_str = str(pg)
+            self._refs[pg_str] -= 1
+            if self._refs[pg_str] <= 0:
+                del self._refs[pg_str]
+                self._states.pop(pg_str, None)
+
+    def clear(self):
+        self._states = {}
+        self._refs = defaultdict(int)
+
+    def __len__(self):
+        return len(self._refs)
+
+    def get(self, pg):
+        return self._states.get(str(pg))
+
+    def pgids(self):
+        """
+        :return: the PG id strings tracked by any event
+        """
+        return list(self._refs)
+
+    def update(self, pg_stats):
+        """
+        :param pg_stats: the result of
+                         ``MgrModule.get_pg_recovery_stats(self.pgids())``
+        :return: the set of the PG id strings whose state changed
+        """
+        changed = set()
+        for pg_str in self._refs:
+            info = pg_stats.get(pg_str)
+            state = PgState.from_stats(info) if info is not None else None
+            if pg_str not in self._states or self._states[pg_str] != state:
+                self._states[pg_str] = state
+                changed.add(pg_str)
+        return changed
+
+
 class PgRecoveryEvent(Event):
     """
     An event whose completion is determined by the recovery of a set of
     PGs to a healthy state.
 
-    Always call update() immediately after construction.
+    Its PGs must be tracked in a PgStateTable, which is then passed to
+    pg_update() whenever it was updated.
     """
 
     def __init__(self, message, refs, which_pgs, evactuate_osds):
@@ -126,6 +201,9 @@ class PgRecoveryEvent(Event):
 
         self._original_bytes_recovered = None
 
+        # PG -> how far its recovery has got, for incomplete PGs
+        self._pg_progress = {}
+
         self._progress = 0.0
 
         self.id = str(uuid.uuid4())
@@ -134,19 +212,54 @@ class PgRecoveryEvent(Event):
     def evacuating_osds(self):
         return self. _evacuate_osds
 
-    def pg_update(self, pg_dump, log):
-        # FIXME: O(pg_num) in python
-        # FIXME: far more fields getting pythonized than we really care about
-        pg_to_state = dict([(p['pgid'], p) for p in pg_dump['pg_stats']])
+    @property
+    def pgs(self):
+        return self._pgs
 
+    def _get_pg_progress(self, pg, state):
+        """
+        :return: None if the PG is complete, otherwise the fraction of its
+                 recovery that is done
+        """
+        if state is None:
+            # The PG is gone!  Probably a pool was deleted.
+            return None
+
+        unmoved = bool(set(self._evacuate_osds) & state.osds)
+
+        if "active" in state.states and "clean" in state.states \
+                and not unmoved:
+            return None
+
+        if state.num_bytes == 0:
+            # Empty PGs are considered 0% done until they are
+            # in the correct state.
+            return 0.0
+
+        ratio = float(state.num_bytes_recovered -
+                      self._original_bytes_recovered.get(pg, 0)) / \
+            state.num_bytes
+
+        # Since the recovered bytes (over time) could perhaps
+        # exceed the contents of the PG (moment in time), we
+        # must clamp this
+        return min(ratio, 1.0)
+
+    def pg_update(self, pg_states, changed, log):
+        """
+        :param pg_states: the PgStateTable tracking the PGs of this event
+        :param changed: the PG id strings whose state changed since the
+                        last update
+        """
         if self._original_bytes_recovered is None:
             self._original_bytes_recovered = {}
             for pg in self._pgs:
-                pg_str = str(pg)
-                self._original_bytes_recovered[pg] = \
-                    pg_to_state[pg_str]['stat_sum']['num_bytes_recovered']
-
-        complete_accumulate = 0.0
+                state = pg_states.get(pg)
+                if state is not None:
+                    self._original_bytes_recovered[pg] = \
+                        state.num_bytes_recovered
+            # look at all PGs the first time around
+            changed = None
 
         # Calculating progress as the number of PGs recovered divided by the
         # original where partially completed PGs count for something
@@ -158,51 +271,21 @@ class PgRecoveryEvent(Event):
 
         complete = set()
         for pg in self._pgs:
-            pg_str = str(pg)
-            try:
-                info = pg_to_state[pg_str]
-            except KeyError:
-                # The PG is gone!  Probably a pool was deleted. Drop it.
-                complete.add(pg)
+            if changed is not None and str(pg) not in changed:
                 continue
-
-            state = info['state']
-
-            states = state.split("+")
-
-            unmoved = bool(set(self._evacuate_osds) & (
-                set(info['up']) | set(info['acting'])))
-
-            if "active" in states and "clean" in states and not unmoved:
+            progress = self._get_pg_progress(pg, pg_states.get(pg))
+            if progress is None:
                 complete.add(pg)
+                self._pg_progress.pop(pg, None)
             else:
-                if info['stat_sum']['num_bytes'] == 0:
-                    # Empty PGs are considered 0% done until they are
-                    # in the correct state.
-                    pass
-                else:
-                    recovered = info['stat_sum']['num_bytes_recovered']
-                    total_bytes = info['stat_sum']['num_bytes']
-                    if total_bytes > 0:
-                        ratio = float(recovered -
-                                      self._original_bytes_recovered[pg]) / \
-                            total_bytes
-
-                        # Since the recovered bytes (over time) could perhaps
-                        # exceed the contents of the PG (moment in time), we
-                        # must clamp this
-                        ratio = min(ratio, 1.0)
-
-                    else:
-                        # Dataless PGs (e.g. containing only OMAPs) count
-                        # as half done.
-                        ratio = 0.5
-
-                    complete_accumulate += ratio
-
-        self._pgs = list(set(self._pgs) ^ complete)
+                self._pg_progress[pg] = progress
+
+        if complete:
+            self._pgs = [pg for pg in self._pgs if pg not in complete]
+            pg_states.untrack(complete)
+
         completed_pgs = self._original_pg_count - len(self._pgs)
-        self._progress = (completed_pgs + complete_accumulate)\
+        self._progress = (completed_pgs + sum(self._pg_progress.values()))\
             / self._original_pg_count
 
         log.info("Updated progress to {0} ({1})".format(
@@ -255,6 +338,9 @@ class Module(MgrModule):
 
         self._latest_osdmap = None
 
+        # the PGs of all PgRecoveryEvents
+        self._pg_states = PgStateTable()
+
         self._dirty = False
 
     def _osd_out(self, old_map, old_dump, new_map, osd_id):
@@ -317,11 +403,12 @@ class Module(MgrModule):
             which_pgs=affected_pgs,
             evactuate_osds=[osd_id]
         )
-        ev.pg_update(self.get("pg_dump"), self.log)
+        self._pg_states.track(ev.pgs)
         self._events[ev.id] = ev
+        self._update_pg_events()
 
     def _osd_in(self, osd_id):
-        for ev_id, ev in self._events.items():
+        for ev in list(self._events.values()):
             if isinstance(ev, PgRecoveryEvent) and osd_id in ev.evacuating_osds:
                 self.log.info("OSD {0} came back in, cancelling event".format(
                     osd_id
@@ -362,11 +449,21 @@ class Module(MgrModule):
             ))
             self._osdmap_changed(old_osdmap, self._latest_osdmap)
         elif notify_type == "pg_summary":
-            data = self.get("pg_dump")
-            for ev_id, ev in self._events.items():
-                if isinstance(ev, PgRecoveryEvent):
-                    ev.pg_update(data, self.log)
-                    self.maybe_complete(ev)
+            self._update_pg_events()
+
+    def _update_pg_events(self):
+        events = [ev for ev in self._events.values()
+                  if isinstance(ev, PgRecoveryEvent)]
+        if not events:
+            return
+
+        # Only the PGs that changed since the last update are looked at
+        # again by the events
+        changed = self._pg_states.update(
+            self.get_pg_recovery_stats(self._pg_states.pgids()))
+        for ev in events:
+            ev.pg_update(self._pg_states, changed, self.log)
+            self.maybe_complete(ev)
 
     def maybe_complete(self, event):
         if event.progress >= 1.0:
@@ -449,6 +546,8 @@ class Module(MgrModule):
         self._completed_events.append(
             GhostEvent(ev.id, ev.message, ev.refs))
         del self._events[ev.id]
+        if isinstance(ev, PgRecoveryEvent):
+            self._pg_states.untrack(ev.pgs)
         self._dirty = True
 
     def complete(self, ev_id):
@@ -493,6 +592,7 @@ class Module(MgrModule):
     def _handle_clear(self):
         self._events = {}
         self._completed_events = []
+        self._pg_states.clear()
         self._dirty = True
         self._save()
 
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import logging
+import sys
+import types
+import unittest
+
+# mgr_module derives its classes from the ones of the C++ ceph_module, give
+# it plain classes to derive from
+if not isinstance(sys.modules.get('ceph_module'), types.ModuleType):
+    ceph_module = types.ModuleType('ceph_module')
+    for name in ('BasePyOSDMap', 'BasePyOSDMapIncremental', 'BasePyCRUSH',
+                 'BaseMgrStandbyModule', 'BaseMgrModule'):
+        setattr(ceph_module, name, type(name, (object,), {}))
+    sys.modules['ceph_module'] = ceph_module
+
+from ..module import PgId, PgRecoveryEvent, PgState, PgStateTable  # noqa: E402 pylint: disable=wrong-import-position
+
+
+log = logging.getLogger(__name__)
+
+PG0 = PgId(1, 0)
+PG1 = PgId(1, 1)
+PG2 = PgId(1, 0xa)
+
+
+def pg_stats(state='active+clean', up=(0, 1), acting=(0, 1),
+             num_bytes=100, num_bytes_recovered=0):
+    return {
+        'state': state,
+        'up': list(up),
+        'acting': list(acting),
+        'num_bytes': num_bytes,
+        'num_bytes_recovered': num_bytes_recovered,
+    }
+
+
+def backfilling(num_bytes_recovered=0):
+    # osd.3 is being evacuated, but still serves the PG
+    return pg_stats('active+remapped+backfilling', acting=(3, 1),
+                    num_bytes_recovered=num_bytes_recovered)
+
+
+class PgStateTableTest(unittest.TestCase):
+
+    def test_track_and_untrack(self):
+        table = PgStateTable()
+        table.track([PG0, PG1])
+        self.assertEqual(len(table), 2)
+        self.assertEqual(sorted(table.pgids()), ['1.0', '1.1'])
+
+        changed = table.update({'1.0': pg_stats(), '1.1': pg_stats(),
+                                '1.a': pg_stats()})
+        # untracked PGs are ignored
+        self.assertEqual(changed, set(['1.0', '1.1']))
+        self.assertEqual(table.get(PG0),
+                         PgState(frozenset(['active', 'clean']),
+                                 frozenset([0, 1]), 100, 0))
+        self.assertIsNone(table.get(PG2))
+
+        table.untrack([PG0])
+        self.assertEqual(table.pgids(), ['1.1'])
+        self.assertIsNone(table.get(PG0))
+        self.assertIsNotNone(table.get(PG1))
+
+        table.untrack([PG1])
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.pgids(), [])
+
+    def test_shared_pgs(self):
+        table = PgStateTable()
+        table.track([PG0, PG1])
+        table.track([PG1, PG2])
+        self.assertEqual(len(table), 3)
+        table.update({'1.0': pg_stats(), '1.1': pg_stats(),
+                      '1.a': pg_stats()})
+
+        # PG1 is still tracked by the second event
+        table.untrack([PG0, PG1])
+        self.assertEqual(sorted(table.pgids()), ['1.1', '1.a'])
+        self.assertIsNotNone(table.get(PG1))
+        # its state is kept, so it is not reported changed again
+        self.assertEqual(table.update({'1.1': pg_stats(),
+                                       '1.a': pg_stats()}), set())
+
+        table.untrack([PG1, PG2])
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(table.get(PG1))
+
+    def test_untracked_pgs_start_over(self):
+        table = PgStateTable()
+        table.track([PG0])
+        table.update({'1.0': pg_stats()})
+        table.untrack([PG0])
+        # a PG tracked again is reported changed, even if it is not
+        table.track([PG0])
+        self.assertEqual(table.update({'1.0': pg_stats()}), set(['1.0']))
+
+    def test_update_reports_changes_only(self):
+        table = PgStateTable()
+        table.track([PG0, PG1])
+        stats = {'1.0': backfilling(), '1.1': backfilling()}
+        self.assertEqual(table.update(stats), set(['1.0', '1.1']))
+        self.assertEqual(table.update(stats), set())
+
+        stats['1.1'] = backfilling(50)
+        self.assertEqual(table.update(stats), set(['1.1']))
+        self.assertEqual(table.get(PG1).num_bytes_recovered, 50)
+
+        # a PG which is gone, e.g. because its pool was deleted
+        del stats['1.0']
+        self.assertEqual(table.update(stats), set(['1.0']))
+        self.assertIsNone(table.get(PG0))
+        self.assertEqual(table.update(stats), set())
+
+    def test_clear(self):
+        table = PgStateTable()
+        table.track([PG0, PG1])
+        table.update({'1.0': pg_stats()})
+        table.clear()
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(table.get(PG0))
+
+
+class PgRecoveryEventTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = PgStateTable()
+        self.event = PgRecoveryEvent('Rebalancing after osd.3 marked out',
+                                     [('osd', 3)], [PG0, PG1], [3])
+        self.table.track(self.event.pgs)
+
+    def update(self, stats, changed=None):
+        all_changed = self.table.update(stats)
+        if changed is None:
+            changed = all_changed
+        self.event.pg_update(self.table, changed, log)
+        return self.event.progress
+
+    def test_first_update_looks_at_all_pgs(self):
+        self.table.update({'1.0': backfilling(), '1.1': pg_stats()})
+        # nothing is reported changed, PG1 is complete nonetheless
+        self.event.pg_update(self.table, set(), log)
+        self.assertEqual(self.event.progress, 0.5)
+        self.assertEqual(self.event.pgs, [PG0])
+
+    def test_partially_changed(self):
+        self.assertEqual(self.update({'1.0': backfilling(10),
+                                      '1.1': backfilling(10)}), 0.0)
+
+        stats = {'1.0': backfilling(60), '1.1': backfilling(60)}
+        # only the PGs reported changed are looked at again
+        self.assertEqual(self.update(stats, set(['1.0'])), 0.25)
+        self.assertEqual(self.update(stats, set()), 0.25)
+        self.assertEqual(self.update(stats, set(['1.1'])), 0.5)
+        # and PGs which are not the event's are ignored
+        self.assertEqual(self.update(stats, set(['1.a'])), 0.5)
+        self.assertEqual(self.event.pgs, [PG0, PG1])
+
+    def test_completed_pgs_are_untracked(self):
+        self.update({'1.0': backfilling(), '1.1': backfilling()})
+
+        self.assertEqual(self.update({'1.0': pg_stats(),
+                                      '1.1': backfilling(50)},
+                                     set(['1.0'])), 0.5)
+        self.assertEqual(self.event.pgs, [PG1])
+        self.assertEqual(self.table.pgids(), ['1.1'])
+
+        # the PG is gone
+        self.assertEqual(self.update({}), 1.0)
+        self.assertEqual(self.event.pgs, [])
+        self.assertEqual(len(self.table), 0)
+
+    def test_shared_pg_completes_for_all_events(self):
+        other = PgRecoveryEvent('Rebalancing after osd.4 marked out',
+                                [('osd', 4)], [PG1, PG2], [4])
+        self.table.track(other.pgs)
+        stats = {'1.0': backfilling(), '1.1': backfilling(),
+                 '1.a': pg_stats('active+remapped+backfilling',
+                                 acting=(4, 1))}
+        changed = self.table.update(stats)
+        self.event.pg_update(self.table, changed, log)
+        other.pg_update(self.table, changed, log)
+
+        stats['1.1'] = pg_stats()
+        changed = self.table.update(stats)
+        self.assertEqual(changed, set(['1.1']))
+        self.event.pg_update(self.table, changed, log)
+        other.pg_update(self.table, changed, log)
+        self.assertEqual(self.event.progress, 0.5)
+        self.assertEqual(other.progress, 0.5)
+        self.assertEqual(sorted(self.table.pgids()), ['1.0', '1.a'])
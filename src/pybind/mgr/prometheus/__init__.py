@@ -1,2 +1,5 @@
-from .module import Module, StandbyModule
+from __future__ import absolute_import
+import os
 
+if 'UNITTEST' not in os.environ:
+    from .module import Module, StandbyModule
@@ -75,6 +75,31 @@ DISK_OCCUPATION = ( 'ceph_daemon', 'device','instance')
 NUM_OBJECTS = ['degraded', 'misplaced', 'unfound']
 
 
+def promethize(path):
+    ''' replace illegal metric name characters '''
+    result = path.replace('.', '_').replace('+', '_plus').replace('::', '_')
+
+    # Hyphens usually turn into underscores, unless they are
+    # trailing
+    if result.endswith("-"):
+        result = result[0:-1] + "_minus"
+    else:
+        result = result.replace("-", "_")
+
+    return "ceph_{0}".format(result)
+
+
+def floatstr(value):
+    ''' represent as Go-compatible float '''
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
 class Metric(object):
     def __init__(self, mtype, name, desc, labels=None):
         self.mtype = mtype
@@ -83,7 +108,22 @@ class Metric(object):
         self.labelnames = labels    # tuple if present
         self.value = {}             # indexed by label values
 
+        # The exposition text is rendered incrementally: the header is
+        # built once, and every series keeps its last rendered line
+        # (indexed by label values) until its value changes.
+        self._prefix = promethize(name)
+        self._header = '''
+# HELP {name} {desc}
+# TYPE {name} {mtype}'''.format(
+            name=self._prefix,
+            desc=desc,
+            mtype=mtype,
+        )
+        self._lines = {}            # labelvalues -> (value, series, line)
+
     def clear(self):
+        # Only the current values are dropped; rendered lines survive
+        # so that unchanged series are not re-rendered on the next scrape
         self.value = {}
 
     def set(self, value, labelvalues=None):
@@ -91,56 +131,33 @@ class Metric(object):
         labelvalues = labelvalues or ('',)
         self.value[labelvalues] = value
 
-    def str_expfmt(self):
-
-        def promethize(path):
-            ''' replace illegal metric name characters '''
-            result = path.replace('.', '_').replace('+', '_plus').replace('::', '_')
-
-            # Hyphens usually turn into underscores, unless they are
-            # trailing
-            if result.endswith("-"):
-                result = result[0:-1] + "_minus"
-            else:
-                result = result.replace("-", "_")
-
-            return "ceph_{0}".format(result)
-
-        def floatstr(value):
-            ''' represent as Go-compatible float '''
-            if value == float('inf'):
-                return '+Inf'
-            if value == float('-inf'):
-                return '-Inf'
-            if math.isnan(value):
-                return 'NaN'
-            return repr(float(value))
-
-        name = promethize(self.name)
-        expfmt = '''
-# HELP {name} {desc}
-# TYPE {name} {mtype}'''.format(
-            name=name,
-            desc=self.desc,
-            mtype=self.mtype,
-        )
+    def _series(self, labelvalues):
+        if self.labelnames:
+            labels = zip(self.labelnames, labelvalues)
+            labels = ','.join('%s="%s"' % (k, v) for k, v in labels)
+        else:
+            labels = ''
+        if labels:
+            return '{0}{{{1}}} '.format(self._prefix, labels)
+        return '{0} '.format(self._prefix)
 
+    def str_expfmt(self):
+        lines = [self._header]
+        rendered = {}
         for labelvalues, value in self.value.items():
-            if self.labelnames:
-                labels = zip(self.labelnames, labelvalues)
-                labels = ','.join('%s="%s"' % (k, v) for k, v in labels)
-            else:
-                labels = ''
-            if labels:
-                fmtstr = '\n{name}{{{labels}}} {value}'
-            else:
-                fmtstr = '\n{name} {value}'
-            expfmt += fmtstr.format(
-                name=name,
-                labels=labels,
-                value=floatstr(value),
-            )
-        return expfmt
+            cached = self._lines.get(labelvalues)
+            if cached is None:
+                series = self._series(labelvalues)
+                cached = (value, series, series + floatstr(value))
+            elif cached[0] != value:
+                series = cached[1]
+                cached = (value, series, series + floatstr(value))
+            rendered[labelvalues] = cached
+            lines.append(cached[2])
+
+        # Forget series which were not reported in this scrape
+        self._lines = rendered
+        return '\n'.join(lines)
 
 
 class Module(MgrModule):
@@ -166,6 +183,7 @@ class Module(MgrModule):
         self.collect_time = 0
         self.collect_timeout = 5.0
         self.collect_cache = None
+        self.collect_duration = 0.0
         _global_instance['plugin'] = self
 
     def _setup_static_metrics(self):
@@ -236,6 +254,18 @@ class Module(MgrModule):
             'PG Total Count'
         )
 
+        metrics['prometheus_collect_duration_seconds'] = Metric(
+            'gauge',
+            'prometheus_collect_duration_seconds',
+            'Time spent collecting and rendering the previous scrape'
+        )
+
+        metrics['prometheus_series'] = Metric(
+            'gauge',
+            'prometheus_series',
+            'Number of series exported by this scrape'
+        )
+
         for flag in OSD_FLAGS:
             path = 'osd_flag_{}'.format(flag)
             metrics[path] = Metric(
@@ -311,7 +341,7 @@ class Module(MgrModule):
                 )
 
     def get_fs(self):
-        fs_map = self.get('fs_map')
+        fs_map = self.get_snapshot('fs_map')
         servers = self.get_service_list()
         active_daemons = []
         for fs in fs_map['filesystems']:
@@ -396,14 +426,14 @@ class Module(MgrModule):
         return ret
 
     def get_metadata_and_osd_status(self):
-        osd_map = self.get('osd_map')
+        osd_map = self.get_snapshot('osd_map')
         osd_flags = osd_map['flags'].split(',')
         for flag in OSD_FLAGS:
             self.metrics['osd_flag_{}'.format(flag)].set(
                 int(flag in osd_flags)
             )
 
-        osd_devices = self.get('osd_map_crush')['devices']
+        osd_devices = self.get_snapshot('osd_map_crush')['devices']
         servers = self.get_service_list()
         for osd in osd_map['osds']:
             # id can be used to link osd metrics and metadata
@@ -493,6 +523,8 @@ class Module(MgrModule):
             self.metrics[stat].set(pg_sum[stat])
 
     def collect(self):
+        start = time.time()
+
         # Clear the metrics before scraping
         for k in self.metrics.keys():
             self.metrics[k].clear()
@@ -548,11 +580,19 @@ class Module(MgrModule):
                         )
                     self.metrics[path].set(value, (daemon,))
 
+        self.metrics['prometheus_collect_duration_seconds'].set(
+            self.collect_duration)
+        series = self.metrics['prometheus_series']
+        # set first, so that the series of this metric is counted as well
+        series.set(0)
+        series.set(sum(len(m.value) for m in self.metrics.values()))
+
         # Return formatted metrics and clear no longer used data
         _metrics = [m.str_expfmt() for m in self.metrics.values()]
         for k in self.metrics.keys():
             self.metrics[k].clear()
 
+        self.collect_duration = time.time() - start
         return ''.join(_metrics) + '\n'
 
     def get_file_sd_config(self):
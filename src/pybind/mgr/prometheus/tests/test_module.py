@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import os
+import sys
+import types
+import unittest
+
+import mock
+
+# mgr_module derives its classes from the ones of the C++ ceph_module, give
+# it plain classes to derive from
+if not isinstance(sys.modules.get('ceph_module'), types.ModuleType):
+    ceph_module = types.ModuleType('ceph_module')
+    for name in ('BasePyOSDMap', 'BasePyOSDMapIncremental', 'BasePyCRUSH',
+                 'BaseMgrStandbyModule', 'BaseMgrModule'):
+        setattr(ceph_module, name, type(name, (object,), {}))
+    sys.modules['ceph_module'] = ceph_module
+
+# the module replaces os._exit on import, keep it for the test runner
+_exit = os._exit
+from .. import module  # noqa: E402 pylint: disable=wrong-import-position
+os._exit = _exit
+
+
+def metric():
+    return module.Metric('counter', 'osd.op_w', 'Client write operations',
+                         ('ceph_daemon',))
+
+
+def scrape(m, values):
+    for daemon, value in values.items():
+        m.set(value, (daemon,))
+    text = m.str_expfmt()
+    m.clear()
+    return text
+
+
+class MetricTest(unittest.TestCase):
+
+    def test_render(self):
+        self.assertEqual(scrape(metric(), {'osd.0': 1}), '''
+# HELP ceph_osd_op_w Client write operations
+# TYPE ceph_osd_op_w counter
+ceph_osd_op_w{ceph_daemon="osd.0"} 1.0''')
+
+    def test_only_changed_series_are_rendered(self):
+        m = metric()
+        first = dict(('osd.%d' % i, i) for i in range(10))
+        scrape(m, first)
+
+        second = dict(first, **{'osd.3': 30, 'osd.7': 70, 'osd.10': 100})
+        del second['osd.5']
+        with mock.patch.object(module, 'floatstr',
+                               wraps=module.floatstr) as floatstr, \
+                mock.patch.object(module.Metric, '_series',
+                                  autospec=True,
+                                  side_effect=module.Metric._series) as series:
+            text = scrape(m, second)
+        # two changed values and one new series
+        self.assertEqual(sorted(c[0][0] for c in floatstr.call_args_list),
+                         [30, 70, 100])
+        # only the new series' labels are formatted
+        self.assertEqual([c[0][1] for c in series.call_args_list],
+                         [('osd.10',)])
+
+        # same as rendering the second scrape from scratch
+        self.assertEqual(sorted(text.split('\n')),
+                         sorted(scrape(metric(), second).split('\n')))
+        self.assertNotIn('osd.5"', text)
+
+    def test_unchanged_scrape(self):
+        m = metric()
+        values = {'osd.0': 1, 'osd.1': 2}
+        first = scrape(m, values)
+        with mock.patch.object(module, 'floatstr') as floatstr:
+            self.assertEqual(scrape(m, values), first)
+        self.assertFalse(floatstr.called)
+
+    def test_dropped_series_is_rendered_again(self):
+        m = metric()
+        scrape(m, {'osd.0': 1})
+        scrape(m, {})
+        self.assertEqual(scrape(m, {'osd.0': 1}),
+                         scrape(metric(), {'osd.0': 1}))
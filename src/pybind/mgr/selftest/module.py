@@ -254,8 +254,9 @@ class Module(MgrModule):
     def _self_test_perf_counters(self):
         self.get_perf_schema("osd", "0")
         self.get_counter("osd", "0", "osd.op")
-        #get_counter
-        #get_all_perf_coutners
+        self.get_all_perf_counters()
+        self.get_all_perf_counters(prio_limit=self.PRIO_CRITICAL,
+                                   services=("osd",))
 
     def _self_test_misc(self):
         self.set_uri("http://this.is.a.test.com")
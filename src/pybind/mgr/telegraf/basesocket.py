@@ -11,6 +11,18 @@ class BaseSocket(object):
         'udp6': (socket.AF_INET6, socket.SOCK_DGRAM),
     }
 
+    # Largest UDP payloads which fit in a 1500 byte Ethernet frame, so
+    # datagrams are never fragmented
+    udp_payload = {
+        socket.AF_INET: 1500 - 20 - 8,
+        socket.AF_INET6: 1500 - 40 - 8,
+    }
+    # Unix datagrams are not fragmented, stay well below the default
+    # socket buffer size and Telegraf's read buffer
+    unix_dgram_payload = 32768
+    # Buffer size for stream sockets
+    stream_payload = 65536
+
     def __init__(self, url):
         self.url = url
 
@@ -19,12 +31,20 @@ class BaseSocket(object):
         except KeyError:
             raise RuntimeError('Unsupported socket type: %s', self.url.scheme)
 
+        self.socket_type = socket_type
         self.sock = socket.socket(family=socket_family, type=socket_type)
         if self.sock.family == socket.AF_UNIX:
             self.address = self.url.path
         else:
             self.address = (self.url.hostname, self.url.port)
 
+        if socket_type == socket.SOCK_STREAM:
+            self.max_payload = self.stream_payload
+        elif socket_family == socket.AF_UNIX:
+            self.max_payload = self.unix_dgram_payload
+        else:
+            self.max_payload = self.udp_payload[socket_family]
+
     def connect(self):
         return self.sock.connect(self.address)
 
@@ -34,6 +54,37 @@ class BaseSocket(object):
     def send(self, data, flags=0):
         return self.sock.send(data.encode('utf-8') + b'\n', flags)
 
+    def send_lines(self, lines):
+        """
+        Send an iterable of lines, packed into as few datagrams or writes
+        as ``max_payload`` allows. A line never spans two datagrams.
+
+        :return: the number of bytes sent
+        """
+        sent = 0
+        size = 0
+        payload = []
+        for line in lines:
+            data = line.encode('utf-8') + b'\n'
+            if payload and size + len(data) > self.max_payload:
+                sent += self._send_payload(b''.join(payload))
+                size = 0
+                payload = []
+            payload.append(data)
+            size += len(data)
+
+        if payload:
+            sent += self._send_payload(b''.join(payload))
+
+        return sent
+
+    def _send_payload(self, payload):
+        if self.socket_type == socket.SOCK_STREAM:
+            self.sock.sendall(payload)
+        else:
+            self.sock.send(payload)
+        return len(payload)
+
     def __del__(self):
         self.sock.close()
 
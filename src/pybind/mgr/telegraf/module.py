@@ -4,11 +4,11 @@ import itertools
 import six
 import socket
 import time
-from threading import Event
+from threading import Event, Lock
 
 from telegraf.basesocket import BaseSocket
 from telegraf.protocol import Line
-from mgr_module import MgrModule, PG_STATES
+from mgr_module import MgrModule, DaemonMetadataCache, PG_STATES
 
 try:
     from urllib.parse import urlparse
@@ -57,14 +57,19 @@ class Module(MgrModule):
         super(Module, self).__init__(*args, **kwargs)
         self.event = Event()
         self.run = True
-        self.fsid = None
         self.config = dict()
+        self.metadata_cache = DaemonMetadataCache(self)
+        # the socket is kept open between intervals, and shared with the
+        # 'telegraf send' command
+        self.sock = None
+        self.sock_lock = Lock()
+        self.send_stats = None
 
     def get_fsid(self):
-        if not self.fsid:
-            self.fsid = self.get('mon_map')['fsid']
+        return self.metadata_cache.get_fsid()
 
-        return self.fsid
+    def notify(self, notify_type, notify_id):
+        self.metadata_cache.notify(notify_type, notify_id)
 
     def get_pool_stats(self):
         df = self.get('df')
@@ -84,6 +89,7 @@ class Module(MgrModule):
             'quota_bytes'
         ]
 
+        fsid = self.get_fsid()
         for df_type in df_types:
             for pool in df['pools']:
                 yield {
@@ -92,7 +98,7 @@ class Module(MgrModule):
                         'pool_name': pool['name'],
                         'pool_id': pool['id'],
                         'type_instance': df_type,
-                        'fsid': self.get_fsid()
+                        'fsid': fsid
                     },
                     'value': pool['stats'][df_type],
                 }
@@ -100,25 +106,33 @@ class Module(MgrModule):
     def get_daemon_stats(self):
         for daemon, counters in six.iteritems(self.get_all_perf_counters()):
             svc_type, svc_id = daemon.split('.', 1)
-            metadata = self.get_metadata(svc_type, svc_id)
-            if not metadata:
+            daemon_tags = self.metadata_cache.get_daemon_tags(svc_type, svc_id)
+            if daemon_tags is None:
                 continue
 
-            for path, counter_info in counters.items():
+            for path, counter_info in six.iteritems(counters):
                 if counter_info['type'] & self.PERFCOUNTER_HISTOGRAM:
                     continue
 
                 yield {
                     'measurement': 'ceph_daemon_stats',
-                    'tags': {
-                        'ceph_daemon': daemon,
-                        'type_instance': path,
-                        'host': metadata['hostname'],
-                        'fsid': self.get_fsid()
-                    },
+                    'tags': dict(daemon_tags, type_instance=path),
                     'value': counter_info['value']
                 }
 
+    def get_module_stats(self):
+        # how the previous interval went
+        if self.send_stats is None:
+            return
+
+        yield {
+            'measurement': 'ceph_mgr_telegraf',
+            'tags': {
+                'fsid': self.get_fsid()
+            },
+            'value': self.send_stats
+        }
+
     def get_pg_stats(self):
         stats = dict()
 
@@ -216,6 +230,10 @@ class Module(MgrModule):
 
         self.config[option] = value
 
+        if option == 'address':
+            with self.sock_lock:
+                self.close_socket()
+
     def init_module_config(self):
         self.config['address'] = \
             self.get_config("address", default=self.config_keys['address'])
@@ -230,31 +248,55 @@ class Module(MgrModule):
         return itertools.chain(
             self.get_pool_stats(),
             self.get_daemon_stats(),
-            self.get_cluster_stats()
+            self.get_cluster_stats(),
+            self.get_module_stats()
         )
 
-    def send_to_telegraf(self):
-        url = urlparse(self.config['address'])
+    def get_socket(self):
+        if self.sock is None:
+            sock = BaseSocket(urlparse(self.config['address']))
+            self.log.debug('Connecting to Telegraf at %s', sock.address)
+            sock.connect()
+            self.sock = sock
 
-        sock = BaseSocket(url)
-        self.log.debug('Sending data to Telegraf at %s', sock.address)
+        return self.sock
+
+    def close_socket(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def send_to_telegraf(self):
         now = self.now()
-        with sock as s:
+        lines = [Line(measurement['measurement'], measurement['value'],
+                      measurement['tags'], now).to_line_protocol()
+                 for measurement in self.gather_measurements()]
+
+        with self.sock_lock:
+            start = time.time()
             try:
-                for measurement in self.gather_measurements():
-                    self.log.debug(measurement)
-                    line = Line(measurement['measurement'],
-                                measurement['value'],
-                                measurement['tags'], now)
-                    self.log.debug(line.to_line_protocol())
-                    s.send(line.to_line_protocol())
+                sent = self.get_socket().send_lines(lines)
             except (socket.error, RuntimeError, IOError, OSError):
                 self.log.exception('Failed to send statistics to Telegraf:')
+                # reconnect on the next attempt
+                self.close_socket()
+                return
+
+            runtime = time.time() - start
+            self.log.debug('Sent %d lines (%d bytes) to Telegraf in %.3f '
+                           'seconds', len(lines), sent, runtime)
+            self.send_stats = {
+                'lines': len(lines),
+                'bytes': sent,
+                'send_seconds': runtime
+            }
 
     def shutdown(self):
         self.log.info('Stopping Telegraf module')
         self.run = False
         self.event.set()
+        with self.sock_lock:
+            self.close_socket()
 
     def handle_command(self, inbuf, cmd):
         if cmd['prefix'] == 'telegraf config-show':
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import logging
+import sys
+import types
+import unittest
+
+import mock
+
+# mgr_module derives its classes from the ones of the C++ ceph_module, give
+# it plain classes to derive from
+if not isinstance(sys.modules.get('ceph_module'), types.ModuleType):
+    ceph_module = types.ModuleType('ceph_module')
+    for name in ('BasePyOSDMap', 'BasePyOSDMapIncremental', 'BasePyCRUSH',
+                 'BaseMgrStandbyModule', 'BaseMgrModule'):
+        setattr(ceph_module, name, type(name, (object,), {}))
+    sys.modules['ceph_module'] = ceph_module
+
+from mgr_module import MgrModule  # noqa: E402 pylint: disable=wrong-import-position
+
+
+class FakeModule(MgrModule):
+    log = logging.getLogger(__name__)
+
+    # pylint: disable=super-init-not-called
+    def __init__(self):
+        self._perf_schema_cache = {}
+        self._ceph_get_perf_counters = mock.Mock()
+        self.get_perf_schema = mock.Mock()
+
+
+def counter(description):
+    return {'description': description, 'nick': '', 'type': 2,
+            'priority': MgrModule.PRIO_USEFUL, 'units': 0}
+
+
+class PerfCountersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.module = FakeModule()
+
+    def report(self, generation, counters):
+        self.module._ceph_get_perf_counters.return_value = {
+            'osd.0': {'generation': generation, 'counters': counters},
+        }
+
+    def schema(self, counters):
+        self.module.get_perf_schema.return_value = {
+            'osd.0': dict((path, counter(path)) for path in counters),
+        }
+
+    def test_schema_is_cached(self):
+        self.report(1, {'osd.op': 1})
+        self.schema(['osd.op'])
+        self.module.get_all_perf_counters()
+        self.report(1, {'osd.op': 2})
+        result = self.module.get_all_perf_counters()
+        self.assertEqual(result['osd.0']['osd.op']['value'], 2)
+        self.assertEqual(self.module.get_perf_schema.call_count, 1)
+
+    def test_counter_declared_later_shows_up(self):
+        self.report(1, {'osd.op': 1})
+        self.schema(['osd.op'])
+        result = self.module.get_all_perf_counters()
+        self.assertEqual(list(result['osd.0']), ['osd.op'])
+
+        # the daemon declares a new counter, which bumps the generation
+        self.report(2, {'osd.op': 2, 'osd.op_r': 5})
+        self.schema(['osd.op', 'osd.op_r'])
+        result = self.module.get_all_perf_counters()
+        self.assertEqual(sorted(result['osd.0']), ['osd.op', 'osd.op_r'])
+        self.assertEqual(result['osd.0']['osd.op_r']['value'], 5)
+        self.assertEqual(self.module.get_perf_schema.call_count, 2)
+
+    def test_undeclared_counter_goes_away(self):
+        self.report(1, {'osd.op': 1, 'osd.op_r': 5})
+        self.schema(['osd.op', 'osd.op_r'])
+        self.module.get_all_perf_counters()
+
+        self.report(2, {'osd.op': 2})
+        self.schema(['osd.op'])
+        result = self.module.get_all_perf_counters()
+        self.assertEqual(list(result['osd.0']), ['osd.op'])
+
+    def test_forgets_daemons_which_went_away(self):
+        self.report(1, {'osd.op': 1})
+        self.schema(['osd.op'])
+        self.module.get_all_perf_counters()
+        self.module._ceph_get_perf_counters.return_value = {}
+        self.assertEqual(self.module.get_all_perf_counters(), {})
+        self.assertEqual(self.module._perf_schema_cache, {})
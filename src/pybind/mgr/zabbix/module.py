@@ -2,13 +2,13 @@
 Zabbix module for ceph-mgr
 
 Collect statistics from Ceph cluster and every X seconds send data to a Zabbix
-server using the zabbix_sender executable.
+server using the Zabbix trapper protocol.
 """
 import json
 import errno
-from subprocess import Popen, PIPE
 from threading import Event
 from mgr_module import MgrModule
+from .sender import ZabbixSender
 
 
 def avg(data):
@@ -18,35 +18,6 @@ def avg(data):
         return 0
 
 
-class ZabbixSender(object):
-    def __init__(self, sender, host, port, log):
-        self.sender = sender
-        self.host = host
-        self.port = port
-        self.log = log
-
-    def send(self, hostname, data):
-        if len(data) == 0:
-            return
-
-        cmd = [self.sender, '-z', self.host, '-p', str(self.port), '-s',
-               hostname, '-vv', '-i', '-']
-
-        self.log.debug('Executing: %s', cmd)
-
-        proc = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
-
-        for key, value in data.items():
-            proc.stdin.write('{0} ceph.{1} {2}\n'.format(hostname, key, value))
-
-        stdout, stderr = proc.communicate()
-        if proc.returncode != 0:
-            raise RuntimeError('%s exited non-zero: %s' % (self.sender,
-                                                           stderr))
-
-        self.log.debug('Zabbix Sender: %s', stdout.rstrip())
-
-
 class Module(MgrModule):
     run = False
     config = dict()
@@ -58,10 +29,6 @@ class Module(MgrModule):
                 for o in self.OPTIONS)
 
     OPTIONS = [
-            {
-                'name': 'zabbix_sender',
-                'default': '/usr/bin/zabbix_sender'
-            },
             {
                 'name': 'zabbix_host',
                 'default': None
@@ -80,6 +47,11 @@ class Module(MgrModule):
             }
     ]
 
+    # options of earlier releases which are accepted, but ignored: the
+    # module speaks the trapper protocol itself instead of running
+    # zabbix_sender
+    DEPRECATED_OPTIONS = ['zabbix_sender']
+
     COMMANDS = [
         {
             "cmd": "zabbix config-set name=key,type=CephString "
@@ -102,6 +74,7 @@ class Module(MgrModule):
     def __init__(self, *args, **kwargs):
         super(Module, self).__init__(*args, **kwargs)
         self.event = Event()
+        self.zabbix = None
 
     def init_module_config(self):
         self.fsid = self.get('mon_map')['fsid']
@@ -128,8 +101,19 @@ class Module(MgrModule):
         self.log.debug('Setting in-memory config option %s to: %s', option,
                        value)
         self.config[option] = value
+
+        if option in ['zabbix_host', 'zabbix_port'] and self.zabbix:
+            self.zabbix.close()
+            self.zabbix = None
+
         return True
 
+    def get_sender(self):
+        if self.zabbix is None:
+            self.zabbix = ZabbixSender(self.config['zabbix_host'],
+                                       self.config['zabbix_port'], self.log)
+        return self.zabbix
+
     def get_pg_stats(self):
         stats = dict()
 
@@ -274,15 +258,29 @@ class Module(MgrModule):
                 self.config['zabbix_host'], identifier)
             self.log.debug(data)
 
-            zabbix = ZabbixSender(self.config['zabbix_sender'],
-                                  self.config['zabbix_host'],
-                                  self.config['zabbix_port'], self.log)
+            processed, failed, total = \
+                self.get_sender().send(identifier, data)
+            if failed:
+                self.log.warning('Zabbix server failed to process %d of %d '
+                                 'items', failed, total)
+                self.set_health_checks({
+                    'MGR_ZABBIX_SEND_FAILED': {
+                        'severity': 'warning',
+                        'summary': 'Zabbix server failed to process items',
+                        'detail': ['%d of %d items failed, please check that '
+                                   'the Zabbix template is up to date and '
+                                   'host %s exists' % (failed, total,
+                                                       identifier)]
+                    }
+                })
+                return False
 
-            zabbix.send(identifier, data)
             self.set_health_checks(dict())
             return True
         except Exception as exc:
             self.log.error('Exception when sending: %s', exc)
+            if self.zabbix:
+                self.zabbix.close()
             self.set_health_checks({
                 'MGR_ZABBIX_SEND_FAILED': {
                     'severity': 'warning',
@@ -302,6 +300,12 @@ class Module(MgrModule):
             if not value:
                 return -errno.EINVAL, '', 'Value should not be empty or None'
 
+            if key in self.DEPRECATED_OPTIONS:
+                self.log.warning('Ignoring configuration option %s, it is no '
+                                 'longer used', key)
+                return 0, 'Configuration option {0} is no longer ' \
+                          'used'.format(key), ''
+
             self.log.debug('Setting configuration option %s to %s', key, value)
             if self.set_config_option(key, value):
                 self.set_config(key, value)
@@ -323,6 +327,8 @@ class Module(MgrModule):
         self.log.info('Stopping zabbix')
         self.run = False
         self.event.set()
+        if self.zabbix:
+            self.zabbix.close()
 
     def serve(self):
         self.log.info('Zabbix module starting up')
@@ -0,0 +1,190 @@
+"""
+Client side of the Zabbix trapper protocol, as spoken by zabbix_sender.
+
+Every request and response is a JSON document prefixed with a header made up
+of the ``ZBXD`` magic, a protocol version byte and the length of the document
+as a 64 bit little-endian integer.
+"""
+import json
+import re
+import select
+import socket
+import struct
+import time
+from threading import Lock
+
+
+class ZabbixSenderError(Exception):
+    pass
+
+
+class ZabbixSender(object):
+    HEADER = b'ZBXD\x01'
+    HEADER_LEN = len(HEADER) + 8
+    # zabbix_sender does not put more values than this in a single request
+    BATCH_SIZE = 250
+    TIMEOUT = 10
+
+    INFO_RE = re.compile(r'processed:\s*(\d+);\s*failed:\s*(\d+);'
+                         r'\s*total:\s*(\d+)')
+
+    def __init__(self, host, port, log, batch_size=BATCH_SIZE,
+                 timeout=TIMEOUT):
+        self.host = host
+        self.port = port
+        self.log = log
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.sock = None
+        # serializes requests on the shared connection
+        self.lock = Lock()
+
+    def connect(self):
+        self.close()
+        self.log.debug('Connecting to Zabbix server %s:%d', self.host,
+                       self.port)
+        self.sock = socket.create_connection((self.host, self.port),
+                                             self.timeout)
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except socket.error:
+                pass
+            self.sock = None
+
+    @classmethod
+    def pack(cls, request):
+        body = json.dumps(request).encode('utf-8')
+        return cls.HEADER + struct.pack('<Q', len(body)) + body
+
+    def _recv_exactly(self, length):
+        chunks = []
+        while length > 0:
+            chunk = self.sock.recv(length)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            length -= len(chunk)
+        return b''.join(chunks)
+
+    def _recv_response(self):
+        header = self._recv_exactly(self.HEADER_LEN)
+        if not header:
+            # the server closed the connection before answering
+            return None
+        if len(header) != self.HEADER_LEN or \
+                not header.startswith(self.HEADER):
+            raise ZabbixSenderError('Invalid response header from Zabbix '
+                                    'server: %r' % header)
+
+        length = struct.unpack('<Q', header[len(self.HEADER):])[0]
+        body = self._recv_exactly(length)
+        if len(body) != length:
+            raise ZabbixSenderError('Truncated response from Zabbix server')
+
+        return json.loads(body.decode('utf-8'))
+
+    def _peer_closed(self):
+        """
+        Whether the server closed (or broke) the connection, without
+        blocking.  Nothing is expected from the server between responses,
+        so a readable connection is at EOF, or out of sync and no more
+        usable either.
+        """
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except (select.error, ValueError):
+            return True
+        return bool(readable)
+
+    def _request(self, payload):
+        # Zabbix servers close the connection after every response, others
+        # (e.g. proxies) may keep it open. Only keep the connection for the
+        # next request if the server did not close it meanwhile.
+        if self.sock is not None and self._peer_closed():
+            self.log.debug('Zabbix server closed the connection')
+            self.close()
+        reused = self.sock is not None
+        if not reused:
+            self.connect()
+
+        try:
+            self.sock.sendall(payload)
+            response = self._recv_response()
+        except socket.error:
+            self.close()
+            if not reused:
+                raise
+            response = None
+
+        if response is None:
+            self.close()
+            if not reused:
+                raise ZabbixSenderError('Zabbix server closed the connection '
+                                        'without a response')
+            # the server closed an idle connection right before the request
+            self.log.debug('Reconnecting to Zabbix server')
+            return self._request(payload)
+
+        if self._peer_closed():
+            self.close()
+        return response
+
+    @classmethod
+    def parse_info(cls, info):
+        """
+        Parse the ``info`` string of a response, e.g.
+        ``processed: 2; failed: 1; total: 3; seconds spent: 0.000055``
+        into a (processed, failed, total) tuple
+        """
+        match = cls.INFO_RE.search(info or '')
+        if not match:
+            raise ZabbixSenderError('Unable to parse Zabbix server response: '
+                                    '%s' % info)
+        return tuple(int(v) for v in match.groups())
+
+    def send_items(self, items):
+        """
+        Send a list of (hostname, key, value) tuples to the server, in
+        batches of at most ``batch_size`` items.
+
+        :return: a (processed, failed, total) tuple summed over all batches
+        """
+        processed = failed = total = 0
+        for i in range(0, len(items), self.batch_size):
+            batch = items[i:i + self.batch_size]
+            request = {
+                'request': 'sender data',
+                'data': [
+                    {'host': host, 'key': key, 'value': str(value)}
+                    for host, key, value in batch
+                ],
+                'clock': int(time.time())
+            }
+            with self.lock:
+                response = self._request(self.pack(request))
+            if response.get('response') != 'success':
+                raise ZabbixSenderError('Zabbix server rejected data: %s' %
+                                        response.get('info', response))
+
+            p, f, t = self.parse_info(response.get('info'))
+            self.log.debug('Zabbix server processed %d, failed %d of %d '
+                           'items', p, f, t)
+            processed += p
+            failed += f
+            total += t
+
+        return processed, failed, total
+
+    def send(self, hostname, data):
+        """
+        Send a dict of item keys and values as the Zabbix host ``hostname``,
+        prefixing every key with ``ceph.``
+        """
+        if len(data) == 0:
+            return 0, 0, 0
+
+        return self.send_items([(hostname, 'ceph.{0}'.format(key), value)
+                                for key, value in data.items()])
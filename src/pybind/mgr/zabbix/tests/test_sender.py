@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import json
+import logging
+import socket
+import struct
+import threading
+import unittest
+
+import mock
+
+from ..sender import ZabbixSender, ZabbixSenderError
+
+
+class StubTrapper(object):
+    """
+    Minimal Zabbix trapper: accepts 'sender data' requests and answers them
+    like a Zabbix server does, failing the items listed in ``unknown_keys``.
+    """
+    def __init__(self, keep_alive=False, unknown_keys=()):
+        self.keep_alive = keep_alive
+        self.unknown_keys = set(unknown_keys)
+        self.requests = []
+        self.connections = 0
+        self.closed = threading.Event()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(5)
+        self.port = self.server.getsockname()[1]
+        self.thread = threading.Thread(target=self.serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    @staticmethod
+    def recv_exactly(conn, length):
+        data = b''
+        while len(data) < length:
+            chunk = conn.recv(length - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except socket.error:
+                return
+            self.connections += 1
+            while self.handle(conn) and self.keep_alive:
+                pass
+            conn.close()
+            self.closed.set()
+
+    def handle(self, conn):
+        header = self.recv_exactly(conn, 13)
+        if header is None:
+            return False
+        assert header[:5] == b'ZBXD\x01'
+        length = struct.unpack('<Q', header[5:])[0]
+        request = json.loads(self.recv_exactly(conn, length).decode('utf-8'))
+        self.requests.append(request)
+
+        total = len(request['data'])
+        failed = len([i for i in request['data']
+                      if i['key'] in self.unknown_keys])
+        response = {
+            'response': 'success',
+            'info': 'processed: %d; failed: %d; total: %d; '
+                    'seconds spent: 0.000042' % (total - failed, failed, total)
+        }
+        conn.sendall(ZabbixSender.pack(response))
+        return True
+
+    def close(self):
+        self.server.close()
+
+
+class ZabbixSenderTest(unittest.TestCase):
+    def setUp(self):
+        self.log = logging.getLogger(__name__)
+
+    def test_pack(self):
+        packed = ZabbixSender.pack({'request': 'sender data'})
+        body = b'{"request": "sender data"}'
+        self.assertEqual(packed, b'ZBXD\x01' + struct.pack('<Q', len(body)) +
+                         body)
+
+    def test_parse_info(self):
+        self.assertEqual(ZabbixSender.parse_info(
+            'processed: 2; failed: 1; total: 3; seconds spent: 0.000055'),
+                         (2, 1, 3))
+        with self.assertRaises(ZabbixSenderError):
+            ZabbixSender.parse_info('garbage')
+
+    def test_send(self):
+        trapper = StubTrapper()
+        sender = ZabbixSender('127.0.0.1', trapper.port, self.log)
+        try:
+            result = sender.send('ceph-test', {'num_osd': 3,
+                                               'overall_status': 'HEALTH_OK'})
+        finally:
+            sender.close()
+            trapper.close()
+
+        self.assertEqual(result, (2, 0, 2))
+        self.assertEqual(len(trapper.requests), 1)
+        request = trapper.requests[0]
+        self.assertEqual(request['request'], 'sender data')
+        self.assertEqual(sorted(request['data'], key=lambda i: i['key']), [
+            {'host': 'ceph-test', 'key': 'ceph.num_osd', 'value': '3'},
+            {'host': 'ceph-test', 'key': 'ceph.overall_status',
+             'value': 'HEALTH_OK'},
+        ])
+
+    def test_batches_and_failed_items(self):
+        trapper = StubTrapper(unknown_keys=['ceph.item_7'])
+        sender = ZabbixSender('127.0.0.1', trapper.port, self.log,
+                              batch_size=4)
+        data = dict(('item_{0}'.format(i), i) for i in range(10))
+        try:
+            result = sender.send('ceph-test', data)
+        finally:
+            sender.close()
+            trapper.close()
+
+        self.assertEqual(result, (9, 1, 10))
+        self.assertEqual([len(r['data']) for r in trapper.requests],
+                         [4, 4, 2])
+
+    def test_reconnect_after_server_closed(self):
+        # like a Zabbix server, close the connection after every response
+        trapper = StubTrapper(keep_alive=False)
+        sender = ZabbixSender('127.0.0.1', trapper.port, self.log)
+        try:
+            sender.send('ceph-test', {'a': 1})
+            sender.send('ceph-test', {'b': 2})
+        finally:
+            sender.close()
+            trapper.close()
+
+        self.assertEqual(len(trapper.requests), 2)
+        self.assertEqual(trapper.connections, 2)
+
+    def test_closed_connection_is_not_reused(self):
+        trapper = StubTrapper(keep_alive=False)
+        sender = ZabbixSender('127.0.0.1', trapper.port, self.log)
+        try:
+            sender.send('ceph-test', {'a': 1})
+            self.assertTrue(trapper.closed.wait(5))
+            with mock.patch.object(sender, 'log') as log:
+                result = sender.send('ceph-test', {'b': 2})
+        finally:
+            sender.close()
+            trapper.close()
+
+        self.assertEqual(result, (1, 0, 1))
+        self.assertEqual(trapper.connections, 2)
+        # the second request was not sent on the closed connection first
+        self.assertNotIn(mock.call('Reconnecting to Zabbix server'),
+                         log.debug.call_args_list)
+
+    def test_persistent_connection(self):
+        trapper = StubTrapper(keep_alive=True)
+        sender = ZabbixSender('127.0.0.1', trapper.port, self.log,
+                              batch_size=1)
+        try:
+            result = sender.send('ceph-test', {'a': 1, 'b': 2, 'c': 3})
+            self.assertIsNotNone(sender.sock)
+        finally:
+            sender.close()
+            trapper.close()
+
+        self.assertEqual(result, (3, 0, 3))
+        self.assertEqual(len(trapper.requests), 3)
+        self.assertEqual(trapper.connections, 1)
+
+    def test_no_server(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+        server.close()
+
+        sender = ZabbixSender('127.0.0.1', port, self.log)
+        with self.assertRaises(socket.error):
+            sender.send('ceph-test', {'a': 1})
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+# README:
+#
+# Time the calculation of an upmap balancer plan against a recorded
+# cluster by running the mgr balancer module's own do_upmap(): once with
+# upmap_max_workers = 1, which goes pool by pool with a shared budget
+# (serial), and once with the pools split by Module.get_pool_groups() and
+# calculated by Module.calc_upmaps_parallel() (parallel).
+#
+# Outside of ceph-mgr there is no C++ OSDMap to call into, so the module
+# is given an osdmap backed by the recorded map: the mappings come from
+# the pg dump and calc_pg_upmaps() runs osdmaptool --upmap, which calls
+# the same OSDMap::calc_pg_upmaps() as the mgr does.
+#
+# Record the cluster state with:
+#
+#     $ ceph osd getmap -o osdmap.bin
+#     $ ceph pg dump -f json > pg_dump.json
+#
+# and run, from a build directory:
+#
+#     $ ../src/script/upmap-bench.py --osdmap osdmap.bin --pg-dump pg_dump.json
+#
+# which prints the number of upmap changes prepared and the wall time
+# taken by each strategy.
+#
+# The number of changes is capped by --max-iterations and by the number of
+# PGs which can still be misplaced given --max-misplaced and the misplaced
+# ratio found in the pg dump, like the balancer's upmap mode does.
+
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+
+def run(args):
+    return subprocess.check_output(args, stderr=subprocess.STDOUT)
+
+
+def load_json(out):
+    # the tools print a banner before the document
+    out = out.decode('utf-8')
+    return json.loads(out[out.index('{'):])
+
+
+def load_pg_dump(path):
+    with open(path) as f:
+        dump = json.load(f)
+    # newer releases wrap the pg map
+    return dump.get('pg_map', dump)
+
+
+def import_balancer():
+    mgr_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'pybind', 'mgr')
+    cython_dir = os.path.join('lib', 'cython_modules',
+                              'lib.%d' % sys.version_info[0])
+    sys.path[:0] = [mgr_dir, cython_dir]
+    # mgr_module derives its classes from the ones ceph-mgr provides
+    ceph_module = types.ModuleType('ceph_module')
+    for name in ('BasePyOSDMap', 'BasePyOSDMapIncremental', 'BasePyCRUSH',
+                 'BaseMgrStandbyModule', 'BaseMgrModule'):
+        setattr(ceph_module, name, type(name, (object,), {}))
+    sys.modules['ceph_module'] = ceph_module
+    from balancer import module
+    return module
+
+
+class RecordedCRUSH(object):
+    def __init__(self, dump):
+        self.buckets = dict((b['id'], b) for b in dump['buckets'])
+        self.bucket_ids = dict((b['name'], b['id']) for b in dump['buckets'])
+        self.takes = {}   # rule id -> take ids
+        for rule in dump['rules']:
+            self.takes[rule['rule_id']] = [
+                self._take_id(step) for step in rule['steps']
+                if step['op'] == 'take'
+            ]
+
+    def _take_id(self, step):
+        if step['item'] in self.buckets or step['item'] >= 0:
+            return step['item']
+        # a device class shadow tree, which is not dumped: take the
+        # osds of the whole tree it is derived from
+        return self.bucket_ids[step['item_name'].split('~')[0]]
+
+    def find_takes(self):
+        return sorted(set(i for takes in self.takes.values() for i in takes))
+
+    def get_take_weight_osd_map(self, root):
+        if root >= 0:
+            return {root: 1.0}
+        weights = {}
+        for item in self.buckets[root]['items']:
+            if item['id'] >= 0:
+                weights[item['id']] = item['weight']
+            else:
+                weights.update(self.get_take_weight_osd_map(item['id']))
+        return weights
+
+
+class RecordedIncremental(object):
+    def __init__(self):
+        self.commands = []
+
+    def merge_pg_upmaps(self, other):
+        self.commands += other.commands
+
+
+class RecordedOSDMap(object):
+    def __init__(self, args, workdir, osdmap_dump, crush, pg_dump):
+        self.args = args
+        self.workdir = workdir
+        self.osdmap_dump = osdmap_dump
+        self.crush = crush
+        self.up_by_poolid = {}
+        for stat in pg_dump.get('pg_stats', []):
+            poolid = int(stat['pgid'].split('.')[0])
+            self.up_by_poolid.setdefault(poolid, {})[stat['pgid']] = stat['up']
+
+    def dump(self):
+        return self.osdmap_dump
+
+    def get_crush(self):
+        return self.crush
+
+    def map_pool_pgs_up(self, poolid):
+        return dict(self.up_by_poolid.get(poolid, {}))
+
+    def get_pools_by_take(self, take):
+        return [
+            p['pool'] for p in self.osdmap_dump['pools']
+            if take in self.crush.takes.get(p['crush_rule'], [])
+        ]
+
+    def new_incremental(self):
+        return RecordedIncremental()
+
+    def calc_pg_upmaps(self, inc, max_deviation, max_iterations, pools):
+        fd, out = tempfile.mkstemp(dir=self.workdir)
+        os.close(fd)
+        cmd = [self.args.osdmaptool, self.args.osdmap,
+               '--upmap', out,
+               '--upmap-max', str(max_iterations),
+               '--upmap-deviation', str(max_deviation)]
+        for pool in pools:
+            cmd += ['--upmap-pool', pool]
+        run(cmd)
+        with open(out) as f:
+            changes = [l for l in f if l.startswith('ceph osd pg-upmap-items')]
+        os.unlink(out)
+        inc.commands += changes
+        return len(changes)
+
+
+def make_module(balancer, config, pg_status):
+    class BenchModule(balancer.Module):
+        module_name = 'balancer'
+        log = logging.getLogger(module_name)
+
+        # pylint: disable=super-init-not-called
+        def __init__(self):
+            pass
+
+        def get_config(self, key, default=None):
+            return config.get(key, default)
+
+        def get(self, data_name):
+            assert data_name == 'pg_status'
+            return pg_status
+
+    return BenchModule()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='time balancer upmap plans against a recorded cluster')
+    parser.add_argument('--osdmap', required=True,
+                        help='binary osdmap (ceph osd getmap -o ...)')
+    parser.add_argument('--pg-dump', required=True,
+                        help='ceph pg dump -f json output')
+    parser.add_argument('--max-iterations', type=int, default=10,
+                        help='upmap_max_iterations (default: %(default)s)')
+    parser.add_argument('--max-deviation', type=float, default=.01,
+                        help='upmap_max_deviation (default: %(default)s)')
+    parser.add_argument('--max-misplaced', type=float, default=.05,
+                        help='max_misplaced (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='upmap_max_workers (default: %(default)s)')
+    parser.add_argument('--osdmaptool', default='bin/osdmaptool')
+    parser.add_argument('--crushtool', default='bin/crushtool')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='show the balancer log')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose
+                        else logging.WARNING)
+
+    balancer = import_balancer()
+    workdir = tempfile.mkdtemp(prefix='upmap-bench.')
+    try:
+        osdmap_dump = load_json(run([args.osdmaptool, args.osdmap,
+                                     '--dump', 'json']))
+        crushmap = os.path.join(workdir, 'crushmap')
+        run([args.osdmaptool, args.osdmap, '--export-crush', crushmap])
+        crush = RecordedCRUSH(load_json(run([args.crushtool, '-i', crushmap,
+                                             '--dump'])))
+        pg_dump = load_pg_dump(args.pg_dump)
+        osdmap = RecordedOSDMap(args, workdir, osdmap_dump, crush, pg_dump)
+        ms = balancer.MappingState(osdmap, pg_dump, 'recorded')
+
+        stat_sum = pg_dump.get('pg_stats_sum', {}).get('stat_sum', {})
+        copies = stat_sum.get('num_object_copies', 0)
+        misplaced = 0.0
+        if copies:
+            misplaced = float(stat_sum.get('num_objects_misplaced', 0)) / copies
+        config = {
+            'upmap_max_iterations': args.max_iterations,
+            'upmap_max_deviation': args.max_deviation,
+            'max_misplaced': args.max_misplaced,
+        }
+        module = make_module(balancer, config, {'misplaced_ratio': misplaced})
+
+        pools = [str(p['pool_name']) for p in osdmap_dump['pools']]
+        print('pools: %d, pgs: %d, groups: %d, budget: %d changes' %
+              (len(pools), len(ms.pg_up),
+               len(module.get_pool_groups(ms, pools)),
+               min(args.max_iterations, module.get_misplaced_budget(ms))))
+
+        for name, workers in (('serial', 1), ('parallel', args.workers)):
+            config['upmap_max_workers'] = workers
+            plan = balancer.Plan(name, ms, [])
+            start = time.time()
+            module.do_upmap(plan)
+            print('%-8s %5d changes in %.3fs (%d workers)' %
+                  (name, len(plan.inc.commands), time.time() - start,
+                   workers))
+    except subprocess.CalledProcessError as e:
+        print('%s failed: %s' % (' '.join(e.cmd), e.output), file=sys.stderr)
+        return 1
+    finally:
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())